@@ -1,12 +1,14 @@
+import os
 import pandas as pd
 import numpy as np
 import math
 import matplotlib.pyplot as plt
 import seaborn as sns
 from typing import Dict, Tuple, Optional, Any, List, Iterable
-from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, cross_val_score
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
+from model_tuning import tune_model
+
 
 def select_existing_features(features: Iterable[str], columns: Iterable[str]) -> List[str]:
     """
@@ -276,10 +278,16 @@ def export_train_test_feather(
     target_name: str = "log_buy_price",
     transform_y: Optional[str] = None,
     drop_cols: Optional[List[str]] = None,
+    compact: bool = True,
 ) -> None:
     """
     Exporte X/y train/test au format Feather.
 
+    Avec `compact=True`, X_train et X_test sont convertis dans les types les plus
+    compacts (cleaning_utils.compact_dtypes : drapeaux en uint8, entiers réduits,
+    quartiers en category...). Les types sont choisis sur train et test réunis,
+    pour que les deux fichiers aient le même schéma.
+
     Parameters
     ----------
     X_train, X_test : pd.DataFrame
@@ -294,6 +302,8 @@ def export_train_test_feather(
         Applique $\log(1+y)$ si "log1p".
     drop_cols : list | None
         Colonnes à retirer de X_train avant export.
+    compact : bool
+        Réduit les types de X avant export et affiche la mémoire gagnée.
     """
     import os
 
@@ -309,12 +319,35 @@ def export_train_test_feather(
         y_train_final = pd.Series(y_train.values, name=target_name).reset_index(drop=True)
         y_test_final = pd.Series(y_test.values, name=target_name).reset_index(drop=True)
 
+    if compact:
+        X_train_final, X_test_final = _compact_train_test(X_train_final, X_test_final)
+
     X_train_final.to_feather(f"{output_dir}/X_train.feather")
     X_test_final.to_feather(f"{output_dir}/X_test.feather")
     y_train_final.to_frame().to_feather(f"{output_dir}/y_train.feather")
     y_test_final.to_frame().to_feather(f"{output_dir}/y_test.feather")
 
 
+def _compact_train_test(X_train: pd.DataFrame, X_test: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Types compacts communs à X_train et X_test (choisis sur les deux réunis)."""
+    from cleaning_utils import apply_dtypes, compact_dtypes, memory_report
+
+    common = [c for c in X_train.columns if c in X_test.columns]
+    dtypes = compact_dtypes(pd.concat([X_train[common], X_test[common]], ignore_index=True))
+    # Colonnes présentes d'un seul côté (ex : drop_cols retirées du train seulement)
+    dtypes.update(compact_dtypes(X_train[[c for c in X_train.columns if c not in common]]))
+    dtypes.update(compact_dtypes(X_test[[c for c in X_test.columns if c not in common]]))
+
+    compacted = []
+    for name, X in (("X_train", X_train), ("X_test", X_test)):
+        X_compact = apply_dtypes(X.copy(), dtypes)
+        report = memory_report(X, X_compact)
+        before, after = report["bytes_before"].sum(), report["bytes_after"].sum()
+        print(f"💾 {name} : {before / 1e6:.2f} Mo -> {after / 1e6:.2f} Mo (-{100 * (1 - after / max(before, 1)):.0f} %)")
+        compacted.append(X_compact)
+    return compacted[0], compacted[1]
+
+
 def _drop_high_na(
     X: pd.DataFrame,
     threshold: float,
@@ -393,6 +426,7 @@ def clean_data(
     X: pd.DataFrame,
     config: Dict[str, Any],
     stats: Optional[Dict[str, Any]] = None,
+    copy: bool = True,
 ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     Cleaning configurable et réutilisable.
@@ -405,6 +439,9 @@ def clean_data(
         Paramètres de nettoyage (exemple ci-dessous).
     stats : dict | None
         Statistiques apprises sur le train pour répliquer sur le test.
+    copy : bool
+        Travaille sur une copie de X (défaut). False modifie X en place :
+        utile pour les blocs de clean_csv_chunked, qui ne servent qu'une fois.
 
     Config attendu (exemple) :
     {
@@ -424,7 +461,8 @@ def clean_data(
     stats : dict
         Statistiques apprises pour réutilisation sur d'autres jeux.
     """
-    X = X.copy()
+    if copy:
+        X = X.copy()
     stats = {} if stats is None else dict(stats)
 
     threshold = config.get("drop_na_threshold")
@@ -467,6 +505,287 @@ def clean_data(
     return X, stats
 
 
+# --- Nettoyage par blocs (fichiers qui ne tiennent pas en mémoire) ---
+class _MedianSketch:
+    """
+    Médiane en flux, mémoire bornée.
+
+    Les valeurs distinctes sont comptées exactement tant qu'il y en a moins de
+    `max_size` : la médiane est alors identique à `Series.median()`. Au-delà,
+    les valeurs voisines sont fusionnées en centroïdes pondérés (de poids
+    proches, façon t-digest) : la médiane devient approchée, l'erreur restant
+    de l'ordre de l'écart entre deux centroïdes.
+    """
+
+    def __init__(self, max_size: int = 50_000):
+        self.max_size = max_size
+        self.values = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.exact = True
+
+    def update(self, s: pd.Series) -> None:
+        x = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        x = x[~np.isnan(x)]
+        if x.size == 0:
+            return
+        new_values, new_counts = np.unique(x, return_counts=True)
+        values, inverse = np.unique(np.concatenate([self.values, new_values]), return_inverse=True)
+        self.weights = np.bincount(inverse, weights=np.concatenate([self.weights, new_counts]))
+        self.values = values
+        if self.values.size > self.max_size:
+            self._compresser()
+
+    def _compresser(self) -> None:
+        """Fusionne les valeurs triées en max_size // 2 centroïdes de poids proches."""
+        cum = np.cumsum(self.weights)
+        n_buckets = max(self.max_size // 2, 1)
+        bucket = np.minimum(((cum - self.weights / 2) / cum[-1] * n_buckets).astype(np.int64), n_buckets - 1)
+        weights = np.bincount(bucket, weights=self.weights)
+        kept = weights > 0
+        self.values = np.bincount(bucket, weights=self.values * self.weights)[kept] / weights[kept]
+        self.weights = weights[kept]
+        self.exact = False
+
+    def median(self) -> float:
+        total = self.weights.sum()
+        if total == 0:
+            return np.float64(np.nan)
+        # Même convention que pandas : moyenne des deux valeurs centrales si n est pair
+        cum = np.cumsum(self.weights)
+        low = self.values[np.searchsorted(cum, (total - 1) // 2, side="right")]
+        high = self.values[np.searchsorted(cum, total // 2, side="right")]
+        return np.float64((low + high) / 2)
+
+
+def _common_arrow_type(types: set) -> Optional[Any]:
+    """Type Arrow commun aux blocs d'une colonne (None si la colonne n'est jamais remplie)."""
+    import pyarrow as pa
+
+    types = {t for t in types if not pa.types.is_null(t)}
+    if not types:
+        return None
+    if len(types) == 1:
+        return next(iter(types))
+    if any(pa.types.is_large_string(t) for t in types):
+        return pa.large_string()
+    if any(pa.types.is_string(t) for t in types):
+        return pa.string()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    return None
+
+
+def learn_clean_stats_chunked(
+    path: str,
+    config: Dict[str, Any],
+    chunksize: int = 100_000,
+    max_sketch_size: int = 50_000,
+    **read_csv_kwargs,
+) -> Dict[str, Any]:
+    """
+    Passe 1 du nettoyage par blocs : apprend les `stats` de clean_data sur un CSV.
+
+    Le fichier est lu par blocs de `chunksize` lignes ; seuls des compteurs sont
+    conservés : NaN par colonne (drop_na_threshold), effectifs des valeurs des
+    colonnes binaires (modes) et une _MedianSketch par colonne imputée par médiane.
+    Les règles de clean_data sont reproduites (floor_replace, rent_invalid_below,
+    colonnes supprimées ignorées), si bien que le dictionnaire retourné a les mêmes
+    clés et, tant que les colonnes ont moins de `max_sketch_size` valeurs
+    distinctes, les mêmes valeurs qu'un clean_data(X, config) sur le fichier entier.
+
+    Parameters
+    ----------
+    path : str
+        CSV brut.
+    config : dict
+        Même configuration que clean_data.
+    chunksize : int
+        Lignes par bloc.
+    max_sketch_size : int
+        Valeurs distinctes suivies exactement par colonne avant approximation des médianes.
+
+    Returns
+    -------
+    dict
+        Statistiques, à passer à clean_data ou clean_csv_chunked.
+    """
+    stats, _ = _scan_csv(path, config, chunksize, max_sketch_size, learn=True, **read_csv_kwargs)
+    return stats
+
+
+def _scan_csv(
+    path: str,
+    config: Dict[str, Any],
+    chunksize: int,
+    max_sketch_size: int,
+    learn: bool,
+    **read_csv_kwargs,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Lecture par blocs : statistiques de clean_data (si `learn`) et types Arrow des colonnes."""
+    import pyarrow as pa
+
+    floor_col = config.get("floor_col")
+    num_cols = config.get("numeric_median_cols", [])
+    rent_col = config.get("rent_col")
+    rent_invalid_below = config.get("rent_invalid_below")
+    bin_cols = config.get("binary_cols", [])
+
+    n_rows = 0
+    na_counts: Optional[pd.Series] = None
+    bin_counts: Dict[str, pd.Series] = {}
+    sketches: Dict[str, _MedianSketch] = {}
+    arrow_types: Dict[str, set] = {}
+
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs):
+        for field in pa.Schema.from_pandas(chunk, preserve_index=False):
+            arrow_types.setdefault(field.name, set()).add(field.type)
+        if not learn:
+            continue
+
+        n_rows += len(chunk)
+        na = chunk.isna().sum()
+        na_counts = na if na_counts is None else na_counts.add(na, fill_value=0)
+
+        for c in bin_cols:
+            if c in chunk.columns:
+                counts = chunk[c].value_counts()
+                bin_counts[c] = counts if c not in bin_counts else bin_counts[c].add(counts, fill_value=0)
+
+        # Valeurs telles que clean_data les voit au moment de calculer chaque médiane
+        if floor_col and floor_col in chunk.columns:
+            values = chunk[floor_col]
+            if config.get("floor_replace"):
+                values = values.replace(config["floor_replace"])
+            sketches.setdefault(floor_col, _MedianSketch(max_sketch_size)).update(pd.to_numeric(values, errors="coerce"))
+        for c in num_cols:
+            if c in chunk.columns:
+                sketches.setdefault(c, _MedianSketch(max_sketch_size)).update(pd.to_numeric(chunk[c], errors="coerce"))
+        if rent_col and rent_col in chunk.columns:
+            values = pd.to_numeric(chunk[rent_col], errors="coerce")
+            if rent_invalid_below is not None:
+                values = values.mask(values < rent_invalid_below)
+            sketches.setdefault(rent_col, _MedianSketch(max_sketch_size)).update(values)
+
+    types = {col: _common_arrow_type(t) for col, t in arrow_types.items()}
+    if not learn:
+        return {}, types
+
+    stats: Dict[str, Any] = {}
+    columns = list(arrow_types)
+    threshold = config.get("drop_na_threshold")
+    if threshold is not None and na_counts is not None:
+        na_rate = na_counts / max(n_rows, 1)
+        stats["cols_to_drop"] = [c for c in columns if na_rate[c] > threshold]
+        columns = [c for c in columns if c not in stats["cols_to_drop"]]
+
+    if bin_cols:
+        stats["bin_modes"] = {}
+        for c in bin_cols:
+            counts = bin_counts.get(c)
+            if c in columns and counts is not None and len(counts) > 0:
+                # Series.mode() trie les ex aequo : on garde la même valeur que sur le fichier entier
+                tied = counts.index[counts == counts.max()]
+                stats["bin_modes"][c] = pd.Series(list(tied)).mode()[0]
+
+    if floor_col and floor_col in columns:
+        stats[config.get("floor_median_key", "floor_median")] = sketches[floor_col].median()
+    if num_cols:
+        key = config.get("numeric_median_key", "num_medians")
+        stats[key] = {}
+        for c in num_cols:
+            if c in columns:
+                stats[key][c] = sketches[c].median()
+    if rent_col and rent_col in columns:
+        stats[config.get("rent_median_key", "rent_median")] = sketches[rent_col].median()
+
+    approximate = [c for c, sketch in sketches.items() if not sketch.exact]
+    if approximate:
+        print(f"ℹ️ Médianes approchées (plus de {max_sketch_size:,} valeurs distinctes) : {approximate}")
+    return stats, types
+
+
+def clean_csv_chunked(
+    path: str,
+    output_path: str,
+    config: Dict[str, Any],
+    stats: Optional[Dict[str, Any]] = None,
+    chunksize: int = 100_000,
+    max_sketch_size: int = 50_000,
+    **read_csv_kwargs,
+) -> Dict[str, Any]:
+    """
+    Nettoyage par blocs d'un CSV qui ne tient pas en mémoire, en deux passes.
+
+    Passe 1 : apprentissage des `stats` (learn_clean_stats_chunked), sauf si elles
+    sont fournies (ex : stats du train pour nettoyer le test), et des types des
+    colonnes sur l'ensemble du fichier. Passe 2 : chaque bloc passe par
+    clean_data(bloc, config, stats, copy=False) puis est ajouté au fichier de
+    sortie, Feather (.feather/.arrow) ou Parquet (.parquet). La mémoire est bornée
+    par la taille d'un bloc.
+
+    Parameters
+    ----------
+    path : str
+        CSV brut.
+    output_path : str
+        Fichier nettoyé (.feather, .arrow ou .parquet).
+    config : dict
+        Même configuration que clean_data.
+    stats : dict | None
+        Statistiques déjà apprises ; None = apprises sur ce fichier.
+    chunksize : int
+        Lignes par bloc.
+    max_sketch_size : int
+        Voir learn_clean_stats_chunked.
+
+    Returns
+    -------
+    dict
+        Statistiques utilisées.
+    """
+    import pyarrow as pa
+
+    suffix = os.path.splitext(output_path)[1].lower()
+    if suffix not in (".feather", ".arrow", ".parquet"):
+        raise ValueError("Sortie attendue en .feather, .arrow ou .parquet")
+
+    learned, types = _scan_csv(path, config, chunksize, max_sketch_size, learn=stats is None, **read_csv_kwargs)
+    stats = learned if stats is None else dict(stats)
+
+    # Colonnes imputées par médiane : toujours float64 (to_numeric puis fillna)
+    imputed = set(config.get("numeric_median_cols", []))
+    imputed.update(c for c in (config.get("floor_col"), config.get("rent_col")) if c)
+
+    writer = None
+    schema = None
+    n_rows = 0
+    try:
+        for chunk in pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs):
+            chunk, _ = clean_data(chunk, config=config, stats=stats, copy=False)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                # Schéma fixé sur tout le fichier : un bloc peut inférer un autre type (NaN seuls, entiers...)
+                fields = []
+                for field in table.schema:
+                    kind = pa.float64() if field.name in imputed else types.get(field.name)
+                    fields.append(field.with_type(kind) if kind is not None else field)
+                schema = pa.schema(fields, metadata=table.schema.metadata)
+                if suffix == ".parquet":
+                    import pyarrow.parquet as pq
+
+                    writer = pq.ParquetWriter(output_path, schema)
+                else:
+                    writer = pa.ipc.new_file(output_path, schema)
+            writer.write_table(table.cast(schema))
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    print(f"✅ {n_rows:,} lignes nettoyées -> {output_path}")
+    return stats
+
+
 def evaluate_model(
         algo,
         param_grid,
@@ -476,7 +795,9 @@ def evaluate_model(
         y_test,
         search_type='grid',
         scoring='r2',
-        cv=5):
+        cv=5,
+        n_jobs=-1,
+        cache=True):
     """
     Entraine un modele avec GridSearchCV ou RandomizedSearchCV et affiche les résultats
     prédit les valeurs de test et calcule les métriques
@@ -487,64 +808,49 @@ def evaluate_model(
     :param y_train: target d'entrainement
     :param X_test: features de test
     :param y_test: target de test
-    :param search_type: type de recherche, 'grid' pour GridSearchCV, 'random' pour RandomizedSearchCV
+    :param search_type: type de recherche, 'grid' pour GridSearchCV, 'random' pour RandomizedSearchCV,
+        'halving' / 'halving_random' pour le successive halving (voir model_tuning.py)
     :param scoring: métrique d'évaluation
     :param cv: nombre de folds pour la validation croisée
+    :param n_jobs: nombre de cœurs pour les folds et les candidats (-1 = tous, None = séquentiel)
+    :param cache: met en cache le prétraitement si algo est un Pipeline
     :return: dict des meilleurs paramètres, R2, RMSE, MAE, les résultats et le modele
+
+    Sans grille, le modèle retourné est un clone de `algo` ajusté sur tout le
+    train, dans le même lot parallèle que les folds de validation croisée
+    (cv + 1 ajustements, voir model_tuning.ajuster_et_valider) ; `algo` n'est pas ajusté.
     """
-    # Si la param grid est vide, entrainement sans optimisation
-    if param_grid is None:
-        algo.fit(X_train, y_train)
-        best_model = algo
-        best_params = algo.get_params()
-        cv_results = cross_val_score(best_model,
-                                      X_train, y_train,
-                                      cv=cv,
-                                      scoring=scoring)
-    else:
-        # Choisir le type de recherche d'hyperparamètres
-        if search_type == 'grid':
-            search = GridSearchCV(algo, 
-                                  param_grid, 
-                                  cv=cv, 
-                                  scoring=scoring)
-        elif search_type == 'random':
-            search = RandomizedSearchCV(algo, 
-                                        param_grid, 
-                                        cv=cv, 
-                                        scoring=scoring)
-        else:
-            raise ValueError("search_type doit être 'grid' ou 'random'")
-        
-        # Entrainement et optimisation
-        search.fit(X_train, y_train)
-        best_model = search.best_estimator_
-        best_params = search.best_params_
-        cv_results = search.cv_results_
-
-        # Prédiction avec le meilleur modele
-        y_pred = best_model.predict(X_test)
-
-        # Calcul des métriques
-        r2 = r2_score(y_test, y_pred)
-        rmse = mean_squared_error(y_test, y_pred) ** 0.5
-        mae = mean_absolute_error(y_test, y_pred)
-
-        # Affichage des résultats
-        print(f"Modèle : {algo.__class__.__name__}")
-        print(f"Meilleurs paramètres : {best_params}")
-        print(f"R2 (sur le test): {r2:.4f}")
-        print(f"RMSE : {rmse:.4f}")
-        print(f"MAE : {mae:.4f}")
-
-        return {
-            "best_params": best_params,
-            "r2": r2,
-            "rmse": rmse,
-            "mae": mae,
-            "cv_results": cv_results,
-            "best_model": best_model
-        }
+    # Recherche (ou simple entrainement si la param grid est vide)
+    search = tune_model(algo, param_grid, X_train, y_train,
+                        search_type=search_type, scoring=scoring, cv=cv,
+                        n_jobs=n_jobs, cache=cache)
+    best_model = search["best_model"]
+    best_params = search["best_params"]
+    cv_results = search["cv_results"]
+
+    # Prédiction avec le meilleur modele
+    y_pred = best_model.predict(X_test)
+
+    # Calcul des métriques
+    r2 = r2_score(y_test, y_pred)
+    rmse = mean_squared_error(y_test, y_pred) ** 0.5
+    mae = mean_absolute_error(y_test, y_pred)
+
+    # Affichage des résultats
+    print(f"Modèle : {algo.__class__.__name__}")
+    print(f"Meilleurs paramètres : {best_params}")
+    print(f"R2 (sur le test): {r2:.4f}")
+    print(f"RMSE : {rmse:.4f}")
+    print(f"MAE : {mae:.4f}")
+
+    return {
+        "best_params": best_params,
+        "r2": r2,
+        "rmse": rmse,
+        "mae": mae,
+        "cv_results": cv_results,
+        "best_model": best_model
+    }
 
 
 def eval_model_apart(
@@ -556,48 +862,27 @@ def eval_model_apart(
         y_test,
         search_type='grid',
         scoring='r2',
-        cv=5):
+        cv=5,
+        n_jobs=-1,
+        cache=True):
     """
     Variante de evaluate_model qui corrige la transformation log1p
     et affiche RMSE/MAE en euros.
-    Compatible avec matrices sparse (scipy >= 1.13).
+    X_train/X_test sont passés tels quels au modèle : la matrice CSR du
+    préprocesseur n'est jamais densifiée.
+    Sans grille, même lot parallèle que evaluate_model : cv folds + l'ajustement
+    final sur tout le train (clone de `algo`, retourné dans "best_model").
     """
-    from scipy.sparse import issparse
-    
-    # Si la param grid est vide, entrainement sans optimisation
-    if param_grid is None:
-        algo.fit(X_train, y_train)
-        best_model = algo
-        best_params = algo.get_params()
-        cv_results = cross_val_score(best_model,
-                                      X_train, y_train,
-                                      cv=cv,
-                                      scoring=scoring)
-        # Prédiction avec le meilleur modele
-        y_pred = best_model.predict(X_test)
-    else:
-        # Choisir le type de recherche d'hyperparamètres
-        if search_type == 'grid':
-            search = GridSearchCV(algo, 
-                                  param_grid, 
-                                  cv=cv, 
-                                  scoring=scoring)
-        elif search_type == 'random':
-            search = RandomizedSearchCV(algo, 
-                                        param_grid, 
-                                        cv=cv, 
-                                        scoring=scoring)
-        else:
-            raise ValueError("search_type doit être 'grid' ou 'random'")
-        
-        # Entrainement et optimisation
-        search.fit(X_train, y_train)
-        best_model = search.best_estimator_
-        best_params = search.best_params_
-        cv_results = search.cv_results_
-
-        # Prédiction avec le meilleur modele
-        y_pred = best_model.predict(X_test)
+    # Recherche (ou simple entrainement si la param grid est vide)
+    search = tune_model(algo, param_grid, X_train, y_train,
+                        search_type=search_type, scoring=scoring, cv=cv,
+                        n_jobs=n_jobs, cache=cache)
+    best_model = search["best_model"]
+    best_params = search["best_params"]
+    cv_results = search["cv_results"]
+
+    # Prédiction avec le meilleur modele
+    y_pred = best_model.predict(X_test)
 
     # Calcul des métriques (y en log1p -> conversion en euros)
     r2 = r2_score(y_test, y_pred)
@@ -4,70 +4,418 @@ Expose une route de santé et une route de prédiction s'appuyant sur
 un modèle scikit-learn et son préprocesseur.
 """
 
-from fastapi import FastAPI
-from pydantic import BaseModel
-import joblib
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from fastapi import FastAPI, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+import asyncio
 import json
+import logging
 import os
+import threading
+import time
 import pandas as pd
 import numpy as np
-import traceback
+import pyarrow as pa
 
-# app = FastAPI(title="Apartment Hunter API",root_path="/apartment-hunter/api")
-app = FastAPI(title="Apartment Hunter API")
+from batching import MicroBatcher
+from api_logging import (
+    HorodatageMiddleware,
+    RequestTimer,
+    configurer_logging,
+    echantillonner,
+    log_dump_debug,
+    log_requete,
+)
+from fast_preprocessing import compiler_preprocesseur, verifier_parite
+from model_store import (
+    ModelBundle,
+    charger_modele,
+    charger_preprocesseur,
+    fichier_modele,
+    lignes_prechauffage,
+    memoire_max_mo,
+    signature_fichiers,
+    version_artefacts,
+)
+from inference_executor import (
+    InferenceExecutor,
+    QueueFullError,
+    inferer,
+    inferer_worker,
+    initialiser_worker,
+    transformer_lignes,
+)
+from api_codecs import (
+    ARROW,
+    JSON,
+    MSGPACK,
+    FormatNonSupporte,
+    decoder,
+    encoder,
+    format_reponse,
+    format_requete,
+    lire_table_arrow,
+    matrice_arrow,
+    reponse_arrow,
+)
+from api_metrics import REGISTRE, MetriquesMiddleware, observer_quartiers, observer_requete
+from prediction_cache import PersistentPredictionCache, PredictionCache, cle_canonique
+from price_table import PriceTable, empreinte_artefacts
+
+# Référence pour mesurer le délai de démarrage à froid
+PROCESS_START = time.perf_counter()
 
 # --- CONFIGURATION DES CHEMINS ---
-MODEL_PATH = "/app/models/xgboost_model.pkl"
-PREPROCESSOR_PATH = "/app/models/preprocessor.pkl"
-CONFIG_PATH = "/app/models/model_config.json"
+MODELS_DIR = os.getenv("MODELS_DIR", "/app/models")
+MODEL_PATH = f"{MODELS_DIR}/xgboost_model.pkl"
+# Format natif XGBoost (voir model_store.py), prioritaire sur le pickle s'il existe
+MODEL_NATIVE_PATH = f"{MODELS_DIR}/xgboost_model.ubj"
+PREPROCESSOR_PATH = f"{MODELS_DIR}/preprocessor.pkl"
+CONFIG_PATH = f"{MODELS_DIR}/model_config.json"
+PRICE_TABLE_PATH = os.getenv("PRICE_TABLE_PATH", f"{MODELS_DIR}/price_table.npy")
+
+# --- PARAMÈTRES DU MODE BATCH ---
+# Nombre maximal de lignes acceptées par /predict/batch (surchargeable par variable d'environnement)
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+# /predict/stream : lignes NDJSON scorées par bloc, taille maximale d'une ligne (octets)
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "5000"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+
+# Ordre des 10 colonnes attendu par le préprocesseur
+INPUT_COLUMNS = [
+    "sq_mt_built", "n_rooms", "n_bathrooms", "neighborhood",
+    "has_lift", "has_parking", "has_pool", "has_garden",
+    "has_storage_room", "is_floor_under"
+]
+REQUIRED_COLUMNS = ["sq_mt_built", "n_rooms", "n_bathrooms", "neighborhood"]
+
+# Préprocesseur compilé en NumPy (désactivable avec USE_COMPILED_PREPROCESSOR=0)
+USE_COMPILED_PREPROCESSOR = os.getenv("USE_COMPILED_PREPROCESSOR", "1") == "1"
+
+# Table de prix précalculée (voir price_table.py), désactivable avec USE_PRICE_TABLE=0
+USE_PRICE_TABLE = os.getenv("USE_PRICE_TABLE", "1") == "1"
+
+# Cache LRU des prédictions (0 entrée = désactivé, TTL en secondes, 0 = sans expiration)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0"))
+# Cache disque SQLite partagé entre workers et redémarrages (chemin vide = désactivé)
+PREDICTION_CACHE_PATH = os.getenv("PREDICTION_CACHE_PATH", "")
+PREDICTION_CACHE_DISK_SIZE = int(os.getenv("PREDICTION_CACHE_DISK_SIZE", "1000000"))
+
+# --- SERVICE DE L'INFÉRENCE ---
+# sync : threadpool par défaut de FastAPI ; thread / process : pool dédié dimensionné
+SERVING_MODE = os.getenv("SERVING_MODE", "sync")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+# Nombre maximal de tâches en cours + en file ; au-delà, réponse 503 immédiate
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "64"))
+# Threads XGBoost par processus worker (mode process), 0 = valeur du modèle
+INFERENCE_THREADS_PER_WORKER = int(os.getenv("INFERENCE_THREADS_PER_WORKER", "1"))
+
+# Micro-batching de /predict : regroupe les requêtes d'une fenêtre (ms) ou jusqu'à N éléments
+MICRO_BATCHING = os.getenv("MICRO_BATCHING", "0") == "1"
+MICRO_BATCH_WINDOW_MS = float(os.getenv("MICRO_BATCH_WINDOW_MS", "2"))
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "32"))
+
+# --- RECHARGEMENT À CHAUD ---
+# Intervalle (s) de surveillance des artefacts de MODELS_DIR, 0 = désactivé
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "10"))
+# Jeton attendu dans l'en-tête X-Admin-Token par POST /admin/reload (vide = pas de contrôle)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Délai maximal (s) laissé aux requêtes en cours pour finir sur l'ancienne version
+RELOAD_DRAIN_TIMEOUT = float(os.getenv("RELOAD_DRAIN_TIMEOUT", "30"))
+# Fichiers qui définissent une version servie
+ARTIFACT_PATHS = [MODEL_NATIVE_PATH, MODEL_PATH, PREPROCESSOR_PATH, CONFIG_PATH]
+
+
+class ServingState:
+    """Version servie : bundle d'artefacts + pool et micro-batcher qui l'utilisent.
+
+    Chaque requête capture l'état courant à son arrivée et le garde jusqu'au bout :
+    après une bascule, les requêtes en cours terminent sur l'ancienne version,
+    qui n'est libérée qu'une fois son compteur de requêtes en cours à zéro.
+    """
+
+    def __init__(
+        self,
+        bundle: ModelBundle,
+        executor: Optional[InferenceExecutor] = None,
+        owns_executor: bool = False,
+    ):
+        self.bundle = bundle
+        self.executor = executor
+        # Pool propre à cette version (mode process) : arrêté avec elle
+        self.owns_executor = owns_executor
+        self.micro_batcher: Optional[MicroBatcher] = None
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    def acquerir(self) -> None:
+        with self._lock:
+            self.inflight += 1
+
+    def liberer(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+
 
 # --- VARIABLES GLOBALES ---
-model = None
-preprocessor = None
-config = None
+serving: Optional[ServingState] = None
+prediction_cache = PredictionCache(max_entries=PREDICTION_CACHE_SIZE, ttl_s=PREDICTION_CACHE_TTL)
+# Second niveau, sur disque (ouvert par le lifespan si PREDICTION_CACHE_PATH est défini)
+disk_cache: Optional[PersistentPredictionCache] = None
+# Pool de threads partagé par toutes les versions (SERVING_MODE=thread)
+thread_executor: Optional[InferenceExecutor] = None
+# Mesures du démarrage à froid (chargement des artefacts, mémoire, délai avant la 1re requête)
+startup_stats: dict[str, Any] = {}
+reload_stats: dict[str, Any] = {"reloads": 0, "failures": 0, "last_error": None}
+_reload_lock = asyncio.Lock()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Charge la première version, démarre la surveillance des artefacts, puis libère tout à l'extinction."""
+    global thread_executor, disk_cache
+    if PREDICTION_CACHE_PATH:
+        disk_cache = PersistentPredictionCache(PREDICTION_CACHE_PATH, max_entries=PREDICTION_CACHE_DISK_SIZE)
+        logger.info(f"✅ Cache disque des prédictions : {PREDICTION_CACHE_PATH} ({disk_cache.stats()['size']} entrées)")
+    if SERVING_MODE == "thread":
+        thread_executor = InferenceExecutor(mode="thread", workers=INFERENCE_WORKERS, max_queue=INFERENCE_MAX_QUEUE)
+    # Chargement différé au démarrage du serveur (et non à l'import du module)
+    await recharger_modele("démarrage")
+
+    startup_stats["ready_s"] = round(time.perf_counter() - PROCESS_START, 3)
+    startup_stats["max_rss_mb"] = round(memoire_max_mo(), 1)
+    logger.info(f"✅ API prête : {startup_stats}")
+
+    watcher = asyncio.create_task(_surveiller_artefacts()) if MODEL_WATCH_INTERVAL > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    if serving is not None:
+        await _retirer(serving)
+    if thread_executor is not None:
+        thread_executor.shutdown()
+        thread_executor = None
+    if disk_cache is not None:
+        disk_cache.close()
+        disk_cache = None
+
+
+# app = FastAPI(title="Apartment Hunter API",root_path="/apartment-hunter/api")
+app = FastAPI(title="Apartment Hunter API", lifespan=lifespan)
+app.add_middleware(HorodatageMiddleware)
+app.add_middleware(MetriquesMiddleware)
+logger = configurer_logging()
+
+# --- FONCTIONS DE CHARGEMENT ---
+def _charger_bundle() -> Optional[ModelBundle]:
+    """Charge la configuration, le modèle et le préprocesseur dans un nouveau bundle, puis le préchauffe.
+
+    Retourne None si les fichiers sont absents ; lève une exception si la
+    nouvelle version est inutilisable (la version courante est alors conservée).
+    """
+    model_available = os.path.exists(MODEL_NATIVE_PATH) or os.path.exists(MODEL_PATH)
+    if not (model_available and os.path.exists(PREPROCESSOR_PATH)):
+        logger.error("❌ Erreur : Fichiers .pkl introuvables dans /models")
+        return None
+
+    # Empreinte calculée avant le chargement : elle identifie la version servie
+    version = version_artefacts([fichier_modele(MODEL_PATH, MODEL_NATIVE_PATH), PREPROCESSOR_PATH, CONFIG_PATH])
+
+    # 1. Chargement de la configuration JSON
+    if os.path.exists(CONFIG_PATH):
+        with open(CONFIG_PATH, "r") as f:
+            config = json.load(f)
+        logger.info("✅ Configuration JSON chargée")
+    else:
+        logger.warning("⚠️ Config manquante: models/model_config.json")
+        # Fallback sur les 10 colonnes si le fichier manque
+        config = {"input_columns": list(INPUT_COLUMNS)}
+
+    # 2. Chargement du Modèle et Préprocesseur
+    start = time.perf_counter()
+    model, model_format = charger_modele(MODEL_PATH, MODEL_NATIVE_PATH)
+    t_model = time.perf_counter() - start
+    preprocessor = charger_preprocesseur(PREPROCESSOR_PATH)
+    t_preprocessor = time.perf_counter() - start - t_model
+    logger.info(
+        f"✅ Modèle ({model_format}, {t_model * 1e3:.1f} ms) et Préprocesseur "
+        f"({t_preprocessor * 1e3:.1f} ms) chargés — version {version}"
+    )
+
+    # Extraire les catégories valides du OneHotEncoder
+    logger.info("\n📊 Catégories du preprocessor:")
+    for name, transformer, cols in preprocessor.transformers_:
+        logger.info(f"  {name}: {cols}")
+        if name == "cat" and hasattr(transformer, 'named_steps'):
+            onehot = transformer.named_steps.get('onehotencoder')
+            if onehot and hasattr(onehot, 'categories_'):
+                for i, col in enumerate(cols):
+                    logger.info(f"    - {col}: {list(onehot.categories_[i][:10])}...")
+
+    # Compilation du préprocesseur, validée par un test de parité avec sklearn
+    compiled = None
+    if USE_COMPILED_PREPROCESSOR:
+        try:
+            compiled = compiler_preprocesseur(preprocessor, INPUT_COLUMNS)
+            verifier_parite(preprocessor, compiled, n_rows=256)
+            logger.info("✅ Préprocesseur compilé (NumPy) activé")
+        except Exception as e:
+            compiled = None
+            logger.warning(f"⚠️ Préprocesseur compilé désactivé, repli sur sklearn : {e}")
+
+    # Table de prix : utilisée seulement si elle a été construite avec ces artefacts
+    table = None
+    if USE_PRICE_TABLE:
+        try:
+            artifacts_hash = empreinte_artefacts([fichier_modele(MODEL_PATH, MODEL_NATIVE_PATH), PREPROCESSOR_PATH])
+            table = PriceTable.charger(PRICE_TABLE_PATH, expected_hash=artifacts_hash)
+            if table is not None:
+                logger.info(f"✅ Table de prix chargée (memory-map) : {table.meta['shape']}")
+            else:
+                logger.info("ℹ️ Pas de table de prix à jour, prédiction par le modèle uniquement")
+        except Exception as e:
+            logger.warning(f"⚠️ Table de prix ignorée : {e}")
+
+    # 3. Préchauffage : quelques prédictions synthétiques avant toute bascule
+    warmup, _, _ = inferer(lignes_prechauffage(), model, preprocessor, compiled, INPUT_COLUMNS)
+    if not np.isfinite(warmup).all():
+        raise ValueError(f"Préchauffage invalide : prédictions non finies pour la version {version}")
+
+    return ModelBundle(
+        version=version,
+        model=model,
+        preprocessor=preprocessor,
+        config=config,
+        model_format=model_format,
+        compiled=compiled,
+        price_table=table,
+        timings={"model_load_s": round(t_model, 4), "preprocessor_load_s": round(t_preprocessor, 4)},
+    )
+
+
+def _basculer(state: ServingState) -> Optional[ServingState]:
+    """Remplace atomiquement la version servie et retourne l'ancienne."""
+    global serving
+    previous, serving = serving, state
+    if not startup_stats.get("model_format"):
+        startup_stats.update(model_format=state.bundle.model_format, **state.bundle.timings)
+    return previous
+
 
-# --- FONCTION DE CHARGEMENT ---
 def load_assets():
-    """Charge la configuration, le modèle et le préprocesseur en mémoire."""
-    global model, preprocessor, config
+    """Charge les artefacts et les sert sans pool dédié (repli à la volée, hors lifespan)."""
     try:
-        # 1. Chargement de la configuration JSON
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, "r") as f:
-                config = json.load(f)
-            print("✅ Configuration JSON chargée")
-        else:
-            print("⚠️ Config manquante: models/model_config.json")
-            # Fallback sur les 10 colonnes si le fichier manque
-            config = {"input_columns": [
-                "sq_mt_built", "n_rooms", "n_bathrooms", "neighborhood",
-                "has_lift", "has_parking", "has_pool", "has_garden",
-                "has_storage_room", "is_floor_under"
-            ]}
-
-        # 2. Chargement du Modèle et Préprocesseur
-        if os.path.exists(MODEL_PATH) and os.path.exists(PREPROCESSOR_PATH):
-            model = joblib.load(MODEL_PATH)
-            preprocessor = joblib.load(PREPROCESSOR_PATH)
-            print("✅ Modèle et Préprocesseur chargés")
-            
-            # Extraire les catégories valides du OneHotEncoder
-            print("\n📊 Catégories du preprocessor:")
-            for name, transformer, cols in preprocessor.transformers_:
-                print(f"  {name}: {cols}")
-                if name == "cat" and hasattr(transformer, 'named_steps'):
-                    onehot = transformer.named_steps.get('onehotencoder')
-                    if onehot and hasattr(onehot, 'categories_'):
-                        for i, col in enumerate(cols):
-                            print(f"    - {col}: {list(onehot.categories_[i][:10])}...")
-        else:
-            print("❌ Erreur : Fichiers .pkl introuvables dans /models")
-            
+        bundle = _charger_bundle()
+        if bundle is not None:
+            _basculer(ServingState(bundle, executor=thread_executor))
     except Exception as e:
-        print(f"❌ Erreur lors de l'initialisation : {e}")
+        logger.error(f"❌ Erreur lors de l'initialisation : {e}")
+
+
+async def recharger_modele(raison: str, force: bool = True) -> dict[str, Any]:
+    """Charge une nouvelle version en arrière-plan, la préchauffe puis la bascule atomiquement.
+
+    Les requêtes déjà commencées terminent sur l'ancienne version ; en cas
+    d'échec, l'ancienne version reste servie.
+    """
+    async with _reload_lock:
+        current = serving.bundle.version if serving is not None else None
+        if not force and current is not None:
+            files = [fichier_modele(MODEL_PATH, MODEL_NATIVE_PATH), PREPROCESSOR_PATH, CONFIG_PATH]
+            if await run_in_threadpool(version_artefacts, files) == current:
+                return {"status": "unchanged", "model_version": current}
+
+        start = time.perf_counter()
+        executor = None
+        try:
+            bundle = await run_in_threadpool(_charger_bundle)
+            if bundle is None:
+                return {"status": "error", "error": "Artefacts introuvables", "model_version": current}
+            if SERVING_MODE == "process":
+                # Pool neuf : chaque processus charge la nouvelle version avant la bascule
+                executor = InferenceExecutor(
+                    mode="process",
+                    workers=INFERENCE_WORKERS,
+                    max_queue=INFERENCE_MAX_QUEUE,
+                    initializer=initialiser_worker,
+                    initargs=(MODEL_PATH, MODEL_NATIVE_PATH, PREPROCESSOR_PATH, INPUT_COLUMNS, INFERENCE_THREADS_PER_WORKER),
+                )
+                duration = await run_in_threadpool(executor.prechauffer, inferer_worker, lignes_prechauffage())
+                logger.info(
+                    f"✅ Pool d'inférence 'process' prêt : {INFERENCE_WORKERS} workers, "
+                    f"file max {INFERENCE_MAX_QUEUE} ({duration:.2f} s)"
+                )
+            state = ServingState(bundle, executor=executor or thread_executor, owns_executor=executor is not None)
+        except Exception as e:
+            if executor is not None:
+                executor.shutdown()
+            reload_stats["failures"] += 1
+            reload_stats["last_error"] = str(e)
+            logger.error(f"❌ Rechargement ({raison}) échoué, version {current} conservée : {e}")
+            return {"status": "error", "error": str(e), "model_version": current}
+
+        if MICRO_BATCHING:
+            state.micro_batcher = MicroBatcher(
+                lambda X_rows: _inferer_lot_async(X_rows, state),
+                window_s=MICRO_BATCH_WINDOW_MS / 1e3,
+                max_batch=MICRO_BATCH_MAX_SIZE,
+            )
+
+        previous = _basculer(state)
+        # Les prédictions en cache proviennent de l'ancien modèle
+        prediction_cache.clear()
+        if disk_cache is not None:
+            # Y compris au démarrage : les artefacts ont pu changer depuis le dernier arrêt
+            await run_in_threadpool(disk_cache.invalider, bundle.version)
+        if previous is not None:
+            reload_stats["reloads"] += 1
+            asyncio.create_task(_retirer(previous))
+        duration = time.perf_counter() - start
+        reload_stats["last_reload_s"] = round(duration, 3)
+        logger.info(f"🔄 Version {bundle.version} en service ({raison}, {duration:.2f} s), précédente : {current}")
+        return {"status": "reloaded", "model_version": bundle.version, "previous_version": current}
+
+
+async def _retirer(state: ServingState) -> None:
+    """Attend la fin des requêtes encore servies par une version, puis libère son pool."""
+    deadline = time.perf_counter() + RELOAD_DRAIN_TIMEOUT
+    while state.inflight > 0 and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    if state.micro_batcher is not None:
+        await state.micro_batcher.aclose()
+    if state.owns_executor and state.executor is not None:
+        await run_in_threadpool(state.executor.shutdown)
+
+
+async def _surveiller_artefacts() -> None:
+    """Surveille MODELS_DIR et recharge quand les artefacts ont changé puis sont stables.
+
+    Un changement n'est pris en compte que si la signature (mtime, taille) est
+    identique sur deux relevés successifs : l'export en cours est terminé.
+    """
+    last = signature_fichiers(ARTIFACT_PATHS)
+    pending = None
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            current = signature_fichiers(ARTIFACT_PATHS)
+            if current == last:
+                pending = None
+                continue
+            if current != pending:
+                pending = current
+                continue
+            last, pending = current, None
+            await recharger_modele("fichiers modifiés", force=False)
+        except Exception as e:
+            logger.error(f"❌ Surveillance des artefacts : {e}")
 
-# Exécuter le chargement au démarrage
-load_assets()
 
 # --- SCHÉMA DE DONNÉES (Pydantic) ---
 class PropertyData(BaseModel):
@@ -82,90 +430,655 @@ class PropertyData(BaseModel):
     has_storage_room: int = 0
     is_floor_under: int = 0
 
+
+class BatchRequest(BaseModel):
+    """Lot de biens à estimer, en lignes (`items`) ou en colonnes (`columns`)."""
+    items: Optional[list[dict[str, Any]]] = None
+    columns: Optional[dict[str, list[Any]]] = None
+
+
+def _corps_openapi(model: type[BaseModel], formats: tuple[str, ...] = (JSON, MSGPACK)) -> dict[str, Any]:
+    """Documentation OpenAPI d'un corps lu par la route elle-même (plusieurs formats)."""
+    schema = model.model_json_schema()
+    content = {fmt: {"schema": schema} for fmt in formats if fmt != ARROW}
+    if ARROW in formats:
+        content[ARROW] = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {"required": True, "content": content}}
+
+
+def _lire_corps(body: bytes, fmt: str, model: type[BaseModel]) -> Any:
+    """Décode et valide un corps JSON / msgpack ; erreurs au format 422 de FastAPI."""
+    try:
+        if fmt == JSON:
+            return model.model_validate_json(body)
+        return model.model_validate(decoder(body, fmt))
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)], body=body
+        )
+    except ValueError as e:
+        raise RequestValidationError([{"type": "value_error", "loc": ("body",), "msg": str(e), "input": None}])
+
+
+def _formats(request: Request, autorises: tuple[str, ...] = (JSON, MSGPACK)) -> tuple[str, str]:
+    """Formats (requête, réponse) négociés ; lève FormatNonSupporte (415)."""
+    fmt = format_requete(request.headers.get("content-type"), autorises)
+    return fmt, format_reponse(request.headers.get("accept"), fmt, autorises)
+
+
+# --- FONCTIONS DU MODE BATCH ---
+def _valider_lignes(items: list[dict[str, Any]]) -> tuple[pd.DataFrame, dict[int, str]]:
+    """Valide chaque ligne avec PropertyData et retourne les lignes valides + erreurs par index."""
+    rows = []
+    index = []
+    errors = {}
+    for i, item in enumerate(items):
+        try:
+            rows.append(PropertyData.model_validate(item).model_dump())
+            index.append(i)
+        except ValidationError as e:
+            errors[i] = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+    df = pd.DataFrame(rows, index=index, columns=INPUT_COLUMNS)
+    return df, errors
+
+
+def _valider_colonnes(columns: dict[str, list[Any]]) -> tuple[pd.DataFrame, dict[int, str]]:
+    """Valide un lot colonnaire de façon vectorisée (mêmes règles que PropertyData).
+
+    Les colonnes binaires absentes valent 0, comme les valeurs par défaut du schéma.
+    Une valeur manquante, non numérique ou non entière invalide la ligne.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"Colonnes obligatoires manquantes : {missing}")
+    lengths = {len(columns[c]) for c in columns if c in INPUT_COLUMNS}
+    if len(lengths) > 1:
+        raise ValueError("Toutes les colonnes doivent avoir la même longueur")
+    n_rows = lengths.pop() if lengths else 0
+
+    data = {}
+    invalid = np.zeros(n_rows, dtype=bool)
+    messages = [[] for _ in range(n_rows)]
+    for col in INPUT_COLUMNS:
+        if col not in columns:
+            data[col] = np.zeros(n_rows, dtype=np.int64)
+            continue
+        values = pd.to_numeric(pd.Series(columns[col], dtype="object"), errors="coerce").to_numpy(dtype=float)
+        bad = ~np.isfinite(values) | (values != np.round(values))
+        for i in np.flatnonzero(bad):
+            messages[i].append(f"{col}: valeur entière attendue")
+        invalid |= bad
+        data[col] = np.where(bad, 0, values).astype(np.int64)
+
+    df = pd.DataFrame(data, columns=INPUT_COLUMNS)
+    errors = {int(i): "; ".join(messages[i]) for i in np.flatnonzero(invalid)}
+    return df[~invalid], errors
+
+
+@contextmanager
+def _version_courante() -> Iterator[Optional[ServingState]]:
+    """Capture la version servie pour toute la durée d'une requête."""
+    state = serving
+    if state is None:
+        yield None
+        return
+    state.acquerir()
+    try:
+        yield state
+    finally:
+        state.liberer()
+
+
+def _inferer(X_rows: np.ndarray, bundle: ModelBundle) -> tuple[np.ndarray, float, float]:
+    """Préprocesseur + modèle chargés dans ce processus (modes sync et thread)."""
+    return inferer(X_rows, bundle.model, bundle.preprocessor, bundle.compiled, INPUT_COLUMNS)
+
+
+def _soumettre(state: ServingState):
+    """Fonction et arguments exécutés par le pool : les processus utilisent leur propre copie du modèle."""
+    if state.executor.mode == "process":
+        return inferer_worker, ()
+    return _inferer, (state.bundle,)
+
+
+async def _inferer_lot_async(X_rows: np.ndarray, state: ServingState) -> tuple[np.ndarray, float, float]:
+    """Lance l'inférence hors de la boucle d'événements (pool dédié ou threadpool par défaut)."""
+    if state.executor is None:
+        return await run_in_threadpool(_inferer, X_rows, state.bundle)
+    fn, extra = _soumettre(state)
+    return await state.executor.run(fn, X_rows, *extra)
+
+
+async def _inferer_async(X_rows: np.ndarray, state: ServingState, timer: RequestTimer) -> np.ndarray:
+    """Inférence d'une requête unitaire, regroupée avec d'autres si le micro-batching est actif."""
+    if state.micro_batcher is not None and len(X_rows) == 1:
+        pred, t_pre, t_pred = await state.micro_batcher.submit(tuple(X_rows[0]))
+        preds = np.asarray([pred])
+    else:
+        preds, t_pre, t_pred = await _inferer_lot_async(X_rows, state)
+    timer.mark_split({"preprocess": t_pre, "predict": t_pred}, remainder="queue")
+    return preds
+
+
+def _inferer_bloquant(X_rows: np.ndarray, state: ServingState, timer: RequestTimer) -> np.ndarray:
+    """Variante bloquante pour les routes synchrones (déjà exécutées dans le threadpool)."""
+    if state.executor is None:
+        preds, t_pre, t_pred = _inferer(X_rows, state.bundle)
+    else:
+        fn, extra = _soumettre(state)
+        preds, t_pre, t_pred = state.executor.submit(fn, X_rows, *extra).result()
+    timer.mark_split({"preprocess": t_pre, "predict": t_pred}, remainder="queue")
+    return preds
+
+
+def _predire_log(X_rows: np.ndarray, state: ServingState, timer: RequestTimer) -> np.ndarray:
+    """Prédit (en log) un lot de lignes (n, 10) en une seule passe vectorisée.
+
+    Les lignes présentes dans la table précalculée sont lues directement ;
+    seules les autres passent par le préprocesseur et le modèle.
+    """
+    table = state.bundle.price_table
+    if table is not None and len(X_rows) > 0:
+        preds, in_grid = table.lookup_array(X_rows, INPUT_COLUMNS)
+        timer.mark("lookup")
+        if not in_grid.all():
+            preds[~in_grid] = _inferer_bloquant(X_rows[~in_grid], state, timer)
+        return preds
+
+    return _inferer_bloquant(X_rows, state, timer)
+
+def _fin_requete(
+    route: str,
+    timer: RequestTimer,
+    status: str,
+    sampled: bool = True,
+    source: Optional[str] = None,
+    **fields: Any,
+) -> None:
+    """Métriques de toutes les requêtes, log structuré des requêtes échantillonnées."""
+    observer_requete(route, timer, status, source=source)
+    if sampled:
+        if source is not None:
+            fields["source"] = source
+        log_requete(route, timer, status, **fields)
+
+
+def _metriques_etat():
+    """Échantillons évalués à la lecture de /metrics : modèle servi, rechargements, cache, pool."""
+    state = serving
+    if state is not None:
+        bundle = state.bundle
+        yield ("apartment_hunter_model_info", "gauge", "Version servie du modèle (valeur 1)",
+               {"version": bundle.version, "format": bundle.model_format}, 1)
+        for artifact in ("model", "preprocessor"):
+            yield ("apartment_hunter_model_load_seconds", "gauge", "Temps de chargement des artefacts servis",
+                   {"artifact": artifact}, bundle.timings.get(f"{artifact}_load_s", 0.0))
+        yield ("apartment_hunter_model_loaded_timestamp_seconds", "gauge", "Date de chargement de la version servie",
+               {}, bundle.loaded_at)
+        if state.executor is not None:
+            stats = state.executor.stats()
+            yield ("apartment_hunter_inference_pending", "gauge", "Tâches d'inférence en cours ou en file", {}, stats["pending"])
+            yield ("apartment_hunter_inference_rejected_total", "counter", "Tâches refusées (file pleine)", {}, stats["rejected"])
+    yield ("apartment_hunter_model_reloads_total", "counter", "Rechargements à chaud réussis", {}, reload_stats["reloads"])
+    yield ("apartment_hunter_model_reload_failures_total", "counter", "Rechargements à chaud échoués", {}, reload_stats["failures"])
+    cache = prediction_cache.stats()
+    for key in ("hits", "misses", "evictions"):
+        yield (f"apartment_hunter_prediction_cache_{key}_total", "counter", f"Cache des prédictions : {key}", {}, cache[key])
+    yield ("apartment_hunter_prediction_cache_entries", "gauge", "Entrées du cache des prédictions", {}, cache["size"])
+    if disk_cache is not None:
+        disk = disk_cache.stats()
+        for key in ("hits", "misses", "evictions", "write_errors"):
+            yield (f"apartment_hunter_prediction_disk_cache_{key}_total", "counter", f"Cache disque des prédictions : {key}", {}, disk[key])
+        yield ("apartment_hunter_prediction_disk_cache_entries", "gauge", "Entrées du cache disque (estimation)", {}, disk["size"])
+
+
+REGISTRE.collecteur(_metriques_etat)
+
 # --- ROUTES ---
 
 @app.get("/")
 def home():
     """Retourne l'état de santé de l'API."""
+    state = serving
+    bundle = state.bundle if state is not None else None
+    executor = state.executor if state is not None else None
+    batcher = state.micro_batcher if state is not None else None
     return {
         "status": "API is running",
-        "model_loaded": model is not None,
-        "config_loaded": config is not None
+        "model_loaded": bundle is not None,
+        "config_loaded": bundle is not None and bundle.config is not None,
+        "model": {
+            "version": bundle.version,
+            "format": bundle.model_format,
+            "loaded_at": bundle.loaded_at,
+            **reload_stats,
+        } if bundle is not None else reload_stats,
+        "prediction_cache": prediction_cache.stats(),
+        "prediction_disk_cache": disk_cache.stats() if disk_cache is not None else {"enabled": False},
+        "inference": executor.stats() if executor is not None else {"mode": SERVING_MODE},
+        "micro_batching": batcher.stats() if batcher is not None else {"enabled": False},
+        "startup": startup_stats
     }
 
-@app.post("/predict")
-def predict(data: PropertyData):
-    """Génère une prédiction de prix à partir des caractéristiques reçues."""
+
+@app.get("/metrics")
+def metrics():
+    """Expose les métriques au format texte Prometheus."""
+    return PlainTextResponse(REGISTRE.exposition(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/reload")
+async def admin_reload(force: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """Recharge à chaud le trio modèle/préprocesseur/configuration depuis MODELS_DIR.
+
+    Sans `force`, la version n'est remplacée que si l'empreinte des fichiers a changé.
+    """
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "Jeton d'administration invalide"})
+    return await recharger_modele("route /admin/reload", force=force)
+
+
+@app.post("/predict", openapi_extra=_corps_openapi(PropertyData))
+async def predict(request: Request):
+    """Génère une prédiction de prix à partir des caractéristiques reçues (JSON ou msgpack)."""
+    timer = RequestTimer(getattr(request.state, "t_start", None))
+    try:
+        fmt, out_fmt = _formats(request)
+    except FormatNonSupporte as e:
+        _fin_requete("/predict", timer, "error", error=str(e))
+        return JSONResponse(status_code=415, content={"error": str(e)})
+    # Lecture + décodage + validation pydantic : de la réception (middleware) à la fin du décodage
+    data = _lire_corps(await request.body(), fmt, PropertyData)
+    timer.mark("validate")
+    return encoder(await _predire(data, timer), out_fmt)
+
+
+def _chercher_hors_memoire(bundle: Any, row: tuple[int, ...], data: PropertyData) -> tuple[str, Optional[np.float32]]:
+    """Cache disque puis table précalculée ; (source, log-prédiction ou None)."""
+    if disk_cache is not None and (prediction_log := disk_cache.get(bundle.version, row)) is not None:
+        return "disk_cache", prediction_log
+    if bundle.price_table is not None and (prediction_log := bundle.price_table.lookup(data)) is not None:
+        return "table", prediction_log
+    return "model", None
+
+
+async def _predire(data: PropertyData, timer: RequestTimer) -> Any:
+    """Prédiction d'un bien : cache mémoire/disque, table précalculée ou modèle."""
+    sampled = echantillonner()
+    source = "model"
+    try:
+        if serving is None:
+            logger.warning("⚠️ Preprocessor non chargé — tentative de rechargement à la volée...")
+            await run_in_threadpool(load_assets)
+            if serving is None:
+                err = "Preprocessor introuvable sur le serveur. Vérifier les chemins /models"
+                _fin_requete("/predict", timer, "error", error=err)
+                return {"error": err}
+
+        # Toute la requête est servie par la version capturée ici, même si une bascule survient
+        with _version_courante() as state:
+            bundle = state.bundle
+
+            observer_quartiers(data.neighborhood)
+
+            # 1. Cache mémoire puis disque, puis table précalculée (lecture O(1) si dans la grille)
+            row = cle_canonique(data, INPUT_COLUMNS)
+            cache_key = (bundle.version, *row)
+            prediction_log = prediction_cache.get(cache_key)
+            if prediction_log is not None:
+                source = "cache"
+            elif disk_cache is not None:
+                # SELECT SQLite bloquant (busy_timeout) : hors de la boucle d'événements
+                source, prediction_log = await run_in_threadpool(_chercher_hors_memoire, bundle, row, data)
+            else:
+                source, prediction_log = _chercher_hors_memoire(bundle, row, data)
+            if prediction_log is not None:
+                timer.mark("lookup")
+            else:
+                # 2-3. Préprocesseur + modèle (en LOG), hors de la boucle d'événements
+                X_rows = np.array([row], dtype=np.int64)
+                prediction_log = (await _inferer_async(X_rows, state, timer))[0]
+
+                if sampled and logger.isEnabledFor(logging.DEBUG):
+                    X_processed = transformer_lignes(X_rows, bundle.preprocessor, bundle.compiled, INPUT_COLUMNS)
+                    log_dump_debug(data.model_dump(), X_processed, prediction_log)
+
+            # 4. Vérifier que la prédiction est valide puis conversion inverse (LOG1P -> EUROS)
+            if np.isnan(prediction_log) or np.isinf(prediction_log):
+                err = f"Prédiction invalide: {prediction_log}"
+                _fin_requete("/predict", timer, "error", source=source, error=err)
+                return {"error": err, "model_version": bundle.version}
+
+            prediction_euros = np.expm1(prediction_log)
+
+            if np.isnan(prediction_euros) or np.isinf(prediction_euros):
+                err = "Prix final invalide après conversion"
+                _fin_requete("/predict", timer, "error", source=source, error=err)
+                return {"error": err, "model_version": bundle.version}
+
+            prediction_cache.put(cache_key, prediction_log)
+            if disk_cache is not None and source == "model":
+                disk_cache.put(bundle.version, row, prediction_log)
+            timer.mark("postprocess")
+
+            _fin_requete(
+                "/predict", timer, "success", sampled,
+                source=source, neighborhood=data.neighborhood, model_version=bundle.version,
+            )
+            return {
+                "prediction": float(prediction_euros),
+                "prediction_log": float(prediction_log),
+                "model_version": bundle.version,
+                "status": "success"
+            }
+
+    except QueueFullError as e:
+        _fin_requete("/predict", timer, "rejected", error=str(e))
+        return JSONResponse(status_code=503, content={"error": str(e)})
+
+    except Exception as e:
+        logger.exception(f"❌ Erreur /predict : {e}")
+        _fin_requete("/predict", timer, "error", source=source, error=str(e))
+        return {"error": str(e)}
+
+
+@app.post("/predict/batch", openapi_extra=_corps_openapi(BatchRequest, (JSON, MSGPACK, ARROW)))
+async def predict_batch(request: Request):
+    """Génère les prédictions d'un lot de biens en un seul passage préprocesseur + modèle.
+
+    Retourne un résultat par ligne (dans l'ordre d'entrée) : soit la prédiction,
+    soit l'erreur propre à cette ligne. Le lot arrive en JSON ou msgpack (`items`
+    ou `columns`), ou en Arrow IPC (une colonne par champ de PropertyData).
+    """
+    timer = RequestTimer(getattr(request.state, "t_start", None))
     try:
-        # 1. Préparation des données
-        input_dict = data.model_dump()
-        df_input = pd.DataFrame([input_dict])
-        
-        print(f"\n📥 Input reçu: {input_dict}")
-        
-        # 1b. Conserver le type utilisé à l'entraînement (string)
-        #    Les catégories du OneHotEncoder sont des strings
-        df_input["neighborhood"] = df_input["neighborhood"].astype("string")
-        print(f"   neighborhood (dtype string): {df_input['neighborhood'].iloc[0]}")
-        
-        # 2. Sélectionner les 10 colonnes dans le bon ordre
-        useful_features = [
-            "sq_mt_built", "n_rooms", "n_bathrooms", "neighborhood",
-            "has_lift", "has_parking", "has_pool", "has_garden",
-            "has_storage_room", "is_floor_under"
-        ]
-        df_final = df_input[useful_features]
-        
-        print(f"📋 DataFrame:\n{df_final}")
-        print(f"   Types: {df_final.dtypes.to_dict()}")
-        
-        # 3. Transformation par le preprocessor
-        if preprocessor is None:
-            print("⚠️ Preprocessor non chargé — tentative de rechargement à la volée...")
+        fmt, out_fmt = _formats(request, (JSON, MSGPACK, ARROW))
+    except FormatNonSupporte as e:
+        _fin_requete("/predict/batch", timer, "error", error=str(e))
+        return JSONResponse(status_code=415, content={"error": str(e)})
+    body = await request.body()
+    batch = None if fmt == ARROW else _lire_corps(body, fmt, BatchRequest)
+    timer.mark("validate")
+    result = await run_in_threadpool(_predire_lot, batch, body if fmt == ARROW else None, out_fmt, timer)
+    if out_fmt == ARROW:
+        # Les erreurs portant sur tout le lot restent en JSON
+        return result
+    return encoder(result, out_fmt)
+
+
+def _predire_lot(batch: Optional[BatchRequest], arrow_body: Optional[bytes], out_fmt: str, timer: RequestTimer) -> Any:
+    """Valide, prédit et met en forme un lot (BatchRequest décodée, ou corps Arrow IPC)."""
+    try:
+        try:
+            # 1. Validation (par ligne, vectorisée, ou colonnes Arrow lues sans dictionnaire par ligne)
+            if arrow_body is not None:
+                table = lire_table_arrow(arrow_body)
+                n_rows = table.num_rows
+            elif (batch.items is None) == (batch.columns is None):
+                err = "Fournir exactement un des champs 'items' ou 'columns'"
+                _fin_requete("/predict/batch", timer, "error", error=err)
+                return {"error": err}
+            elif batch.items is not None:
+                n_rows = len(batch.items)
+            else:
+                # Seules les colonnes du modèle comptent (les autres clés sont ignorées, comme en Arrow)
+                n_rows = max((len(v) for c, v in batch.columns.items() if c in INPUT_COLUMNS), default=0)
+            if n_rows > MAX_BATCH_SIZE:
+                err = f"Lot trop volumineux : {n_rows} lignes (max {MAX_BATCH_SIZE})"
+                _fin_requete("/predict/batch", timer, "error", error=err)
+                return {"error": err}
+            if arrow_body is not None:
+                X_all, valid_rows, errors = matrice_arrow(table, INPUT_COLUMNS, REQUIRED_COLUMNS)
+                index = np.flatnonzero(valid_rows)
+                X_rows = X_all if len(index) == n_rows else X_all[valid_rows]
+            else:
+                if batch.items is not None:
+                    df_valid, errors = _valider_lignes(batch.items)
+                else:
+                    df_valid, errors = _valider_colonnes(batch.columns)
+                index = df_valid.index.to_numpy()
+                X_rows = df_valid[INPUT_COLUMNS].to_numpy(dtype=np.int64)
+        except (ValueError, pa.ArrowException) as e:
+            # Erreur du client (colonnes de longueurs différentes, corps Arrow illisible...) : 422 sans trace
+            _fin_requete("/predict/batch", timer, "error", error=str(e))
+            return JSONResponse(status_code=422, content={"error": str(e)})
+        timer.mark("validate")
+
+        if serving is None:
             load_assets()
-            if preprocessor is None:
+            if serving is None:
                 err = "Preprocessor introuvable sur le serveur. Vérifier les chemins /models"
-                print(f"❌ {err}")
+                _fin_requete("/predict/batch", timer, "error", error=err)
                 return {"error": err}
 
-        X_processed = preprocessor.transform(df_final)
-        
-        print(f"✅ Preprocessing OK - shape: {X_processed.shape}")
-        print(f"   Min: {X_processed.min():.6f}, Max: {X_processed.max():.6f}")
-        print(f"   Valeurs (premiers 15): {X_processed[0][:15]}")
-        
-        # 4. Prédiction (en LOG)
-        prediction_log = model.predict(X_processed)[0]
-        
-        print(f"📊 Prédiction LOG: {prediction_log:.6f}")
-        
-        # 5. Vérifier que la prédiction est valide
-        if np.isnan(prediction_log) or np.isinf(prediction_log):
-            print(f"❌ Prédiction LOG invalide: {prediction_log}")
-            return {"error": f"Prédiction invalide: {prediction_log}"}
-        
-        # 6. Conversion inverse (LOG1P -> EUROS)
-        prediction_euros = np.expm1(prediction_log)
-        
-        print(f"💰 Prédiction EUROS: {prediction_euros:.2f}")
-        
-        # Vérifier le résultat final
-        if np.isnan(prediction_euros) or np.isinf(prediction_euros):
-            print(f"❌ Prix final invalide: {prediction_euros}")
-            return {"error": f"Prix final invalide après conversion"}
-        
-        return {
-            "prediction": float(prediction_euros),
-            "prediction_log": float(prediction_log),
-            "status": "success"
-        }
+        with _version_courante() as state:
+            # 2. Préprocesseur + modèle + conversion inverse : une seule passe
+            preds_log = preds_euros = np.empty(0)
+            valid = np.zeros(0, dtype=bool)
+            if len(X_rows) > 0:
+                observer_quartiers(X_rows[:, INPUT_COLUMNS.index("neighborhood")])
+                preds_log = _predire_log(X_rows, state, timer)
+                with np.errstate(over="ignore", invalid="ignore"):
+                    preds_euros = np.expm1(preds_log)
+                valid = np.isfinite(preds_log) & np.isfinite(preds_euros)
+                for i, p_log in zip(index[~valid], preds_log[~valid]):
+                    errors[int(i)] = f"Prédiction invalide: {p_log}"
+
+            # 3. Résultats par ligne (erreurs comprises)
+            summary = {
+                "n_rows": n_rows,
+                "n_success": n_rows - len(errors),
+                "n_errors": len(errors),
+                "model_version": state.bundle.version,
+                "status": "success",
+            }
+            if out_fmt == ARROW:
+                response = _resultats_arrow(n_rows, index, preds_log, preds_euros, valid, errors, summary)
+            else:
+                response = {"results": _resultats_lignes(n_rows, index, preds_log, preds_euros, valid, errors), **summary}
+            timer.mark("postprocess")
+
+            _fin_requete(
+                "/predict/batch", timer, "success", echantillonner(),
+                n_rows=n_rows, n_errors=len(errors), model_version=state.bundle.version,
+            )
+            return response
+
+    except QueueFullError as e:
+        _fin_requete("/predict/batch", timer, "rejected", error=str(e))
+        return JSONResponse(status_code=503, content={"error": str(e)})
 
     except Exception as e:
-        print(f"❌ Erreur: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Erreur /predict/batch : {e}")
+        _fin_requete("/predict/batch", timer, "error", error=str(e))
         return {"error": str(e)}
 
+
+def _resultats_lignes(
+    n_rows: int, index: np.ndarray, preds_log: np.ndarray, preds_euros: np.ndarray, valid: np.ndarray, errors: dict[int, str]
+) -> list[dict[str, Any]]:
+    """Résultats JSON / msgpack : un dictionnaire par ligne, dans l'ordre d'entrée."""
+    results: list[dict[str, Any]] = [{} for _ in range(n_rows)]
+    for i, p_log, p_eur in zip(index[valid].tolist(), preds_log[valid].tolist(), preds_euros[valid].tolist()):
+        results[i] = {"index": i, "prediction": p_eur, "prediction_log": p_log, "status": "success"}
+    for i, err in errors.items():
+        results[i] = {"index": i, "error": err, "status": "error"}
+    return results
+
+
+def _resultats_arrow(
+    n_rows: int,
+    index: np.ndarray,
+    preds_log: np.ndarray,
+    preds_euros: np.ndarray,
+    valid: np.ndarray,
+    errors: dict[int, str],
+    summary: dict[str, Any],
+) -> Any:
+    """Résultats Arrow IPC : colonnes index, prediction, prediction_log, status, error (+ résumé en métadonnées)."""
+    ok = np.zeros(n_rows, dtype=bool)
+    ok[index[valid]] = True
+    prediction = np.full(n_rows, np.nan)
+    prediction_log = np.full(n_rows, np.nan)
+    prediction[index] = preds_euros
+    prediction_log[index] = preds_log
+    messages: list[Optional[str]] = [None] * n_rows
+    for i, err in errors.items():
+        messages[i] = err
+    return reponse_arrow(
+        {
+            "index": np.arange(n_rows, dtype=np.int64),
+            "prediction": pa.array(prediction, mask=~ok),
+            "prediction_log": pa.array(prediction_log, mask=~ok),
+            "status": pa.DictionaryArray.from_arrays(ok.astype(np.int8), ["error", "success"]),
+            "error": pa.array(messages, type=pa.string()),
+        },
+        summary,
+    )
+
+
+# --- FONCTIONS DU MODE STREAMING (NDJSON) ---
+class FluxNDJSONResponse(StreamingResponse):
+    """Réponse NDJSON produite pendant la lecture du corps de la requête.
+
+    StreamingResponse écoute `receive` en parallèle pour détecter la déconnexion
+    du client (serveurs ASGI < 2.4), ce qui consommerait le corps encore à lire :
+    ici, c'est la lecture du corps elle-même (`request.stream()`) qui la détecte.
+    """
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        await self.stream_response(send)
+
+async def _lignes_ndjson(request: Request) -> AsyncIterator[bytes]:
+    """Découpe le corps de la requête en lignes au fil de la réception (lignes vides ignorées)."""
+    buffer = b""
+    async for part in request.stream():
+        buffer += part
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > STREAM_MAX_LINE_BYTES:
+            raise ValueError(f"Ligne NDJSON de plus de {STREAM_MAX_LINE_BYTES} octets")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _scorer_bloc_ndjson(lines: list[bytes], offset: int, state: ServingState, timer: RequestTimer) -> tuple[bytes, int]:
+    """Parse, valide et score un bloc de lignes NDJSON ; retourne (réponse NDJSON du bloc, nb d'erreurs).
+
+    Chaque ligne est un PropertyData, éventuellement enveloppé dans {"payload": ...}.
+    """
+    items: list[dict[str, Any]] = []
+    positions: list[int] = []
+    errors: dict[int, str] = {}
+    for i, line in enumerate(lines):
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            errors[i] = f"JSON invalide : {e}"
+            continue
+        if isinstance(item, dict) and isinstance(item.get("payload"), dict):
+            item = item["payload"]
+        if not isinstance(item, dict):
+            errors[i] = "Objet JSON attendu"
+            continue
+        items.append(item)
+        positions.append(i)
+    df_valid, invalid = _valider_lignes(items)
+    for j, err in invalid.items():
+        errors[positions[j]] = err
+    timer.mark("validate")
+
+    out: list[Optional[str]] = [None] * len(lines)
+    if len(df_valid) > 0:
+        X_rows = df_valid[INPUT_COLUMNS].to_numpy(dtype=np.int64)
+        observer_quartiers(X_rows[:, INPUT_COLUMNS.index("neighborhood")])
+        preds_log = _predire_log(X_rows, state, timer)
+        with np.errstate(over="ignore", invalid="ignore"):
+            preds_euros = np.expm1(preds_log)
+        valid = np.isfinite(preds_log) & np.isfinite(preds_euros)
+        for j, p_log, p_eur, ok in zip(df_valid.index, preds_log.tolist(), preds_euros.tolist(), valid):
+            i = positions[j]
+            if ok:
+                # repr d'un float fini = sa représentation JSON
+                out[i] = f'{{"index":{offset + i},"prediction":{p_eur!r},"prediction_log":{p_log!r},"status":"success"}}'
+            else:
+                errors[i] = f"Prédiction invalide: {p_log}"
+    for i, err in errors.items():
+        out[i] = json.dumps({"index": offset + i, "error": err, "status": "error"}, ensure_ascii=False)
+    timer.mark("postprocess")
+    return ("\n".join(out) + "\n").encode(), len(errors)
+
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    """Prédictions d'un flux NDJSON (une ligne PropertyData par bien), renvoyées en NDJSON.
+
+    Les lignes sont lues, scorées et renvoyées par blocs de STREAM_CHUNK_SIZE :
+    le bloc suivant n'est lu qu'une fois le précédent transmis au client
+    (contre-pression), la mémoire reste donc bornée par la taille d'un bloc.
+    La dernière ligne résume le flux (nombre de lignes, d'erreurs, version).
+    """
+    timer = RequestTimer(getattr(request.state, "t_start", None))
+    if serving is None:
+        await run_in_threadpool(load_assets)
+        if serving is None:
+            err = "Preprocessor introuvable sur le serveur. Vérifier les chemins /models"
+            _fin_requete("/predict/stream", timer, "error", error=err)
+            return {"error": err}
+
+    async def generer() -> AsyncIterator[bytes]:
+        n_rows = n_errors = 0
+        status, error = "success", None
+        # Tout le flux est servi par la version capturée à son début
+        with _version_courante() as state:
+            try:
+                lines: list[bytes] = []
+                lines_iter = _lignes_ndjson(request)
+                while True:
+                    line = await anext(lines_iter, None)
+                    if line is not None:
+                        lines.append(line)
+                    if lines and (line is None or len(lines) >= STREAM_CHUNK_SIZE):
+                        # receive : attente du corps de la requête ; send : envoi au client (contre-pression)
+                        timer.mark("receive")
+                        while True:
+                            try:
+                                body, errs = await run_in_threadpool(_scorer_bloc_ndjson, lines, n_rows, state, timer)
+                                break
+                            except QueueFullError:
+                                # File d'inférence pleine : le flux attend au lieu d'échouer
+                                await asyncio.sleep(0.01)
+                        n_rows += len(lines)
+                        n_errors += errs
+                        lines = []
+                        yield body
+                        timer.mark("send")
+                    if line is None:
+                        break
+            except Exception as e:
+                logger.exception(f"❌ Erreur /predict/stream : {e}")
+                status, error = "error", str(e)
+                yield (json.dumps({"error": error, "status": "error"}, ensure_ascii=False) + "\n").encode()
+            summary = {
+                "n_rows": n_rows,
+                "n_success": n_rows - n_errors,
+                "n_errors": n_errors,
+                "model_version": state.bundle.version,
+                "status": "done" if status == "success" else "error",
+            }
+            yield (json.dumps(summary) + "\n").encode()
+            _fin_requete(
+                "/predict/stream", timer, status, echantillonner(),
+                n_rows=n_rows, n_errors=n_errors, model_version=state.bundle.version,
+                **({"error": error} if error else {}),
+            )
+
+    return FluxNDJSONResponse(generer(), media_type="application/x-ndjson")
+
     # --- Cartouche ---
     # Fichier : api.py
     # Rôle : API de prédiction (FastAPI)
@@ -0,0 +1,169 @@
+"""Encodages des requêtes et réponses de l'API : JSON, msgpack, Arrow IPC.
+
+- JSON (défaut) ;
+- msgpack (`application/msgpack`) : même structure que le JSON, plus compact et
+  plus rapide à décoder, pour les requêtes unitaires et les petits lots ;
+- Arrow IPC (`application/vnd.apache.arrow.stream`, format stream ou file) :
+  lots en colonnes, lues directement dans la matrice (n, 10) du modèle, sans
+  dictionnaire ni objet Python par ligne.
+
+Le format de la requête est donné par `Content-Type`, celui de la réponse par
+`Accept` (à défaut, le même que la requête). msgpack est déclaré dans
+pyproject.toml ; s'il manque dans l'environnement, ce format répond 415.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+from fastapi import Response
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.file": ARROW,
+}
+# Signature du format Arrow "file" (le format "stream" n'en a pas)
+ARROW_FILE_MAGIC = b"ARROW1"
+
+
+class FormatNonSupporte(ValueError):
+    """Type de contenu non pris en charge par la route (réponse 415)."""
+
+
+def _msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError as e:
+        raise FormatNonSupporte("msgpack n'est pas installé sur le serveur (uv sync)") from e
+    return msgpack
+
+
+def _msgpack_disponible() -> bool:
+    try:
+        _msgpack()
+    except FormatNonSupporte:
+        return False
+    return True
+
+
+def _normaliser(media_type: str) -> str:
+    media_type = media_type.split(";")[0].strip().lower()
+    if media_type.endswith("+json"):
+        return JSON
+    return _ALIASES.get(media_type, media_type)
+
+
+def format_requete(content_type: Optional[str], autorises: Sequence[str] = (JSON, MSGPACK)) -> str:
+    """Format du corps de la requête d'après `Content-Type` (absent = JSON)."""
+    fmt = _normaliser(content_type) if content_type else JSON
+    if fmt not in autorises:
+        raise FormatNonSupporte(f"Content-Type non pris en charge : {content_type} (acceptés : {', '.join(autorises)})")
+    if fmt == MSGPACK:
+        _msgpack()
+    return fmt
+
+
+def format_reponse(accept: Optional[str], defaut: str, autorises: Sequence[str] = (JSON, MSGPACK)) -> str:
+    """Format de la réponse : premier type d'`Accept` pris en charge, sinon celui de la requête."""
+    if accept:
+        for part in accept.split(","):
+            fmt = _normaliser(part)
+            if fmt in autorises and (fmt != MSGPACK or _msgpack_disponible()):
+                return fmt
+    return defaut if defaut in autorises else JSON
+
+
+def decoder(body: bytes, fmt: str) -> Any:
+    """Décode un corps JSON ou msgpack en objets Python."""
+    if fmt == MSGPACK:
+        return _msgpack().unpackb(body)
+    return json.loads(body)
+
+
+def encoder(result: Any, fmt: str) -> Any:
+    """Encode le résultat d'une route (dict ou JSONResponse) dans le format négocié.
+
+    En JSON, le résultat est retourné tel quel (encodé par FastAPI).
+    """
+    if fmt == JSON:
+        return result
+    status_code = 200
+    if isinstance(result, Response):
+        status_code, result = result.status_code, json.loads(result.body)
+    return Response(_msgpack().packb(result), status_code=status_code, media_type=MSGPACK)
+
+
+def lire_table_arrow(body: bytes) -> pa.Table:
+    """Lit un corps Arrow IPC (format stream ou file) ; les buffers restent ceux du corps reçu."""
+    buffer = pa.py_buffer(body)
+    if body[:len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+        return pa.ipc.open_file(buffer).read_all()
+    return pa.ipc.open_stream(buffer).read_all()
+
+
+def matrice_arrow(
+    table: pa.Table, columns: list[str], required: list[str]
+) -> tuple[np.ndarray, np.ndarray, dict[int, str]]:
+    """Valide un lot Arrow et le range dans la matrice (n, 10) du modèle.
+
+    Mêmes règles que PropertyData : colonnes binaires absentes = 0, valeur nulle,
+    non numérique ou non entière = ligne invalide. Chaque colonne est lue sans
+    copie (colonne entière sans nulls) puis écrite une seule fois dans la matrice.
+    Retourne (matrice int64, masque des lignes valides, erreurs par ligne).
+    """
+    missing = [c for c in required if c not in table.column_names]
+    if missing:
+        raise ValueError(f"Colonnes obligatoires manquantes : {missing}")
+    n_rows = table.num_rows
+    X = np.zeros((n_rows, len(columns)), dtype=np.int64)
+    invalid = np.zeros(n_rows, dtype=bool)
+    bad_columns: dict[str, np.ndarray] = {}
+    for j, col in enumerate(columns):
+        if col not in table.column_names:
+            continue
+        values = table.column(col)
+        if values.num_chunks != 1:
+            values = values.combine_chunks()
+        else:
+            values = values.chunk(0)
+        kind = values.type
+        if not (pa.types.is_integer(kind) or pa.types.is_floating(kind) or pa.types.is_boolean(kind)):
+            raise ValueError(f"Colonne {col} : type Arrow {kind} non numérique")
+        bad = values.is_null().to_numpy(zero_copy_only=False) if values.null_count else None
+        if values.null_count:
+            values = values.fill_null(0)
+        data = values.to_numpy(zero_copy_only=not pa.types.is_boolean(kind))
+        if pa.types.is_floating(kind):
+            non_integer = ~np.isfinite(data) | (data != np.round(data))
+            bad = non_integer if bad is None else bad | non_integer
+            data = np.where(non_integer, 0, data)
+        X[:, j] = data
+        if bad is not None and bad.any():
+            bad_columns[col] = bad
+            invalid |= bad
+    errors = {
+        int(i): "; ".join(f"{col}: valeur entière attendue" for col, bad in bad_columns.items() if bad[i])
+        for i in np.flatnonzero(invalid)
+    }
+    return X, ~invalid, errors
+
+
+def reponse_arrow(columns: dict[str, Any], metadata: dict[str, Any]) -> Response:
+    """Réponse Arrow IPC (format stream) : une colonne par champ, métadonnées de schéma."""
+    table = pa.table(columns).replace_schema_metadata({k: str(v) for k, v in metadata.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW)
+
+# --- Cartouche ---
+# Fichier : api_codecs.py
+# Rôle : négociation et encodages JSON / msgpack / Arrow IPC de l'API
+# Date : 2026-10-17
@@ -0,0 +1,135 @@
+"""Journalisation structurée et échantillonnée des requêtes de l'API.
+
+Chaque requête échantillonnée produit une seule ligne JSON avec le détail des
+temps par étape (validate / preprocess / predict / postprocess). Le mode debug
+restaure le dump détaillé (entrée, matrice transformée, prédictions), mais
+uniquement pour les requêtes échantillonnées.
+
+Variables d'environnement :
+- LOG_LEVEL : niveau du logger (défaut INFO)
+- LOG_SAMPLE_RATE : proportion de requêtes journalisées, entre 0 et 1 (défaut 1.0)
+- LOG_DEBUG : 1 pour activer le dump détaillé des requêtes échantillonnées
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_DEBUG = os.getenv("LOG_DEBUG", "0") == "1"
+
+logger = logging.getLogger("apartment_hunter.api")
+
+
+def configurer_logging() -> logging.Logger:
+    """Configure le logger de l'API (une ligne brute par message, sur stdout)."""
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG if LOG_DEBUG else LOG_LEVEL)
+    # Évite les doublons avec les handlers d'uvicorn
+    logger.propagate = False
+    return logger
+
+
+def echantillonner() -> bool:
+    """Tire au sort si la requête courante doit être journalisée."""
+    return LOG_SAMPLE_RATE >= 1.0 or random.random() < LOG_SAMPLE_RATE
+
+
+class RequestTimer:
+    """Chronomètre par étapes : chaque `mark` enregistre le temps écoulé depuis le précédent."""
+
+    __slots__ = ("start", "timings", "_last")
+
+    def __init__(self, start: Optional[float] = None):
+        self.start = start if start is not None else time.perf_counter()
+        self.timings: dict[str, float] = {}
+        self._last = self.start
+
+    def mark(self, stage: str) -> None:
+        """Clôt l'étape `stage` (cumulée si elle est marquée plusieurs fois)."""
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    def mark_split(self, durations: dict[str, float], remainder: str) -> None:
+        """Clôt l'intervalle courant en le répartissant entre des étapes mesurées ailleurs.
+
+        Sert pour l'inférence exécutée dans un pool : les durées mesurées dans le
+        worker sont attribuées à leurs étapes, le reste (attente) à `remainder`.
+        """
+        now = time.perf_counter()
+        elapsed = now - self._last
+        for stage, duration in durations.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + duration
+        self.timings[remainder] = self.timings.get(remainder, 0.0) + max(elapsed - sum(durations.values()), 0.0)
+        self._last = now
+
+    def total(self) -> float:
+        """Temps total écoulé depuis le début de la requête (secondes)."""
+        return time.perf_counter() - self.start
+
+
+def log_requete(route: str, timer: RequestTimer, status: str, **fields: Any) -> None:
+    """Émet la ligne JSON structurée d'une requête."""
+    record = {
+        "event": "request",
+        "route": route,
+        "status": status,
+        "total_ms": round(timer.total() * 1e3, 3),
+        "timings_ms": {k: round(v * 1e3, 3) for k, v in timer.timings.items()},
+    }
+    record.update(fields)
+    logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def log_dump_debug(input_dict: dict[str, Any], X_processed: Any, prediction_log: Any) -> None:
+    """Dump détaillé d'une requête (mode debug, requêtes échantillonnées seulement)."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    # CSR (sortie du préprocesseur) : seule la première ligne est densifiée (~145 valeurs)
+    is_sparse = hasattr(X_processed, "toarray")
+    row = X_processed[:1].toarray().ravel() if is_sparse else np.asarray(X_processed)[0]
+    logger.debug(json.dumps({
+        "event": "debug_dump",
+        "input": input_dict,
+        "shape": list(X_processed.shape),
+        "format": X_processed.format if is_sparse else "dense",
+        "nnz": int(X_processed.nnz) if is_sparse else int(np.count_nonzero(X_processed)),
+        "min": float(X_processed.min()),
+        "max": float(X_processed.max()),
+        "first_values": [float(v) for v in row[:15]],
+        "prediction_log": float(prediction_log),
+    }, ensure_ascii=False))
+
+
+class HorodatageMiddleware:
+    """Middleware ASGI minimal : horodate la réception de la requête.
+
+    Le temps entre cet horodatage et l'entrée dans la route couvre la lecture du
+    corps JSON et la validation pydantic (étape "validate").
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] == "http":
+            scope.setdefault("state", {})["t_start"] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+# --- Cartouche ---
+# Fichier : api_logging.py
+# Rôle : logs structurés et échantillonnés de l'API
+# Date : 2026-10-17
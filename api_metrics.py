@@ -0,0 +1,101 @@
+"""Métriques Prometheus de l'API (route `/metrics`).
+
+- requêtes par route et code HTTP, requêtes en cours et durée totale (jusqu'à
+  l'envoi de la réponse, encodage JSON compris) : middleware ASGI ;
+- erreurs par route, durée de chaque étape de `/predict` et `/predict/batch`
+  (validate = validation pydantic, lookup, preprocess, predict, queue,
+  postprocess = expm1 + contrôles NaN/inf) et source des prédictions :
+  `observer_requete` en fin de requête, à partir du `RequestTimer` ;
+- trafic par quartier ;
+- état du modèle, du cache et du pool : collecteur évalué à la lecture de `/metrics`.
+
+Une observation coûte quelques microsecondes (dictionnaire + verrou) : toutes
+les requêtes sont comptées, indépendamment de l'échantillonnage des logs.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+from api_logging import RequestTimer
+from metrics import Registry
+
+PREFIX = "apartment_hunter"
+# Routes suivies individuellement ; les autres chemins sont regroupés sous "other"
+ROUTES = {"/", "/predict", "/predict/batch", "/predict/stream", "/metrics", "/admin/reload"}
+STAGE_BUCKETS_S = [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+REQUEST_BUCKETS_S = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+# Nombre maximal de quartiers suivis (au-delà, les identifiants sont regroupés sous "other")
+MAX_NEIGHBORHOODS = 300
+
+REGISTRE = Registry()
+REQUESTS = REGISTRE.counter(f"{PREFIX}_requests_total", "Requêtes HTTP par route et code de réponse", ["route", "code"])
+IN_FLIGHT = REGISTRE.gauge(f"{PREFIX}_requests_in_flight", "Requêtes en cours de traitement", ["route"])
+REQUEST_SECONDS = REGISTRE.histogram(
+    f"{PREFIX}_request_duration_seconds", "Durée totale des requêtes (encodage JSON compris)", REQUEST_BUCKETS_S, ["route"]
+)
+ERRORS = REGISTRE.counter(f"{PREFIX}_errors_total", "Requêtes en erreur (error) ou rejetées (rejected)", ["route", "status"])
+STAGE_SECONDS = REGISTRE.histogram(
+    f"{PREFIX}_stage_duration_seconds", "Durée de chaque étape de prédiction", STAGE_BUCKETS_S, ["route", "stage"]
+)
+PREDICTIONS = REGISTRE.counter(f"{PREFIX}_predictions_total", "Prédictions de /predict par source (model, cache, disk_cache, table)", ["route", "source"])
+NEIGHBORHOODS = REGISTRE.counter(
+    f"{PREFIX}_neighborhood_requests_total", "Biens estimés par quartier", ["neighborhood"], max_series=MAX_NEIGHBORHOODS
+)
+
+
+def observer_requete(route: str, timer: RequestTimer, status: str, source: Optional[str] = None) -> None:
+    """Enregistre les durées par étape et le statut d'une requête terminée."""
+    for stage, duration in timer.timings.items():
+        STAGE_SECONDS.observe(route, stage, value=duration)
+    if status != "success":
+        ERRORS.inc(route, status)
+    elif source is not None:
+        PREDICTIONS.inc(route, source)
+
+
+def observer_quartiers(neighborhoods: Any) -> None:
+    """Compte le trafic par quartier (un identifiant ou un tableau d'identifiants)."""
+    if np.isscalar(neighborhoods):
+        NEIGHBORHOODS.inc(int(neighborhoods))
+        return
+    values, counts = np.unique(np.asarray(neighborhoods), return_counts=True)
+    for value, count in zip(values, counts):
+        NEIGHBORHOODS.inc(int(value), value=int(count))
+
+
+class MetriquesMiddleware:
+    """Middleware ASGI : compteur, requêtes en cours et durée totale par route."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = scope["path"] if scope["path"] in ROUTES else "other"
+        start = time.perf_counter()
+        code = 500
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal code
+            if message["type"] == "http.response.start":
+                code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc(route)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec(route)
+            REQUESTS.inc(route, code)
+            REQUEST_SECONDS.observe(route, value=time.perf_counter() - start)
+
+# --- Cartouche ---
+# Fichier : api_metrics.py
+# Rôle : métriques Prometheus de l'API
+# Date : 2026-10-17
@@ -0,0 +1,108 @@
+"""Micro-batching des requêtes /predict (regroupement dynamique).
+
+Les requêtes unitaires qui arrivent dans une même fenêtre de temps (par exemple
+2 ms), ou jusqu'à N éléments, partagent un seul appel vectorisé
+préprocesseur + modèle ; chaque appelant reçoit ensuite son propre résultat.
+
+Les histogrammes de taille de lot et de temps d'attente permettent d'ajuster
+la fenêtre (débit) par rapport à la latence p99.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+
+from metrics import Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+WAIT_TIME_BUCKETS_S = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1]
+
+
+class MicroBatcher:
+    """Regroupe les lignes soumises dans une fenêtre et lance une inférence vectorisée par lot.
+
+    `infer` est une coroutine qui reçoit une matrice (n, 10) et retourne
+    (log-prédictions, durée preprocess, durée predict).
+    """
+
+    def __init__(
+        self,
+        infer: Callable[[np.ndarray], Awaitable[tuple[np.ndarray, float, float]]],
+        window_s: float = 0.002,
+        max_batch: int = 32,
+    ):
+        self._infer = infer
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self._pending: list[tuple[tuple, asyncio.Future, float]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_times = Histogram(WAIT_TIME_BUCKETS_S)
+
+    async def submit(self, row: tuple) -> tuple[Any, float, float]:
+        """Ajoute une ligne au lot courant et attend (log-prédiction, durée preprocess, durée predict)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """Ferme le lot courant et lance son inférence en tâche de fond."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        task = asyncio.ensure_future(self._run(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: list[tuple[tuple, asyncio.Future, float]]) -> None:
+        """Inférence d'un lot puis distribution des résultats (ou de l'erreur) aux appelants."""
+        now = time.perf_counter()
+        self.batch_sizes.observe(len(items))
+        for _, _, enqueued_at in items:
+            self.wait_times.observe(now - enqueued_at)
+
+        X_rows = np.array([row for row, _, _ in items], dtype=np.int64)
+        try:
+            preds, t_pre, t_pred = await self._infer(X_rows)
+        except Exception as e:
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), pred in zip(items, preds):
+            # L'appelant a pu abandonner (client déconnecté)
+            if not future.done():
+                future.set_result((pred, t_pre, t_pred))
+
+    async def aclose(self) -> None:
+        """Vide le lot en attente et attend la fin des inférences en cours."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        """Paramètres et histogrammes exposés sur la route de santé."""
+        return {
+            "window_ms": self.window_s * 1e3,
+            "max_batch": self.max_batch,
+            "batch_size": self.batch_sizes.snapshot(),
+            "wait_time_s": self.wait_times.snapshot(),
+        }
+
+# --- Cartouche ---
+# Fichier : batching.py
+# Rôle : micro-batching des requêtes unitaires de l'API
+# Date : 2026-10-17
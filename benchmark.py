@@ -0,0 +1,413 @@
+"""Banc de charge et de latence de l'API (rejeu de payloads PropertyData).
+
+Rejoue des payloads enregistrés (fichier NDJSON : un objet PropertyData par
+ligne, ou `{"payload": {...}}`) ou synthétiques contre l'API :
+- en processus (`--mode inprocess`) : client ASGI httpx, sans réseau ;
+- via un uvicorn local (`--mode uvicorn`) : serveur lancé en sous-processus.
+
+Pour chaque scénario (route unitaire ou batch, cache activé ou non) : débit,
+latences p50/p95/p99 côté client, coût de chaque étape (lu dans les logs
+structurés de l'API : validate, lookup, preprocess, predict, postprocess...)
+et coût d'encodage JSON de la réponse. Chaque scénario ajoute une ligne au
+fichier de résultats (NDJSON) avec le commit courant, pour comparer les
+commits entre eux.
+
+Nécessite httpx (déclaré dans le groupe dev de pyproject.toml : `uv sync`).
+
+Usage :
+    uv run python benchmark.py --mode inprocess --concurrency 16 --n-rows 2000
+    uv run python benchmark.py --mode uvicorn --endpoints single,batch --cache on,off
+    uv run python benchmark.py --payloads payloads.jsonl --output benchmark_results.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = ROOT / "benchmark_results.jsonl"
+
+PAYLOAD_FIELDS = [
+    "sq_mt_built", "n_rooms", "n_bathrooms", "neighborhood",
+    "has_lift", "has_parking", "has_pool", "has_garden",
+    "has_storage_room", "is_floor_under",
+]
+REQUIRED_FIELDS = PAYLOAD_FIELDS[:4]
+
+
+# --- PAYLOADS ---
+def charger_payloads(path: Path) -> tuple[list[dict[str, Any]], int]:
+    """Lit un fichier NDJSON de payloads ; retourne (payloads, nombre de lignes ignorées)."""
+    payloads = []
+    skipped = 0
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                skipped += 1
+                continue
+            # Payload seul ou enregistrement {"payload": {...}}
+            if isinstance(obj, dict):
+                obj = obj.get("payload", obj)
+            if isinstance(obj, dict) and all(k in obj for k in REQUIRED_FIELDS):
+                payloads.append({k: obj[k] for k in PAYLOAD_FIELDS if k in obj})
+            else:
+                skipped += 1
+    return payloads, skipped
+
+
+def payloads_synthetiques(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Génère `n` payloads PropertyData plausibles (surface, pièces, quartier, équipements)."""
+    rng = np.random.default_rng(seed)
+    columns = {
+        "sq_mt_built": rng.integers(30, 300, n),
+        "n_rooms": rng.integers(1, 6, n),
+        "n_bathrooms": rng.integers(1, 4, n),
+        "neighborhood": rng.integers(1, 130, n),
+    }
+    for col in PAYLOAD_FIELDS[4:]:
+        columns[col] = rng.integers(0, 2, n)
+    return [{col: int(columns[col][i]) for col in PAYLOAD_FIELDS} for i in range(n)]
+
+
+def construire_requetes(payloads: list[dict[str, Any]], endpoint: str, n_rows: int, batch_size: int) -> list[tuple[str, dict, int]]:
+    """Requêtes (route, corps, nombre de lignes) couvrant `n_rows` lignes en bouclant sur les payloads."""
+    rows = list(itertools.islice(itertools.cycle(payloads), n_rows))
+    if endpoint == "single":
+        return [("/predict", row, 1) for row in rows]
+    return [
+        ("/predict/batch", {"items": rows[i:i + batch_size]}, len(rows[i:i + batch_size]))
+        for i in range(0, len(rows), batch_size)
+    ]
+
+
+# --- MESURES ---
+class CollecteurEtapes(logging.Handler):
+    """Récupère les lignes JSON `{"event": "request", ...}` émises par l'API."""
+
+    def __init__(self):
+        super().__init__()
+        self.records: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.ajouter_ligne(record.getMessage())
+
+    def ajouter_ligne(self, line: str) -> None:
+        if '"event": "request"' not in line:
+            return
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        with self._lock:
+            self.records.append(rec)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.records = []
+
+    def resume(self) -> tuple[dict[str, dict[str, float]], dict[str, int]]:
+        """Statistiques par étape (ms) et répartition des sources (model/cache/table)."""
+        with self._lock:
+            records = list(self.records)
+        stages: dict[str, list[float]] = {}
+        sources: dict[str, int] = {}
+        for rec in records:
+            for stage, ms in rec.get("timings_ms", {}).items():
+                stages.setdefault(stage, []).append(ms)
+            if "source" in rec:
+                sources[rec["source"]] = sources.get(rec["source"], 0) + 1
+        return {stage: percentiles(values) for stage, values in stages.items()}, sources
+
+
+def percentiles(values_ms: list[float]) -> dict[str, float]:
+    """Moyenne, p50, p95, p99 et max (ms)."""
+    if not values_ms:
+        return {}
+    arr = np.asarray(values_ms, dtype=float)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "mean": round(float(arr.mean()), 4),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "p99": round(float(p99), 4),
+        "max": round(float(arr.max()), 4),
+    }
+
+
+def cout_encodage(bodies: list[dict[str, Any]], repeat: int = 20) -> Optional[float]:
+    """Coût médian (ms) de l'encodage JSON d'une réponse par FastAPI (jsonable_encoder + rendu)."""
+    if not bodies:
+        return None
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    durations = []
+    for body in bodies:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            JSONResponse(content=jsonable_encoder(body)).body
+        durations.append((time.perf_counter() - start) / repeat)
+    return round(float(np.median(durations)) * 1e3, 4)
+
+
+async def rejouer(client: Any, requetes: list[tuple[str, dict, int]], concurrency: int) -> dict[str, Any]:
+    """Envoie les requêtes avec `concurrency` clients simultanés ; retourne latences et erreurs."""
+    latencies = np.zeros(len(requetes))
+    errors = 0
+    samples: list[dict[str, Any]] = []
+    counter = itertools.count()
+
+    async def worker() -> None:
+        nonlocal errors
+        while (i := next(counter)) < len(requetes):
+            path, body, _ = requetes[i]
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies[i] = time.perf_counter() - start
+            payload = response.json()
+            if response.status_code != 200 or "error" in payload:
+                errors += 1
+            elif len(samples) < 50:
+                samples.append(payload)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"duration_s": time.perf_counter() - start, "latencies_ms": latencies * 1e3, "errors": errors, "samples": samples}
+
+
+def resultat_scenario(
+    run: dict[str, Any],
+    requetes: list[tuple[str, dict, int]],
+    collecteur: CollecteurEtapes,
+    **config: Any,
+) -> dict[str, Any]:
+    """Assemble la ligne de résultats d'un scénario."""
+    n_rows = sum(r[2] for r in requetes)
+    stages, sources = collecteur.resume()
+    return {
+        **config,
+        "n_requests": len(requetes),
+        "n_rows": n_rows,
+        "duration_s": round(run["duration_s"], 4),
+        "throughput_rps": round(len(requetes) / run["duration_s"], 2),
+        "throughput_rows_s": round(n_rows / run["duration_s"], 2),
+        "errors": run["errors"],
+        "latency_ms": percentiles(list(run["latencies_ms"])),
+        "stages_ms": stages,
+        "encode_ms": cout_encodage(run["samples"]),
+        "sources": sources,
+    }
+
+
+# --- MODES D'EXÉCUTION ---
+async def scenarios_inprocess(args: argparse.Namespace, payloads: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Scénarios contre l'application chargée dans ce processus (client ASGI)."""
+    import httpx
+
+    # Le collecteur remplace la sortie standard du logger de l'API
+    collecteur = CollecteurEtapes()
+    logging.getLogger("apartment_hunter.api").addHandler(collecteur)
+    import api
+    from prediction_cache import PredictionCache
+
+    results = []
+    transport = httpx.ASGITransport(app=api.app)
+    async with api.lifespan(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for cache in args.cache:
+                size = api.PREDICTION_CACHE_SIZE if cache == "on" else 0
+                for endpoint in args.endpoints:
+                    api.prediction_cache = PredictionCache(max_entries=size, ttl_s=api.PREDICTION_CACHE_TTL)
+                    requetes = construire_requetes(payloads, endpoint, args.n_rows, args.batch_size)
+                    await rejouer(client, requetes[: args.warmup], args.concurrency)
+                    collecteur.reset()
+                    run = await rejouer(client, requetes, args.concurrency)
+                    results.append(resultat_scenario(
+                        run, requetes, collecteur,
+                        mode="inprocess", endpoint=endpoint, cache=cache,
+                        concurrency=args.concurrency, batch_size=args.batch_size if endpoint == "batch" else 1,
+                    ))
+                    afficher(results[-1])
+    return results
+
+
+def port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def demarrer_uvicorn(env: dict[str, str], collecteur: CollecteurEtapes, timeout_s: float = 120.0) -> tuple[subprocess.Popen, str]:
+    """Lance `uvicorn api:app` en sous-processus et attend que le modèle soit chargé."""
+    import httpx
+
+    port = port_libre()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--no-access-log", "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+
+    # Dernières lignes du serveur, pour diagnostiquer un échec de démarrage
+    tail: deque[str] = deque(maxlen=20)
+
+    def lire_sortie() -> None:
+        for line in proc.stdout:
+            tail.append(line)
+            collecteur.ajouter_ligne(line)
+
+    threading.Thread(target=lire_sortie, daemon=True).start()
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            time.sleep(0.2)
+            raise RuntimeError(f"uvicorn s'est arrêté (code {proc.returncode}) :\n{''.join(tail)}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).json().get("model_loaded"):
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise TimeoutError("uvicorn n'est pas prêt")
+
+
+async def scenarios_uvicorn(args: argparse.Namespace, payloads: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Scénarios contre un uvicorn local (un serveur par réglage du cache)."""
+    import httpx
+
+    results = []
+    for cache in args.cache:
+        env = dict(os.environ)
+        if cache == "off":
+            env["PREDICTION_CACHE_SIZE"] = "0"
+        collecteur = CollecteurEtapes()
+        proc, base_url = demarrer_uvicorn(env, collecteur)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+                for endpoint in args.endpoints:
+                    requetes = construire_requetes(payloads, endpoint, args.n_rows, args.batch_size)
+                    await rejouer(client, requetes[: args.warmup], args.concurrency)
+                    # Laisse arriver les derniers logs du préchauffage avant de remettre à zéro
+                    await asyncio.sleep(0.2)
+                    collecteur.reset()
+                    run = await rejouer(client, requetes, args.concurrency)
+                    await asyncio.sleep(0.2)
+                    results.append(resultat_scenario(
+                        run, requetes, collecteur,
+                        mode="uvicorn", endpoint=endpoint, cache=cache,
+                        concurrency=args.concurrency, batch_size=args.batch_size if endpoint == "batch" else 1,
+                    ))
+                    afficher(results[-1])
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return results
+
+
+# --- RAPPORT ---
+def afficher(result: dict[str, Any]) -> None:
+    """Résumé lisible d'un scénario."""
+    lat = result["latency_ms"]
+    print(
+        f"📊 {result['mode']} | {result['endpoint']:<6} | cache {result['cache']:<3} | "
+        f"{result['throughput_rps']:>9.1f} req/s | {result['throughput_rows_s']:>10.1f} lignes/s | "
+        f"p50 {lat['p50']:.2f} ms | p95 {lat['p95']:.2f} ms | p99 {lat['p99']:.2f} ms | erreurs {result['errors']}"
+    )
+    stages = " | ".join(f"{k} {v['mean']:.3f}" for k, v in result["stages_ms"].items())
+    print(f"   étapes (ms, moyenne) : {stages} | encode {result['encode_ms']} | sources {result['sources']}")
+
+
+def commit_courant() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    """Point d'entrée : préparation des payloads, exécution des scénarios, écriture des résultats."""
+    parser = argparse.ArgumentParser(description="Banc de charge et de latence de l'API.")
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--payloads", type=Path, default=None, help="Fichier NDJSON de payloads PropertyData")
+    parser.add_argument("--n-payloads", type=int, default=1000, help="Payloads synthétiques distincts")
+    parser.add_argument("--n-rows", type=int, default=2000, help="Lignes à prédire par scénario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=50, help="Requêtes de préchauffage (non mesurées)")
+    parser.add_argument("--endpoints", default="single,batch")
+    parser.add_argument("--cache", default="on,off")
+    parser.add_argument("--models-dir", default=None, help="Dossier des artefacts (MODELS_DIR)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+    args.cache = [c for c in args.cache.split(",") if c]
+
+    if args.payloads is not None:
+        payloads, skipped = charger_payloads(args.payloads)
+        print(f"📥 {len(payloads)} payloads lus dans {args.payloads} ({skipped} lignes ignorées)")
+        if not payloads:
+            raise SystemExit("❌ Aucun payload PropertyData dans le fichier")
+    else:
+        payloads = payloads_synthetiques(args.n_payloads, seed=args.seed)
+        print(f"🎲 {len(payloads)} payloads synthétiques")
+
+    # Les temps par étape viennent des logs structurés : toutes les requêtes sont journalisées
+    os.environ["LOG_SAMPLE_RATE"] = "1.0"
+    os.environ.setdefault("MODEL_WATCH_INTERVAL", "0")
+    if args.models_dir is not None:
+        os.environ["MODELS_DIR"] = args.models_dir
+    os.environ.setdefault("MODELS_DIR", str(ROOT / "models"))
+
+    runner = scenarios_inprocess if args.mode == "inprocess" else scenarios_uvicorn
+    results = asyncio.run(runner(args, payloads))
+
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit_courant(),
+        "payloads": str(args.payloads) if args.payloads else f"synthetic:{args.n_payloads}",
+        "env": {k: os.environ[k] for k in (
+            "SERVING_MODE", "INFERENCE_WORKERS", "MICRO_BATCHING", "USE_PRICE_TABLE",
+            "USE_COMPILED_PREPROCESSOR", "PREDICTION_CACHE_SIZE",
+        ) if k in os.environ},
+    }
+    with open(args.output, "a") as f:
+        for result in results:
+            f.write(json.dumps({**meta, **result}, ensure_ascii=False) + "\n")
+    print(f"✅ {len(results)} scénarios ajoutés à {args.output}")
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : benchmark.py
+# Rôle : banc de charge et de latence de l'API
+# Date : 2026-10-17
@@ -0,0 +1,430 @@
+"""Scoring en masse hors ligne (CSV / Feather / Parquet en entrée, fichier scoré en sortie).
+
+Charge les mêmes artefacts que l'API (`xgboost_model.ubj`/`.pkl` et
+`preprocessor.pkl`), lit le fichier d'entrée par blocs de taille fixe, score
+chaque bloc en un seul appel vectorisé (préprocesseur compilé + modèle) et
+écrit chaque bloc au fil de l'eau dans un fichier Feather ou Parquet avec une
+colonne `prediction` (euros) et `prediction_log`. La mémoire reste bornée par
+la taille d'un bloc, quelle que soit la taille du fichier.
+
+Entrées acceptées :
+- CSV brut (`raw_data/houses_madrid.csv`) : `neighborhood` est extrait de
+  `neighborhood_id`, les indicateurs True/False deviennent 1/0 ;
+- Feather / Parquet (par exemple `data_model/X_test.feather`).
+Les valeurs manquantes sont imputées par le préprocesseur, comme à l'entraînement.
+
+Mode parallèle (`--workers N`) : les blocs sont scorés par un pool de processus
+qui chargent chacun les artefacts une seule fois. Les données passent par des
+segments de mémoire partagée réutilisés (matrice d'entrée et prédictions),
+jamais par des DataFrames picklés ; les blocs sont écrits dans l'ordre d'entrée.
+`--scaling` mesure le débit et l'efficacité de 1 à N processus.
+
+Usage :
+    uv run python bulk_scoring.py raw_data/houses_madrid.csv scored.parquet --chunk-size 50000
+    uv run python bulk_scoring.py data_model/X_test.feather scored.feather --keep id
+    uv run python bulk_scoring.py raw_data/houses_madrid.csv scored.parquet --workers 8
+    uv run python bulk_scoring.py raw_data/houses_madrid.csv scored.parquet --workers 32 --scaling
+"""
+
+from __future__ import annotations
+
+import argparse
+import codecs
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from model_store import charger_modele, charger_preprocesseur, memoire_max_mo
+
+ROOT = Path(__file__).resolve().parent
+MODELS_DIR = Path(os.getenv("MODELS_DIR", ROOT / "models"))
+
+INPUT_COLUMNS = [
+    "sq_mt_built", "n_rooms", "n_bathrooms", "neighborhood",
+    "has_lift", "has_parking", "has_pool", "has_garden",
+    "has_storage_room", "is_floor_under",
+]
+ARROW_SUFFIXES = {".feather", ".arrow", ".ipc"}
+NEIGHBORHOOD_PATTERN = r"(?i)neighborhood\s+(\d+)"
+
+
+# --- LECTURE PAR BLOCS ---
+def colonnes_disponibles(path: Path) -> list[str]:
+    """Noms des colonnes du fichier d'entrée (sans lire les données)."""
+    if path.suffix.lower() == ".csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    import pyarrow.dataset as ds
+
+    return ds.dataset(path, format=_format_arrow(path)).schema.names
+
+
+def _format_arrow(path: Path) -> str:
+    return "parquet" if path.suffix.lower() == ".parquet" else "feather"
+
+
+def colonnes_a_lire(available: list[str], keep: list[str]) -> list[str]:
+    """Colonnes du modèle présentes dans le fichier (+ `neighborhood_id` à défaut de `neighborhood`)."""
+    wanted = [c for c in INPUT_COLUMNS if c in available]
+    if "neighborhood" not in available and "neighborhood_id" in available:
+        wanted.append("neighborhood_id")
+    missing = [c for c in keep if c not in available]
+    if missing:
+        raise ValueError(f"Colonnes à conserver absentes du fichier : {missing}")
+    return wanted + [c for c in keep if c not in wanted]
+
+
+def encodage_csv(path: Path, block_size: int = 16 << 20) -> str:
+    """Encodage du CSV : utf-8-sig si tout le fichier est de l'UTF-8 valide, sinon latin-1.
+
+    Le fichier est décodé par blocs d'octets (sans parsing CSV) avant la lecture,
+    pour choisir l'encodage une seule fois : un octet non UTF-8 en milieu de
+    fichier ne fait plus relire (et dupliquer) les blocs déjà produits.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        with open(path, "rb") as f:
+            while block := f.read(block_size):
+                decoder.decode(block)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "latin-1"
+    return "utf-8-sig"
+
+
+def lire_blocs(path: Path, chunk_size: int, columns: list[str]) -> Iterator[pd.DataFrame]:
+    """Lit le fichier par blocs d'au plus `chunk_size` lignes (seules les colonnes utiles sont lues)."""
+    if path.suffix.lower() == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size, encoding=encodage_csv(path))
+        return
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format=_format_arrow(path))
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+# --- PRÉPARATION ET SCORING ---
+def _vers_float(values: pd.Series) -> np.ndarray:
+    """Convertit une colonne en float (True/False -> 1/0, valeur illisible -> NaN)."""
+    if values.dtype == object or isinstance(values.dtype, pd.StringDtype):
+        numeric = pd.to_numeric(values, errors="coerce")
+        lowered = values.astype("string").str.strip().str.lower()
+        numeric = numeric.mask(lowered.eq("true").fillna(False), 1.0).mask(lowered.eq("false").fillna(False), 0.0)
+        return numeric.to_numpy(dtype=float, na_value=np.nan)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def preparer_matrice(chunk: pd.DataFrame) -> np.ndarray:
+    """Matrice (n, 10) float dans l'ordre du préprocesseur ; NaN = valeur manquante."""
+    X = np.full((len(chunk), len(INPUT_COLUMNS)), np.nan)
+    for j, col in enumerate(INPUT_COLUMNS):
+        if col in chunk.columns:
+            X[:, j] = _vers_float(chunk[col])
+        elif col == "neighborhood" and "neighborhood_id" in chunk.columns:
+            ids = chunk["neighborhood_id"].astype("string").str.extract(NEIGHBORHOOD_PATTERN)[0]
+            X[:, j] = pd.to_numeric(ids, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return X
+
+
+def transformer_matrice(X: np.ndarray, preprocessor: Any, compiled: Any) -> Any:
+    """Applique le préprocesseur (compilé si disponible, sinon sklearn) à une matrice float avec NaN."""
+    if compiled is not None:
+        return compiled.transform_array(X)
+    df = pd.DataFrame(X, columns=INPUT_COLUMNS)
+    # Mêmes catégories (strings d'entiers) qu'à l'entraînement
+    df["neighborhood"] = df["neighborhood"].astype("Int64").astype("string")
+    return preprocessor.transform(df)
+
+
+def scorer_matrice(X: np.ndarray, model: Any, preprocessor: Any, compiled: Any) -> tuple[np.ndarray, np.ndarray]:
+    """Un seul appel vectorisé ; retourne (prédictions en euros, prédictions en log)."""
+    preds_log = np.asarray(model.predict(transformer_matrice(X, preprocessor, compiled)))
+    with np.errstate(over="ignore", invalid="ignore"):
+        preds = np.expm1(preds_log)
+    # Même précision que les réponses de l'API (float32 du modèle)
+    return preds.astype(np.float64), preds_log.astype(np.float64)
+
+
+def charger_artefacts(models_dir: Path) -> tuple[Any, Any, Any, str]:
+    """Charge modèle, préprocesseur et préprocesseur compilé (mêmes fichiers que l'API)."""
+    from fast_preprocessing import compiler_preprocesseur, verifier_parite
+
+    model, model_format = charger_modele(models_dir / "xgboost_model.pkl")
+    preprocessor = charger_preprocesseur(models_dir / "preprocessor.pkl")
+    try:
+        compiled = compiler_preprocesseur(preprocessor, INPUT_COLUMNS)
+        verifier_parite(preprocessor, compiled, n_rows=256)
+    except Exception as e:
+        print(f"⚠️ Préprocesseur compilé indisponible, repli sur sklearn : {e}")
+        compiled = None
+    return model, preprocessor, compiled, model_format
+
+
+# --- ÉCRITURE ---
+class EcrivainBlocs:
+    """Écrit des blocs successifs dans un seul fichier Feather (IPC) ou Parquet."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._writer: Optional[Any] = None
+        self._schema: Optional[pa.Schema] = None
+
+    def ecrire(self, table: pa.Table) -> None:
+        if self._writer is None:
+            self._schema = table.schema
+            if self.path.suffix.lower() == ".parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            elif self.path.suffix.lower() in ARROW_SUFFIXES:
+                self._writer = pa.ipc.new_file(self.path, table.schema)
+            else:
+                raise ValueError("Sortie attendue en .feather, .arrow, .ipc ou .parquet")
+        # Les blocs d'un CSV peuvent inférer des types différents : on aligne sur le premier
+        self._writer.write_table(table.cast(self._schema))
+
+    def fermer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+def table_sortie(chunk: pd.DataFrame, X: np.ndarray, preds: np.ndarray, preds_log: np.ndarray, keep: list[str]) -> pa.Table:
+    """Bloc de sortie : colonnes conservées, 10 colonnes du modèle, prédictions."""
+    columns: dict[str, Any] = {col: chunk[col].to_numpy() for col in keep}
+    for j, col in enumerate(INPUT_COLUMNS):
+        columns[col] = X[:, j]
+    columns["prediction"] = preds
+    columns["prediction_log"] = preds_log
+    return pa.table(columns)
+
+
+# --- SCORING PARALLÈLE (MÉMOIRE PARTAGÉE) ---
+# Disposition d'un segment pour un bloc de n lignes : X (n, 10) puis sorties (2, n), en float64
+N_OUTPUTS = 2
+_worker_state: dict[str, Any] = {}
+
+
+def _vues_segment(buf: Any, n_rows: int) -> tuple[np.ndarray, np.ndarray]:
+    """Vues NumPy (sans copie) sur l'entrée et les sorties d'un segment partagé."""
+    X = np.ndarray((n_rows, len(INPUT_COLUMNS)), dtype=np.float64, buffer=buf)
+    out = np.ndarray((N_OUTPUTS, n_rows), dtype=np.float64, buffer=buf, offset=X.nbytes)
+    return X, out
+
+
+def _initialiser_worker(models_dir: str, n_threads: int) -> None:
+    """Initializer des processus : charge les artefacts une seule fois par worker."""
+    model, preprocessor, compiled, _ = charger_artefacts(Path(models_dir))
+    if n_threads > 0 and hasattr(model, "set_params"):
+        # Évite la sur-souscription : N processus x n_threads threads XGBoost
+        model.set_params(n_jobs=n_threads)
+    _worker_state.update(model=model, preprocessor=preprocessor, compiled=compiled)
+
+
+def _worker_pret() -> bool:
+    return bool(_worker_state)
+
+
+def _scorer_segment(shm_name: str, n_rows: int) -> float:
+    """Score le bloc déposé dans le segment `shm_name` et y écrit les prédictions ; retourne la durée."""
+    start = time.perf_counter()
+    shm = SharedMemory(name=shm_name)
+    try:
+        X, out = _vues_segment(shm.buf, n_rows)
+        out[0], out[1] = scorer_matrice(X, _worker_state["model"], _worker_state["preprocessor"], _worker_state["compiled"])
+        del X, out
+    finally:
+        shm.close()
+    return time.perf_counter() - start
+
+
+def _scorer_parallele(
+    blocs: Iterator[pd.DataFrame],
+    writer: EcrivainBlocs,
+    keep: list[str],
+    models_dir: Path,
+    chunk_size: int,
+    workers: int,
+    threads_per_worker: int,
+) -> dict[str, Any]:
+    """Scoring par un pool de processus ; les blocs sont écrits dans l'ordre d'entrée.
+
+    Un anneau de 2 x `workers` segments partagés borne la mémoire : un nouveau
+    bloc n'est lu que lorsqu'un segment est libre.
+    """
+    slot_bytes = chunk_size * (len(INPUT_COLUMNS) + N_OUTPUTS) * np.dtype(np.float64).itemsize
+    slots = [SharedMemory(create=True, size=slot_bytes) for _ in range(2 * workers)]
+    free = list(slots)
+    pending: deque = deque()
+    stats = {"rows": 0, "chunks": 0, "invalid_predictions": 0, "score_s": 0.0}
+
+    def ecrire_plus_ancien() -> None:
+        future, slot, chunk, X = pending.popleft()
+        stats["score_s"] += future.result()
+        _, out = _vues_segment(slot.buf, len(chunk))
+        preds, preds_log = out[0].copy(), out[1].copy()
+        del out
+        free.append(slot)
+        writer.ecrire(table_sortie(chunk, X, preds, preds_log, keep))
+        stats["rows"] += len(chunk)
+        stats["chunks"] += 1
+        stats["invalid_predictions"] += int((~np.isfinite(preds)).sum())
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            # "spawn" : pas de fork d'un processus qui a déjà des threads OpenMP (XGBoost)
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialiser_worker,
+            initargs=(str(models_dir), threads_per_worker),
+        ) as pool:
+            # Démarrage des workers et chargement des artefacts avant la mesure du débit
+            start = time.perf_counter()
+            for future in [pool.submit(_worker_pret) for _ in range(workers)]:
+                future.result()
+            stats["load_s"] = round(time.perf_counter() - start, 3)
+
+            start = time.perf_counter()
+            for chunk in blocs:
+                if not free:
+                    ecrire_plus_ancien()
+                slot = free.pop()
+                X, _ = _vues_segment(slot.buf, len(chunk))
+                X[:] = preparer_matrice(chunk)
+                pending.append((pool.submit(_scorer_segment, slot.name, len(chunk)), slot, chunk, X.copy()))
+                del X
+            while pending:
+                ecrire_plus_ancien()
+            stats["duration_s"] = time.perf_counter() - start
+    finally:
+        for slot in slots:
+            slot.close()
+            slot.unlink()
+    return stats
+
+
+def scorer_fichier(
+    input_path: Path,
+    output_path: Path,
+    models_dir: Path = MODELS_DIR,
+    chunk_size: int = 50_000,
+    keep: Optional[list[str]] = None,
+    workers: int = 0,
+    threads_per_worker: int = 1,
+) -> dict[str, Any]:
+    """Score tout le fichier bloc par bloc ; retourne le rapport (lignes, durée, lignes/s, mémoire).
+
+    `workers` >= 1 : pool de processus (voir `_scorer_parallele`) ; 0 : scoring dans ce
+    processus, XGBoost utilisant alors tous ses threads.
+    """
+    keep = keep or []
+    columns = colonnes_a_lire(colonnes_disponibles(input_path), keep)
+    writer = EcrivainBlocs(output_path)
+    try:
+        if workers >= 1:
+            model_format = "ubj" if (models_dir / "xgboost_model.ubj").exists() else "pickle"
+            stats = _scorer_parallele(
+                lire_blocs(input_path, chunk_size, columns), writer, keep, models_dir,
+                chunk_size, workers, threads_per_worker,
+            )
+        else:
+            start = time.perf_counter()
+            model, preprocessor, compiled, model_format = charger_artefacts(models_dir)
+            stats = {"rows": 0, "chunks": 0, "invalid_predictions": 0, "score_s": 0.0,
+                     "load_s": round(time.perf_counter() - start, 3)}
+            start = time.perf_counter()
+            for chunk in lire_blocs(input_path, chunk_size, columns):
+                t0 = time.perf_counter()
+                X = preparer_matrice(chunk)
+                preds, preds_log = scorer_matrice(X, model, preprocessor, compiled)
+                stats["score_s"] += time.perf_counter() - t0
+                writer.ecrire(table_sortie(chunk, X, preds, preds_log, keep))
+                stats["rows"] += len(chunk)
+                stats["chunks"] += 1
+                stats["invalid_predictions"] += int((~np.isfinite(preds)).sum())
+            stats["duration_s"] = time.perf_counter() - start
+    finally:
+        writer.fermer()
+    duration = stats["duration_s"]
+    return {
+        **stats,
+        "workers": workers,
+        "model_format": model_format,
+        "duration_s": round(duration, 3),
+        "score_s": round(stats["score_s"], 3),
+        "rows_per_s": round(stats["rows"] / duration, 1) if duration > 0 else 0.0,
+        "max_rss_mb": round(memoire_max_mo(), 1),
+    }
+
+
+def mesurer_passage_echelle(
+    input_path: Path,
+    output_path: Path,
+    models_dir: Path,
+    chunk_size: int,
+    max_workers: int,
+    keep: list[str],
+) -> list[dict[str, Any]]:
+    """Débit et efficacité (accélération / nombre de processus) de 1 à `max_workers` processus.
+
+    Chaque palier (1, 2, 4, ..., max_workers) réécrit `output_path` avec un pool d'un thread par processus.
+    """
+    counts = sorted({1, max_workers, *(2 ** k for k in range(max_workers.bit_length()) if 2 ** k < max_workers)})
+    reports = [scorer_fichier(input_path, output_path, models_dir, chunk_size, keep, workers=n) for n in counts]
+    base = reports[0]["rows_per_s"]
+    for report in reports:
+        report["speedup"] = round(report["rows_per_s"] / base, 2) if base else 0.0
+        report["efficiency"] = round(report["speedup"] / report["workers"], 2)
+    return reports
+
+
+def main() -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Score un fichier CSV / Feather / Parquet par blocs.")
+    parser.add_argument("input", type=Path, help="Fichier d'entrée (.csv, .feather, .parquet)")
+    parser.add_argument("output", type=Path, help="Fichier de sortie (.feather ou .parquet)")
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Lignes par bloc")
+    parser.add_argument("--keep", default="", help="Colonnes d'entrée à recopier (ex. id), séparées par des virgules")
+    parser.add_argument("--workers", type=int, default=0, help="Processus de scoring (0 = dans ce processus)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Threads XGBoost par processus")
+    parser.add_argument("--scaling", action="store_true", help="Mesure le débit de 1 à --workers processus")
+    args = parser.parse_args()
+    keep = [c for c in args.keep.split(",") if c]
+
+    if args.scaling:
+        max_workers = args.workers or os.cpu_count() or 1
+        print(f"📈 Passage à l'échelle de 1 à {max_workers} processus ({os.cpu_count()} cœurs)")
+        print(f"{'processus':>10} {'lignes/s':>12} {'accélération':>13} {'efficacité':>11}")
+        for r in mesurer_passage_echelle(args.input, args.output, args.models_dir, args.chunk_size, max_workers, keep):
+            print(f"{r['workers']:>10} {r['rows_per_s']:>12,.0f} {r['speedup']:>12.2f}x {r['efficiency']:>10.0%}")
+        return
+
+    report = scorer_fichier(
+        args.input, args.output, args.models_dir, args.chunk_size, keep, args.workers, args.threads_per_worker
+    )
+    mode = f"{report['workers']} processus" if report["workers"] else "1 processus"
+    print(f"✅ {report['rows']:,} lignes scorées en {report['chunks']} blocs ({mode}) -> {args.output}")
+    print(
+        f"⏱️ {report['duration_s']:.2f} s ({report['rows_per_s']:,.0f} lignes/s, dont scoring "
+        f"{report['score_s']:.2f} s) | chargement {report['load_s']:.2f} s | modèle {report['model_format']}"
+    )
+    print(f"📦 Mémoire max : {report['max_rss_mb']:.0f} Mo | prédictions invalides : {report['invalid_predictions']}")
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : bulk_scoring.py
+# Rôle : scoring en masse hors ligne par blocs (CSV / Feather / Parquet)
+# Date : 2026-10-17
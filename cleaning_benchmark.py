@@ -0,0 +1,171 @@
+"""Banc de performance des fonctions de nettoyage (cleaning_utils).
+
+- normalize : sur une colonne texte synthétique de grande taille, compare la
+  normalisation ligne à ligne (`apply(normalize_string)`) et la version
+  vectorisée (`normalize_series`) ;
+- profile : sur un DataFrame synthétique façon annonces, compare les fonctions
+  d'exploration appelées une à une et `profile_columns` (une seule passe).
+
+Chaque banc vérifie que les résultats sont identiques et affiche l'accélération.
+
+La colonne imite les textes de `houses_madrid.csv` (titres d'annonces, noms de
+rues et de quartiers accentués) avec des True/False et des NaN. `--distinct`
+règle le nombre de valeurs distinctes : peu de valeurs distinctes = cas
+favorable (colonnes catégorielles), autant que de lignes = pire cas.
+
+Usage :
+    uv run python cleaning_benchmark.py --rows 1000000 --distinct 5000
+    uv run python cleaning_benchmark.py --rows 200000 --distinct 200000
+    uv run python cleaning_benchmark.py --bench profile --rows 500000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleaning_utils import (
+    boolean_columns,
+    empty_columns,
+    fill_rate,
+    high_cardinality_columns,
+    high_na_columns,
+    missing_like_columns,
+    normalize_series,
+    normalize_string,
+    profile_columns,
+    string_columns,
+    unique_value_columns,
+)
+
+TYPES = ["Piso", "Ático", "Dúplex", "Casa o chalet", "Estudio", "Chalet adosado"]
+STREETS = ["Calle de Alcalá", "Paseo de la Castellana", "Calle de Génova", "Avenida de América",
+           "Calle de Néstor", "Plaza de Castilla", "Calle de Bravo Murillo", "Calle de la Montaña"]
+NEIGHBORHOODS = ["Chamberí", "Salamanca", "Tetuán", "Moncloa - Aravaca", "Peñagrande",
+                 "Lavapiés-Embajadores", "Almenara", "Ciudad Jardín", "Valdeacederas"]
+
+
+def colonne_synthetique(n_rows: int, n_distinct: int, seed: int = 0) -> pd.Series:
+    """Colonne texte de `n_rows` lignes avec ~`n_distinct` valeurs distinctes, 5 % de NaN, 2 % de True/False."""
+    rng = np.random.default_rng(seed)
+    vocab = [
+        f"{TYPES[i % len(TYPES)]} en venta en {STREETS[(i // 7) % len(STREETS)]}, "
+        f"{NEIGHBORHOODS[(i // 3) % len(NEIGHBORHOODS)]} nº {i}"
+        for i in range(max(n_distinct, 1))
+    ]
+    values = np.asarray(vocab, dtype=object)[rng.integers(0, len(vocab), n_rows)]
+    draw = rng.random(n_rows)
+    values[draw < 0.05] = np.nan
+    values[(draw >= 0.05) & (draw < 0.06)] = "True"
+    values[(draw >= 0.06) & (draw < 0.07)] = "False"
+    return pd.Series(values, name="title")
+
+
+def annonces_synthetiques(n_rows: int, n_distinct: int, seed: int = 0) -> pd.DataFrame:
+    """DataFrame façon houses_madrid.csv : numériques, drapeaux True/False/NaN, textes, colonnes vides."""
+    rng = np.random.default_rng(seed)
+    flags = np.array([True, False, np.nan], dtype=object)
+    df = pd.DataFrame({
+        "id": np.arange(n_rows),
+        "sq_mt_built": rng.normal(100, 40, n_rows).round(),
+        "n_rooms": rng.integers(0, 8, n_rows),
+        "rent_price": np.where(rng.random(n_rows) < 0.7, np.nan, rng.normal(1500, 500, n_rows)),
+        "title": colonne_synthetique(n_rows, n_distinct, seed),
+        "neighborhood": colonne_synthetique(n_rows, 135, seed + 1),
+        "energy_certificate": rng.choice(["A", "B", "C", "en trámite", "", "NA"], n_rows),
+        "latitude": np.nan,
+        "is_new_development": True,
+    })
+    for i, col in enumerate(["has_lift", "is_exterior", "has_parking", "has_pool", "has_garden"]):
+        df[col] = flags[np.random.default_rng(seed + i).integers(0, 3, n_rows)]
+    return df
+
+
+def fonctions_unitaires(df: pd.DataFrame, max_modalities: int) -> dict:
+    """Les fonctions d'exploration appelées une à une (une passe chacune)."""
+    return {
+        "empty": empty_columns(df),
+        "unique_value": unique_value_columns(df),
+        "boolean": boolean_columns(df),
+        "string": string_columns(df),
+        "high_na": high_na_columns(df),
+        "high_cardinality": high_cardinality_columns(df, max_modalities),
+        "missing_like": missing_like_columns(df),
+        "fill_rate": fill_rate(df),
+    }
+
+
+def profil_une_passe(df: pd.DataFrame, max_modalities: int) -> dict:
+    profile = profile_columns(df, max_modalities=max_modalities)
+    return {**profile.summary(), "fill_rate": profile.fill_rate}
+
+
+def chronometrer(fn, *args, repeat: int = 1):
+    """Meilleur temps (s) sur `repeat` exécutions, et le dernier résultat."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def banc_normalisation(args: argparse.Namespace) -> None:
+    col = colonne_synthetique(args.rows, args.distinct)
+    print(f"📊 Colonne synthétique : {args.rows:,} lignes, {col.nunique():,} valeurs distinctes")
+
+    # Même colonne en object et en dtype string : valeurs ET dtype comparés à apply
+    for label, column in (("object", col), ("string", col.astype("string"))):
+        t_apply, expected = chronometrer(lambda s: s.apply(normalize_string), column, repeat=args.repeat)
+        t_vect, result = chronometrer(normalize_series, column, repeat=args.repeat)
+        same_values = result.equals(expected)
+        same_dtype = result.dtype == expected.dtype
+
+        print(f"🔤 Colonne {label} :")
+        print(f"⏱️ apply(normalize_string) : {t_apply:.3f} s ({args.rows / t_apply:,.0f} lignes/s)")
+        print(f"⏱️ normalize_series        : {t_vect:.3f} s ({args.rows / t_vect:,.0f} lignes/s)")
+        print(f"🚀 Accélération : x{t_apply / t_vect:.1f} | valeurs identiques : {'✅' if same_values else '❌'}"
+              f" | dtype identique : {'✅' if same_dtype else '❌'} ({result.dtype} / {expected.dtype})")
+
+
+def banc_profil(args: argparse.Namespace) -> None:
+    df = annonces_synthetiques(args.rows, args.distinct)
+    print(f"📊 Annonces synthétiques : {args.rows:,} lignes x {df.shape[1]} colonnes")
+
+    t_legacy, expected = chronometrer(fonctions_unitaires, df, args.max_modalities, repeat=args.repeat)
+    t_profile, result = chronometrer(profil_une_passe, df, args.max_modalities, repeat=args.repeat)
+    identical = all(
+        result[k].astype(float).equals(expected[k].astype(float)) if k == "fill_rate" else result[k] == expected[k]
+        for k in expected
+    )
+
+    print(f"⏱️ 8 fonctions une à une : {t_legacy:.3f} s")
+    print(f"⏱️ profile_columns       : {t_profile:.3f} s")
+    print(f"🚀 Accélération : x{t_legacy / t_profile:.1f} | résultats identiques : {'✅' if identical else '❌'}")
+
+
+def main() -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Banc de performance de cleaning_utils.")
+    parser.add_argument("--bench", default="normalize", help="Bancs à lancer : normalize, profile (séparés par des virgules)")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Lignes des données synthétiques")
+    parser.add_argument("--distinct", type=int, default=5_000, help="Valeurs distinctes de la colonne texte")
+    parser.add_argument("--max-modalities", type=int, default=20, help="Seuil de high_cardinality_columns")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    bancs = {"normalize": banc_normalisation, "profile": banc_profil}
+    for name in args.bench.split(","):
+        bancs[name](args)
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : cleaning_benchmark.py
+# Rôle : banc de performance des fonctions de nettoyage (normalisation, profil des colonnes)
+# Date : 2026-10-17
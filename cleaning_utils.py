@@ -1,4 +1,6 @@
 # utils.py
+from dataclasses import dataclass, field
+
 import pandas as pd
 import numpy as np
 import unicodedata
@@ -163,6 +165,154 @@ def delete(df: pd.DataFrame, col: str, dropped: list = None) -> pd.DataFrame:
 
 
 
+# --- Profil des colonnes en une seule passe ---
+# Valeurs textuelles considérées comme manquantes (en plus des NaN/None), cf. missing_like_columns
+MISSING_LIKE_STRINGS = {'', 'na', 'NA', 'null', 'NULL'}
+
+
+@dataclass
+class _ColumnAccumulator:
+    """Statistiques d'une colonne cumulées bloc par bloc (profil en mémoire ou par blocs)."""
+    max_tracked: int
+    n_rows: int = 0
+    n_na: int = 0
+    n_missing_like: int = 0
+    is_string: bool = False
+    is_boolean: bool = True
+    uniques: set = field(default_factory=set)
+    overflow: bool = False
+
+    def update(self, s: pd.Series, is_string: bool) -> None:
+        # Un seul hachage de la colonne : codes (NaN = -1) et valeurs distinctes
+        codes, uniques = pd.factorize(s)
+        uniques = uniques.tolist()
+        self.n_rows += len(codes)
+        self.n_na += int((codes < 0).sum())
+        self.is_string |= is_string
+        # Booléen : valeurs distinctes incluses dans {True, False} (même égalité Python que boolean_columns)
+        if self.is_boolean and uniques:
+            self.is_boolean = len(uniques) <= 2 and set(uniques).issubset({True, False})
+        missing_codes = [i for i, u in enumerate(uniques) if isinstance(u, str) and u in MISSING_LIKE_STRINGS]
+        if missing_codes:
+            self.n_missing_like += int(np.isin(codes, missing_codes).sum())
+        if not self.overflow:
+            self.uniques.update(uniques)
+            if len(self.uniques) > self.max_tracked:
+                # Au-delà, seul le fait de dépasser compte : la mémoire reste bornée
+                self.overflow = True
+                self.uniques = set()
+
+    def stats(self) -> dict:
+        n_unique = np.nan if self.overflow else len(self.uniques)
+        return {
+            'n_rows': self.n_rows,
+            'n_non_null': self.n_rows - self.n_na,
+            'na_rate': self.n_na / self.n_rows if self.n_rows else np.nan,
+            'fill_rate': (self.n_rows - self.n_na) / self.n_rows * 100 if self.n_rows else np.nan,
+            'n_unique': n_unique,
+            'n_unique_with_na': n_unique + (self.n_na > 0) if not self.overflow else np.nan,
+            'is_string': self.is_string,
+            'is_boolean': self.is_boolean,
+            'n_missing_like': self.n_na + self.n_missing_like,
+        }
+
+
+@dataclass
+class ColumnProfile:
+    """
+    Profil de toutes les colonnes d'un DataFrame (une ligne par colonne dans `stats`).
+    Les attributs reprennent les résultats de empty_columns, unique_value_columns,
+    boolean_columns, high_na_columns, high_cardinality_columns, missing_like_columns et fill_rate.
+    `n_unique` vaut NaN au-delà de max_modalities + 1 valeurs distinctes (comptage arrêté).
+    """
+    stats: pd.DataFrame
+    na_threshold: float
+    max_modalities: int
+
+    @property
+    def empty_columns(self) -> list:
+        return self.stats.index[self.stats['n_non_null'] == 0].tolist()
+
+    @property
+    def unique_value_columns(self) -> list:
+        return self.stats.index[self.stats['n_unique_with_na'] <= 1].tolist()
+
+    @property
+    def boolean_columns(self) -> list:
+        return self.stats.index[self.stats['is_boolean']].tolist()
+
+    @property
+    def string_columns(self) -> list:
+        return self.stats.index[self.stats['is_string']].tolist()
+
+    @property
+    def high_na_columns(self) -> list:
+        return self.stats.index[self.stats['na_rate'] > self.na_threshold].tolist()
+
+    @property
+    def high_cardinality_columns(self) -> list:
+        # n_unique NaN = comptage arrêté au-delà de max_modalities
+        high = self.stats['n_unique'].isna() | (self.stats['n_unique'] > self.max_modalities)
+        return self.stats.index[self.stats['is_string'] & high].tolist()
+
+    @property
+    def missing_like_columns(self) -> list:
+        return self.stats.index[self.stats['n_missing_like'] > 0].tolist()
+
+    @property
+    def fill_rate(self) -> pd.Series:
+        return self.stats['fill_rate']
+
+    def summary(self) -> dict:
+        """Listes de colonnes par critère (format du bloc __main__)."""
+        return {
+            'empty': self.empty_columns,
+            'unique_value': self.unique_value_columns,
+            'boolean': self.boolean_columns,
+            'string': self.string_columns,
+            'high_na': self.high_na_columns,
+            'high_cardinality': self.high_cardinality_columns,
+            'missing_like': self.missing_like_columns,
+        }
+
+
+def _profile(accumulators: dict, na_threshold: float, max_modalities: int) -> ColumnProfile:
+    stats = pd.DataFrame.from_dict({col: acc.stats() for col, acc in accumulators.items()}, orient='index')
+    return ColumnProfile(stats=stats, na_threshold=na_threshold, max_modalities=max_modalities)
+
+
+def profile_columns(df: pd.DataFrame, na_threshold: float = 0.5, max_modalities: int = 20) -> ColumnProfile:
+    """
+    Calcule en une passe toutes les statistiques de colonnes (vides, valeur unique, booléennes,
+    taux de NaN, cardinalité, valeurs manquantes explicites, taux de remplissage).
+    Chaque colonne n'est hachée qu'une fois (pd.factorize) : tout le reste en découle.
+    """
+    accumulators = {}
+    string_cols = set(string_columns(df))
+    for col in df.columns:
+        acc = _ColumnAccumulator(max_tracked=max(max_modalities, 1) + 1)
+        acc.update(df[col], col in string_cols)
+        accumulators[col] = acc
+    return _profile(accumulators, na_threshold, max_modalities)
+
+
+def profile_csv(path, chunksize: int = 100_000, na_threshold: float = 0.5, max_modalities: int = 20,
+                **read_csv_kwargs) -> ColumnProfile:
+    """
+    Version par blocs de profile_columns pour les CSV qui ne tiennent pas en mémoire :
+    le fichier est lu par blocs de `chunksize` lignes, seules les statistiques sont conservées.
+    """
+    accumulators = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_csv_kwargs):
+        # Une colonne est textuelle si elle l'est dans au moins un bloc (comme à la lecture complète)
+        string_cols = set(string_columns(chunk))
+        for col in chunk.columns:
+            if col not in accumulators:
+                accumulators[col] = _ColumnAccumulator(max_tracked=max(max_modalities, 1) + 1)
+            accumulators[col].update(chunk[col], col in string_cols)
+    return _profile(accumulators, na_threshold, max_modalities)
+
+
 # --- Normalisation des accents et de la casse ---
 def normalize_string(text):
     """
@@ -197,6 +347,64 @@ def normalize_string(text):
     return text_no_accents
 
 
+# Marques diacritiques (U+0300 à U+036F) retirées après décomposition NFD
+_DIACRITIQUES = re.compile(r'[\u0300-\u036f]')
+
+
+def _normaliser_uniques(uniques) -> np.ndarray:
+    """
+    Normalise un tableau de chaînes distinctes (mêmes règles que normalize_string).
+    Les chaînes ASCII n'ont pas d'accent : la mise en minuscules suffit.
+    """
+    out = np.empty(len(uniques), dtype=object)
+    for i, text in enumerate(uniques.tolist()):
+        lower = text.lower()
+        if lower in ('true', 'false'):
+            out[i] = text
+        elif lower.isascii():
+            out[i] = lower
+        else:
+            out[i] = _DIACRITIQUES.sub('', unicodedata.normalize('NFD', lower))
+    return out
+
+
+def normalize_series(s: pd.Series) -> pd.Series:
+    """
+    Équivalent vectorisé de `s.apply(normalize_string)` : chaque chaîne distincte
+    n'est normalisée qu'une seule fois, puis le résultat est redistribué par code.
+    Les NaN/None et les valeurs True/False sont conservés tels quels. Même dtype
+    que `apply` : une colonne de dtype string en ressort avec le dtype inféré des
+    chaînes (`str` avec pandas 3, object avant), ses <NA> devenant NaN.
+    """
+    if isinstance(s.dtype, pd.StringDtype):
+        if not s.notna().any():
+            # Vide ou entièrement manquante : rien à normaliser, dtype propre à `apply`
+            return s.apply(normalize_string)
+        values = s.to_numpy(dtype=object, na_value=np.nan)
+    else:
+        values = s.to_numpy(dtype=object)
+    out = values.copy()
+    if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+        positions = None
+        strings = values
+    else:
+        # Colonne mixte : les valeurs non textuelles (booléens, nombres) gardent le traitement unitaire
+        is_str = np.fromiter((type(v) is str for v in values), dtype=bool, count=len(values))
+        others = np.flatnonzero(~is_str)
+        out[others] = [normalize_string(v) for v in values[others]]
+        positions = np.flatnonzero(is_str)
+        strings = values[positions]
+
+    codes, uniques = pd.factorize(strings)
+    found = codes >= 0
+    normalized = _normaliser_uniques(uniques)[codes[found]]
+    if positions is None:
+        out[found] = normalized
+    else:
+        out[positions[found]] = normalized
+    return pd.Series(out, index=s.index, name=s.name).infer_objects()
+
+
 def normalize_all_text_columns(df):
     """
     Applique la normalisation à toutes les colonnes de type 'object' ou 'string' d'un DataFrame.
@@ -206,12 +414,124 @@ def normalize_all_text_columns(df):
     print(f"Normalisation des colonnes de texte : {string_cols}")
 
     for col in string_cols:
-        # Utiliser la fonction sécurisée
-        df[col] = df[col].apply(normalize_string)
+        # Version vectorisée de df[col].apply(normalize_string)
+        df[col] = normalize_series(df[col])
         
     return df
 
 
+# --- Types compacts (mémoire) ---
+_INT_TYPES = [np.uint8, np.int8, np.uint16, np.int16, np.uint32, np.int32, np.uint64, np.int64]
+
+
+def _smallest_int(lo, hi) -> str:
+    """Plus petit entier NumPy contenant [lo, hi] (non signé si lo >= 0)."""
+    for kind in _INT_TYPES:
+        info = np.iinfo(kind)
+        if (lo >= 0 or info.min < 0) and info.min <= lo and hi <= info.max:
+            return np.dtype(kind).name
+    return 'int64'
+
+
+def _is_flag(s: pd.Series) -> bool:
+    """Colonne booléenne ou True/False/NaN (hors numériques 0/1, déjà réduits en uint8)."""
+    if pd.api.types.is_bool_dtype(s):
+        return True
+    if pd.api.types.is_numeric_dtype(s):
+        return False
+    values = s.dropna().unique()
+    return len(values) > 0 and all(isinstance(v, (bool, np.bool_)) for v in values)
+
+
+def compact_dtypes(df: pd.DataFrame, max_categories: int = 1000, category_ratio: float = 0.5,
+                   downcast_floats: bool = True) -> dict:
+    """
+    Choisit pour chaque colonne le type le plus compact sans perte :
+    - drapeaux True/False -> uint8 (UInt8 s'il y a des NaN, comme convert_bool_to_uint8) ;
+    - entiers, et flottants à valeurs entières sans NaN -> plus petit entier qui contient min/max ;
+    - autres flottants -> float32 si l'aller-retour float32 -> float64 est exact ;
+    - textes avec au plus `max_categories` valeurs distinctes (et moins de `category_ratio` x lignes) -> category.
+    Retourne {colonne: dtype} pour les colonnes à convertir (voir apply_dtypes).
+    """
+    dtypes = {}
+    for col in df.columns:
+        s = df[col]
+        if _is_flag(s):
+            dtype = 'UInt8' if s.isna().any() else 'uint8'
+        elif pd.api.types.is_integer_dtype(s):
+            values = s.dropna()
+            if values.empty:
+                continue
+            dtype = _smallest_int(values.min(), values.max())
+            if isinstance(s.dtype, pd.api.extensions.ExtensionDtype):
+                dtype = dtype.capitalize().replace('Ui', 'UI')
+        elif pd.api.types.is_float_dtype(s):
+            x = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            if len(x) and np.isfinite(x).all() and (x == np.round(x)).all():
+                dtype = _smallest_int(x.min(), x.max())
+            elif downcast_floats and np.array_equal(x.astype(np.float32).astype(np.float64), x, equal_nan=True):
+                dtype = 'float32'
+            else:
+                continue
+        elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            values = s.dropna().unique()
+            if len(values) > max_categories or len(values) > category_ratio * len(s):
+                continue
+            try:
+                values = sorted(values)
+            except TypeError:
+                pass
+            dtype = pd.CategoricalDtype(values)
+        else:
+            continue
+        if dtype != s.dtype:
+            dtypes[col] = dtype
+    return dtypes
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """
+    Convertit les colonnes selon `dtypes` (sortie de compact_dtypes).
+    Les types sont choisis d'après les valeurs : les calculer sur les données converties.
+    """
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype in ('uint8', 'UInt8') and _is_flag(df[col]):
+            df = convert_bool_to_uint8(df, [col], keep_na=dtype == 'UInt8')
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Types et mémoire (octets, chaînes comprises) par colonne avant/après conversion."""
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_before': before.memory_usage(index=False, deep=True),
+        'bytes_after': after.memory_usage(index=False, deep=True),
+    })
+    report['gain_pct'] = 100 * (1 - report['bytes_after'] / report['bytes_before'].where(report['bytes_before'] > 0))
+    return report
+
+
+def optimize_dtypes(df: pd.DataFrame, max_categories: int = 1000, category_ratio: float = 0.5,
+                    downcast_floats: bool = True, verbose: bool = True) -> pd.DataFrame:
+    """
+    Réduit la mémoire d'un DataFrame nettoyé (compact_dtypes puis apply_dtypes)
+    et affiche la mémoire avant/après. Retourne un nouveau DataFrame.
+    """
+    dtypes = compact_dtypes(df, max_categories=max_categories, category_ratio=category_ratio,
+                            downcast_floats=downcast_floats)
+    compact = apply_dtypes(df.copy(), dtypes)
+    if verbose:
+        report = memory_report(df, compact)
+        before, after = report['bytes_before'].sum(), report['bytes_after'].sum()
+        print(f"💾 Mémoire : {before / 1e6:.2f} Mo -> {after / 1e6:.2f} Mo "
+              f"(-{100 * (1 - after / max(before, 1)):.0f} %, {len(dtypes)} colonnes converties)")
+    return compact
+
+
 # ===============================
 # Exemple rapide d'utilisation
 # ===============================
@@ -225,10 +545,13 @@ if __name__ == "__main__":
     # })
     df = pd.read_csv("raw_data/houses_Madrid.csv", index_col=1)
 
-    print("Empty cols:", empty_columns(df))
-    print("Unique value cols:", unique_value_columns(df))
-    print("Bool cols:", boolean_columns(df))
-    print("String cols:", string_columns(df))
-    print("High NA cols:", high_na_columns(df))
-    print("High cardinality cols:", high_cardinality_columns(df, max_modalities=2))
-    print("Missing-like cols:", missing_like_columns(df))
+    # Toutes les statistiques en une passe (profile_csv pour un fichier trop gros pour la mémoire)
+    profile = profile_columns(df, max_modalities=2)
+
+    print("Empty cols:", profile.empty_columns)
+    print("Unique value cols:", profile.unique_value_columns)
+    print("Bool cols:", profile.boolean_columns)
+    print("String cols:", profile.string_columns)
+    print("High NA cols:", profile.high_na_columns)
+    print("High cardinality cols:", profile.high_cardinality_columns)
+    print("Missing-like cols:", profile.missing_like_columns)
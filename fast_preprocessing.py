@@ -0,0 +1,278 @@
+"""Préprocesseur "compilé" : reproduit le ColumnTransformer entraîné en NumPy pur.
+
+Le préprocesseur exporté (`models/preprocessor.pkl`) enchaîne :
+- num : SimpleImputer(median) + StandardScaler sur sq_mt_built, n_rooms, n_bathrooms
+- cat : SimpleImputer(constant="unknown") + OneHotEncoder(handle_unknown="ignore") sur neighborhood
+- bin : SimpleImputer(most_frequent) sur les 6 indicateurs binaires
+
+On extrait les paramètres appris (médianes, moyenne/écart-type, index des
+catégories, modes) dans des tableaux plats, ce qui évite la construction d'un
+DataFrame et les appels pandas/sklearn à chaque requête.
+
+La sortie a le même format que `preprocessor.transform` : matrice CSR si le
+ColumnTransformer produit du sparse (zéros non stockés, ce qui compte pour
+XGBoost qui les traite comme des valeurs manquantes), sinon matrice dense.
+La CSR est construite directement depuis les blocs num/cat/bin, sans passer
+par une matrice dense (n, n_features).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any, Iterable, Mapping
+
+import numpy as np
+from scipy import sparse
+
+
+@dataclass(frozen=True)
+class CompiledPreprocessor:
+    """Paramètres extraits du ColumnTransformer, appliqués en NumPy."""
+
+    input_columns: list[str]
+    num_cols: list[str]
+    num_medians: np.ndarray
+    num_mean: np.ndarray
+    num_scale: np.ndarray
+    cat_col: str
+    cat_lookup: np.ndarray
+    cat_unknown_offset: int
+    bin_cols: list[str]
+    bin_modes: np.ndarray
+    n_features: int
+    sparse_output: bool
+
+    def transform_array(self, X: np.ndarray) -> np.ndarray | sparse.csr_matrix:
+        """Transforme une matrice (n, 10) ordonnée comme `input_columns` (NaN = manquant)."""
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows = X.shape[0]
+        col_pos = {c: i for i, c in enumerate(self.input_columns)}
+
+        # 1. Numériques : imputation médiane puis standardisation
+        n_num = len(self.num_cols)
+        num = X[:, [col_pos[c] for c in self.num_cols]]
+        num = np.where(np.isnan(num), self.num_medians, num)
+        num = (num - self.num_mean) / self.num_scale
+
+        # 2. Catégorielle : index de colonne one-hot (-1 = catégorie inconnue -> ligne à zéro)
+        cat = X[:, col_pos[self.cat_col]]
+        offsets = np.full(n_rows, -1, dtype=np.int64)
+        offsets[np.isnan(cat)] = self.cat_unknown_offset
+        known = np.isfinite(cat) & (cat >= 0) & (cat < len(self.cat_lookup)) & (cat == np.round(cat))
+        offsets[known] = self.cat_lookup[cat[known].astype(np.int64)]
+        hit = offsets >= 0
+
+        # 3. Binaires : imputation par le mode
+        n_bin = len(self.bin_cols)
+        bins = X[:, [col_pos[c] for c in self.bin_cols]]
+        bins = np.where(np.isnan(bins), self.bin_modes, bins)
+
+        if self.sparse_output:
+            return _blocs_vers_csr(num, n_num + np.maximum(offsets, 0), hit, bins, self.n_features)
+        out = np.zeros((n_rows, self.n_features), dtype=float)
+        out[:, :n_num] = num
+        out[np.flatnonzero(hit), n_num + offsets[hit]] = 1.0
+        out[:, self.n_features - n_bin:] = bins
+        return out
+
+    def transform_columns(self, columns: Mapping[str, Any]) -> np.ndarray | sparse.csr_matrix:
+        """Transforme un lot colonnaire {colonne: tableau} (colonnes absentes = manquantes)."""
+        lengths = {len(columns[c]) for c in self.input_columns if c in columns}
+        n_rows = lengths.pop() if lengths else 0
+        X = np.full((n_rows, len(self.input_columns)), np.nan)
+        for i, col in enumerate(self.input_columns):
+            if col in columns:
+                X[:, i] = np.asarray(columns[col], dtype=float)
+        return self.transform_array(X)
+
+    def transform_records(self, records: Iterable[Any]) -> np.ndarray | sparse.csr_matrix:
+        """Transforme une suite de PropertyData (ou de dicts) sans passer par pandas."""
+        records = list(records)
+        if not records:
+            return self.transform_array(np.empty((0, len(self.input_columns))))
+        if isinstance(records[0], Mapping):
+            rows = [tuple(r.get(c, np.nan) for c in self.input_columns) for r in records]
+        else:
+            getter = attrgetter(*self.input_columns)
+            rows = [getter(r) for r in records]
+        return self.transform_array(np.array(rows, dtype=float))
+
+
+def _blocs_vers_csr(
+    num: np.ndarray, cat_cols: np.ndarray, cat_hit: np.ndarray, bins: np.ndarray, n_features: int
+) -> sparse.csr_matrix:
+    """Construit la CSR directement depuis les blocs, sans matrice dense intermédiaire.
+
+    Une ligne a au plus n_num + 1 + n_bin valeurs : la mémoire reste proportionnelle
+    aux non-zéros, pas au nombre de colonnes one-hot. Les zéros ne sont pas stockés
+    (même motif que le ColumnTransformer).
+    """
+    n_rows, n_num = num.shape
+    n_bin = bins.shape[1]
+    values = np.hstack([num, cat_hit.astype(float)[:, None], bins])
+    columns = np.empty(values.shape, dtype=np.int32)
+    columns[:, :n_num] = np.arange(n_num)
+    columns[:, n_num] = cat_cols
+    columns[:, n_num + 1:] = np.arange(n_features - n_bin, n_features)
+    mask = values != 0
+    indptr = np.zeros(n_rows + 1, dtype=np.int32)
+    np.cumsum(mask.sum(axis=1), out=indptr[1:])
+    return sparse.csr_matrix((values[mask], columns[mask], indptr), shape=(n_rows, n_features))
+
+
+def compiler_preprocesseur(preprocessor: Any, input_columns: list[str] | None = None) -> CompiledPreprocessor:
+    """Extrait les paramètres d'un ColumnTransformer entraîné (structure num/cat/bin).
+
+    Lève ValueError si la structure ne correspond pas à celle de
+    `train_export_model.construire_preprocesseur`.
+    """
+    transformers = getattr(preprocessor, "named_transformers_", None)
+    if transformers is None or not {"num", "cat", "bin"}.issubset(transformers):
+        raise ValueError("Préprocesseur non supporté : transformateurs num/cat/bin attendus")
+    if getattr(preprocessor, "remainder", "drop") != "drop":
+        raise ValueError("Préprocesseur non supporté : remainder doit valoir 'drop'")
+
+    cols = {name: list(c) for name, _, c in preprocessor.transformers_ if name in ("num", "cat", "bin")}
+    if len(cols["cat"]) != 1:
+        raise ValueError("Préprocesseur non supporté : une seule colonne catégorielle attendue")
+    slices = preprocessor.output_indices_
+    if not (slices["num"].start == 0 and slices["num"].stop == slices["cat"].start
+            and slices["cat"].stop == slices["bin"].start):
+        raise ValueError("Préprocesseur non supporté : ordre des blocs num/cat/bin inattendu")
+
+    num = transformers["num"].named_steps
+    imputer, scaler = num["imputer"], num["scaler"]
+    num_mean = scaler.mean_ if scaler.with_mean else np.zeros(len(cols["num"]))
+    num_scale = scaler.scale_ if scaler.with_std else np.ones(len(cols["num"]))
+
+    cat = transformers["cat"].named_steps
+    onehot = cat["onehot"]
+    if onehot.drop_idx_ is not None or getattr(onehot, "infrequent_categories_", None):
+        raise ValueError("Préprocesseur non supporté : OneHotEncoder avec drop/infrequent")
+    categories = [str(c) for c in onehot.categories_[0]]
+    # Les quartiers arrivent en entiers et sont castés en string ("77") à l'entraînement
+    int_ids = {int(c): j for j, c in enumerate(categories) if c.isdigit()}
+    cat_lookup = np.full(max(int_ids, default=-1) + 1, -1, dtype=np.int64)
+    for cat_id, j in int_ids.items():
+        cat_lookup[cat_id] = j
+    # Valeur imputée pour un quartier manquant (constante "unknown" par défaut)
+    fill_value = str(cat["imputer"].statistics_[0])
+    cat_unknown_offset = categories.index(fill_value) if fill_value in categories else -1
+
+    return CompiledPreprocessor(
+        input_columns=list(input_columns or preprocessor.feature_names_in_),
+        num_cols=cols["num"],
+        num_medians=np.asarray(imputer.statistics_, dtype=float),
+        num_mean=np.asarray(num_mean, dtype=float),
+        num_scale=np.asarray(num_scale, dtype=float),
+        cat_col=cols["cat"][0],
+        cat_lookup=cat_lookup,
+        cat_unknown_offset=cat_unknown_offset,
+        bin_cols=cols["bin"],
+        bin_modes=np.asarray(transformers["bin"].statistics_, dtype=float),
+        n_features=slices["bin"].stop,
+        sparse_output=bool(preprocessor.sparse_output_),
+    )
+
+
+def echantillon_synthetique(compiled: CompiledPreprocessor, n_rows: int = 1000, seed: int = 0) -> dict[str, np.ndarray]:
+    """Génère un lot colonnaire aléatoire (dont quartiers inconnus et valeurs manquantes)."""
+    rng = np.random.default_rng(seed)
+    max_id = max(len(compiled.cat_lookup), 2)
+    columns = {
+        "sq_mt_built": rng.integers(10, 800, n_rows).astype(float),
+        "n_rooms": rng.integers(0, 16, n_rows).astype(float),
+        "n_bathrooms": rng.integers(1, 14, n_rows).astype(float),
+        "neighborhood": rng.integers(0, max_id + 5, n_rows).astype(float),
+    }
+    for col in compiled.bin_cols:
+        columns[col] = rng.integers(0, 2, n_rows).astype(float)
+    # Quelques valeurs manquantes pour couvrir les imputeurs
+    for col in compiled.input_columns:
+        columns[col][rng.random(n_rows) < 0.02] = np.nan
+    return columns
+
+
+def verifier_parite(preprocessor: Any, compiled: CompiledPreprocessor, n_rows: int = 1000, seed: int = 0) -> float:
+    """Compare la sortie compilée à `preprocessor.transform` et retourne l'écart max.
+
+    Lève AssertionError si les formes, le format (sparse/dense), le motif des
+    valeurs stockées ou les valeurs diffèrent.
+    """
+    import pandas as pd
+
+    columns = echantillon_synthetique(compiled, n_rows=n_rows, seed=seed)
+    df = pd.DataFrame(columns)[compiled.input_columns]
+    # Même préparation que l'API : quartier entier -> string, NaN -> valeur manquante
+    df[compiled.cat_col] = df[compiled.cat_col].astype("Int64").astype("string")
+    df[compiled.cat_col] = df[compiled.cat_col].astype(object).where(df[compiled.cat_col].notna(), np.nan)
+
+    expected = preprocessor.transform(df)
+    actual = compiled.transform_columns(columns)
+
+    assert expected.shape == actual.shape, f"Formes différentes : {expected.shape} vs {actual.shape}"
+    assert sparse.issparse(expected) == sparse.issparse(actual), "Format sparse/dense différent"
+    if sparse.issparse(expected):
+        expected, actual = expected.tocsr(), actual.tocsr()
+        expected.sort_indices()
+        assert np.array_equal(expected.indptr, actual.indptr), "Motif CSR différent (indptr)"
+        assert np.array_equal(expected.indices, actual.indices), "Motif CSR différent (indices)"
+        diff = np.abs(expected.data - actual.data)
+    else:
+        diff = np.abs(np.asarray(expected) - actual)
+    max_diff = float(diff.max()) if diff.size else 0.0
+    assert max_diff < 1e-9, f"Écart maximal trop grand : {max_diff}"
+    return max_diff
+
+
+if __name__ == "__main__":
+    import time
+    from pathlib import Path
+
+    import joblib
+    import pandas as pd
+
+    models_dir = Path(__file__).resolve().parent / "models"
+    preprocessor = joblib.load(models_dir / "preprocessor.pkl")
+    compiled = compiler_preprocesseur(preprocessor)
+
+    # Test de parité sur plusieurs tirages
+    for seed in range(5):
+        max_diff = verifier_parite(preprocessor, compiled, n_rows=5000, seed=seed)
+        print(f"✅ Parité OK (seed={seed}) - écart max : {max_diff:.2e}")
+
+    # Parité sur les prédictions du modèle
+    model = joblib.load(models_dir / "xgboost_model.pkl")
+    columns = echantillon_synthetique(compiled, n_rows=5000, seed=42)
+    df = pd.DataFrame(columns)[compiled.input_columns].dropna()
+    df_sk = df.copy()
+    df_sk[compiled.cat_col] = df_sk[compiled.cat_col].astype(int).astype("string")
+    pred_sk = model.predict(preprocessor.transform(df_sk))
+    pred_np = model.predict(compiled.transform_array(df.to_numpy()))
+    print(f"✅ Prédictions identiques : {np.array_equal(pred_sk, pred_np)}")
+
+    # Latence pour une ligne (chemin /predict)
+    row = {c: 1 for c in compiled.input_columns}
+    row.update({"sq_mt_built": 100, "n_rooms": 3, "n_bathrooms": 2, "neighborhood": 77})
+    df_row = pd.DataFrame([row])
+    n_iter = 2000
+    start = time.perf_counter()
+    for _ in range(n_iter):
+        df_tmp = df_row.copy()
+        df_tmp["neighborhood"] = df_tmp["neighborhood"].astype("string")
+        preprocessor.transform(df_tmp[compiled.input_columns])
+    t_sklearn = (time.perf_counter() - start) / n_iter
+    start = time.perf_counter()
+    for _ in range(n_iter):
+        compiled.transform_records([row])
+    t_numpy = (time.perf_counter() - start) / n_iter
+    print(f"⏱️ 1 ligne - sklearn : {t_sklearn * 1e6:.1f} µs | compilé : {t_numpy * 1e6:.1f} µs "
+          f"(x{t_sklearn / t_numpy:.1f})")
+
+# --- Cartouche ---
+# Fichier : fast_preprocessing.py
+# Rôle : préprocesseur compilé en NumPy pour l'inférence rapide
+# Date : 2026-10-17
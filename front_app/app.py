@@ -16,11 +16,9 @@ Cartouche :
 
 import json
 import os
-import re
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
 import requests
 import streamlit as st
 
@@ -66,44 +64,20 @@ config = load_config()
 
 @st.cache_data
 def load_neighborhood_mapping() -> dict[int, str]:
-    """Construit un mapping id -> nom de quartier depuis le CSV brut.
+    """Charge le mapping id -> nom de quartier depuis l'artefact models/neighborhood_mapping.json.
 
+    L'artefact est produit par neighborhood_mapping.py (lors de l'entraînement) :
+    le CSV brut n'est jamais lu au démarrage. Accepte le format versionné
+    ({"format_version", "mapping", ...}) et l'ancien dict à plat.
     Retourne un dictionnaire {id: nom}. En cas d'échec, renvoie un dict vide.
     """
-    if NEIGHBORHOOD_MAPPING_FILE.exists():
-        try:
-            with open(NEIGHBORHOOD_MAPPING_FILE, encoding="utf-8") as f:
-                raw_mapping = json.load(f)
-            return {int(key): value for key, value in raw_mapping.items()}
-        except Exception:
-            pass
-
-    csv_paths = [PROJECT_ROOT / "raw_data/houses_madrid.csv", BASE_DIR / "../raw_data/houses_madrid.csv"]
-    csv_path = next((path for path in csv_paths if path.exists()), None)
-    if csv_path is None:
-        return {}
-
-    # Lecture robuste (accents)
     try:
-        df = pd.read_csv(csv_path, encoding="utf-8-sig")
-    except Exception:
-        try:
-            df = pd.read_csv(csv_path, encoding="latin-1")
-        except Exception:
-            df = pd.read_csv(csv_path)
-
-    if "neighborhood_id" not in df.columns:
+        with open(NEIGHBORHOOD_MAPPING_FILE, encoding="utf-8") as f:
+            content = json.load(f)
+    except (OSError, ValueError):
         return {}
-
-    mapping: dict[int, str] = {}
-    pattern = re.compile(r"Neighborhood\s+(\d+):\s*([^\(\-]+)")
-    for raw in df["neighborhood_id"].dropna().unique().tolist():
-        match = pattern.search(str(raw))
-        if match:
-            idx = int(match.group(1))
-            name = match.group(2).strip()
-            mapping[idx] = name
-    return mapping
+    raw_mapping = content.get("mapping", content)
+    return {int(key): value for key, value in raw_mapping.items()}
 
 st.set_page_config(
     page_title="Madrid Apartment Hunter",
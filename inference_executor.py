@@ -0,0 +1,183 @@
+"""Exécuteur dédié à l'inférence (pool de threads ou de processus) pour l'API.
+
+La boucle d'événements de FastAPI reste libre pour les entrées/sorties : seule
+l'inférence (préprocesseur + modèle) part dans un pool dimensionné.
+
+- mode "thread" : threads partageant le modèle chargé par l'API (XGBoost et
+  NumPy relâchent le GIL pendant le calcul) ;
+- mode "process" : processus qui chargent chacun leur propre copie du modèle
+  au démarrage (initializer), sans contention sur le GIL.
+
+Le nombre de tâches en attente (en cours + file) est borné : au-delà,
+`QueueFullError` est levée immédiatement pour que l'API réponde 503 sans
+allonger la file.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+
+class QueueFullError(RuntimeError):
+    """La file de l'exécuteur d'inférence est pleine."""
+
+
+class InferenceExecutor:
+    """Pool d'inférence dimensionné avec file d'attente bornée."""
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        workers: int = 4,
+        max_queue: int = 64,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: tuple = (),
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError("mode doit être 'thread' ou 'process'")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+        if mode == "process":
+            # "spawn" : pas de fork d'un processus qui a déjà des threads OpenMP (XGBoost)
+            self._pool: Executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Soumet une tâche ; lève QueueFullError si la file est pleine."""
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(
+                    f"File d'inférence pleine ({self._pending}/{self.max_queue} tâches en attente)"
+                )
+            self._pending += 1
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Version asynchrone de `submit` : attend le résultat sans bloquer la boucle."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def prechauffer(self, fn: Callable[..., Any], *args: Any) -> float:
+        """Lance une tâche par worker (démarrage des processus, chargement) et retourne la durée."""
+        start = time.perf_counter()
+        futures = [self._pool.submit(fn, *args) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - start
+
+    def stats(self) -> dict[str, Any]:
+        """Compteurs exposés sur la route de santé."""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self) -> None:
+        """Arrête le pool (les tâches en cours se terminent)."""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --- ÉTAT DES WORKERS PROCESSUS ---
+# Chaque processus du pool charge sa propre copie du modèle et du préprocesseur.
+_worker_state: dict[str, Any] = {}
+
+
+def initialiser_worker(
+    model_path: str,
+    native_path: str,
+    preprocessor_path: str,
+    input_columns: list[str],
+    n_threads: int = 0,
+) -> None:
+    """Initializer des processus : charge les artefacts une seule fois par worker.
+
+    Comme dans le processus principal, le préprocesseur compilé n'est utilisé
+    qu'après un test de parité avec sklearn ; sinon le worker se replie sur sklearn.
+    """
+    from fast_preprocessing import compiler_preprocesseur, verifier_parite
+    from model_store import charger_modele, charger_preprocesseur
+
+    model, _ = charger_modele(model_path, native_path)
+    if n_threads > 0 and hasattr(model, "set_params"):
+        # Évite la sur-souscription : N processus x n_threads threads XGBoost
+        model.set_params(n_jobs=n_threads)
+    preprocessor = charger_preprocesseur(preprocessor_path)
+    try:
+        compiled = compiler_preprocesseur(preprocessor, input_columns)
+        verifier_parite(preprocessor, compiled, n_rows=256)
+    except Exception as e:
+        compiled = None
+        logging.getLogger("apartment_hunter.api").warning(
+            f"⚠️ Worker {os.getpid()} : préprocesseur compilé désactivé, repli sur sklearn : {e}"
+        )
+    _worker_state.update(
+        model=model, preprocessor=preprocessor, compiled=compiled, input_columns=input_columns
+    )
+
+
+def transformer_lignes(X_rows: np.ndarray, preprocessor: Any, compiled: Any, input_columns: list[str]) -> Any:
+    """Transforme une matrice (n, 10) d'entiers en matrice du modèle (compilé ou sklearn)."""
+    if compiled is not None:
+        return compiled.transform_array(X_rows)
+    import pandas as pd
+
+    df = pd.DataFrame(np.asarray(X_rows, dtype=np.int64), columns=input_columns)
+    # Les catégories du OneHotEncoder sont des strings (cohérence avec l'entraînement)
+    df["neighborhood"] = df["neighborhood"].astype("string")
+    return preprocessor.transform(df)
+
+
+def inferer(X_rows: np.ndarray, model: Any, preprocessor: Any, compiled: Any, input_columns: list[str]) -> tuple[np.ndarray, float, float]:
+    """Préprocesseur + modèle ; retourne (log-prédictions, durée preprocess, durée predict)."""
+    start = time.perf_counter()
+    X_processed = transformer_lignes(X_rows, preprocessor, compiled, input_columns)
+    t_pre = time.perf_counter()
+    preds = np.asarray(model.predict(X_processed))
+    return preds, t_pre - start, time.perf_counter() - t_pre
+
+
+def inferer_worker(X_rows: np.ndarray) -> tuple[np.ndarray, float, float]:
+    """Point d'entrée exécuté dans un processus du pool (utilise l'état du worker)."""
+    state = _worker_state
+    return inferer(X_rows, state["model"], state["preprocessor"], state["compiled"], state["input_columns"])
+
+# --- Cartouche ---
+# Fichier : inference_executor.py
+# Rôle : pool dédié (threads/processus) pour l'inférence de l'API
+# Date : 2026-10-17
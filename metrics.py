@@ -0,0 +1,206 @@
+"""Primitives de métriques de l'API (compteurs, jauges, histogrammes) et exposition Prometheus.
+
+Les buckets sont cumulatifs (convention Prometheus : `le` = "inférieur ou égal").
+Chaque observation ne coûte qu'une recherche dans un dictionnaire et un verrou :
+le texte d'exposition n'est construit qu'au moment où `/metrics` est lu.
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Sequence
+
+# Valeur de label utilisée au-delà du nombre maximal de séries d'une métrique
+OVERFLOW_LABEL = "other"
+
+
+class Histogram:
+    """Histogramme thread-safe à buckets fixes (compteurs cumulés, somme, nombre)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Enregistre une observation."""
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Retourne les buckets cumulés, la somme, le nombre et la moyenne."""
+        with self._lock:
+            counts = list(self._counts)
+            total, n = self._sum, self._count
+        cumulative = {}
+        running = 0
+        for bound, c in zip([*self.buckets, float("inf")], counts):
+            running += c
+            cumulative["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+        return {
+            "buckets": cumulative,
+            "count": n,
+            "sum": total,
+            "mean": total / n if n else 0.0,
+        }
+
+
+def _echapper(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_echapper(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+class _Famille:
+    """Base des métriques à labels : une série par combinaison de valeurs, en nombre borné."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), max_series: int = 1000):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _cle(self, labels: tuple) -> tuple:
+        """Clé de série (valeurs brutes, converties en texte à l'exposition seulement).
+
+        Au-delà de `max_series`, les nouvelles séries sont regroupées sous OVERFLOW_LABEL.
+        """
+        if labels not in self._series and len(self._series) >= self.max_series:
+            return (OVERFLOW_LABEL,) * len(self.labelnames)
+        return labels
+
+    def _labels(self, key: tuple) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def exposition(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._series.items())
+        return [f"{self.name}{_format_labels(self._labels(k))} {_format_value(v)}" for k, v in items]
+
+
+class Counter(_Famille):
+    """Compteur monotone à labels."""
+
+    type_name = "counter"
+
+    def inc(self, *labels: Any, value: float = 1) -> None:
+        with self._lock:
+            key = self._cle(labels)
+            self._series[key] = self._series.get(key, 0) + value
+
+
+class Gauge(_Famille):
+    """Jauge à labels (valeur courante, peut monter et descendre)."""
+
+    type_name = "gauge"
+
+    def set(self, *labels: Any, value: float) -> None:
+        with self._lock:
+            self._series[self._cle(labels)] = value
+
+    def inc(self, *labels: Any, value: float = 1) -> None:
+        with self._lock:
+            key = self._cle(labels)
+            self._series[key] = self._series.get(key, 0) + value
+
+    def dec(self, *labels: Any, value: float = 1) -> None:
+        self.inc(*labels, value=-value)
+
+
+class HistogramFamily(_Famille):
+    """Histogrammes à labels partageant les mêmes buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = (), max_series: int = 1000):
+        super().__init__(name, help_text, labelnames, max_series)
+        self.buckets = sorted(buckets)
+
+    def observe(self, *labels: Any, value: float) -> None:
+        histogram = self._series.get(labels)
+        if histogram is None:
+            with self._lock:
+                key = self._cle(labels)
+                histogram = self._series.setdefault(key, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._series.items())
+        lines = []
+        for key, histogram in items:
+            labels = self._labels(key)
+            snap = histogram.snapshot()
+            for bound, count in snap["buckets"].items():
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {snap['sum']:g}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {snap['count']}")
+        return lines
+
+
+class Registry:
+    """Registre des métriques et des collecteurs évalués à la lecture de `/metrics`."""
+
+    def __init__(self):
+        self._metrics: list[_Famille] = []
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, str, dict[str, Any], float]]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = (), max_series: int = 1000) -> Counter:
+        return self._ajouter(Counter(name, help_text, labelnames, max_series))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (), max_series: int = 1000) -> Gauge:
+        return self._ajouter(Gauge(name, help_text, labelnames, max_series))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> HistogramFamily:
+        return self._ajouter(HistogramFamily(name, help_text, buckets, labelnames))
+
+    def _ajouter(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def collecteur(self, fn: Callable[[], Iterable[tuple[str, str, str, dict[str, Any], float]]]) -> None:
+        """Ajoute une fonction retournant des échantillons (nom, type, aide, labels, valeur)."""
+        self._collectors.append(fn)
+
+    def exposition(self) -> str:
+        """Texte au format d'exposition Prometheus (version 0.0.4)."""
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.exposition())
+        declared: set[str] = set()
+        for collector in self._collectors:
+            for name, type_name, help_text, labels, value in collector():
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {type_name}")
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# --- Cartouche ---
+# Fichier : metrics.py
+# Rôle : primitives de métriques et exposition Prometheus de l'API
+# Date : 2026-10-17
@@ -0,0 +1,157 @@
+"""Chargement des artefacts du modèle pour l'API et ses workers.
+
+- Modèle : le format natif XGBoost (`xgboost_model.ubj`) est chargé directement
+  dans le booster, sans dé-pickler le wrapper scikit-learn ; à défaut, on
+  retombe sur `xgboost_model.pkl`.
+- Préprocesseur et pickles : `joblib.load(..., mmap_mode="r")`, ce qui
+  memory-mappe les tableaux NumPy sauvegardés par joblib (pages en lecture
+  seule partagées entre processus via le cache du système).
+- La table de prix (`price_table.npy`) est déjà lue en memory-map.
+
+Le booster XGBoost lui-même ne peut pas être memory-mappé : le format natif
+réduit surtout le temps de chargement et la taille du fichier.
+
+Pour le rechargement à chaud, le modèle, le préprocesseur et la configuration
+sont regroupés dans un `ModelBundle` immuable, identifié par l'empreinte de
+leurs fichiers : l'API remplace le bundle courant d'un seul coup.
+
+Usage (conversion pickle -> format natif + rapport de chargement) :
+    uv run python model_store.py
+"""
+
+from __future__ import annotations
+
+import os
+import resource
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import joblib
+import numpy as np
+
+from price_table import empreinte_artefacts
+
+
+ROOT = Path(__file__).resolve().parent
+MODELS_DIR = ROOT / "models"
+
+
+def chemin_natif(model_path: str | Path) -> Path:
+    """Chemin du modèle au format natif XGBoost associé à un pickle (`.pkl` -> `.ubj`)."""
+    return Path(model_path).with_suffix(".ubj")
+
+
+def charger_modele(model_path: str | Path, native_path: Optional[str | Path] = None) -> tuple[Any, str]:
+    """Charge le modèle ; retourne (modèle, format) avec format = "ubj" ou "pickle"."""
+    native_path = Path(native_path) if native_path is not None else chemin_natif(model_path)
+    if native_path.exists():
+        import xgboost as xgb
+
+        model = xgb.XGBRegressor()
+        model.load_model(native_path)
+        return model, "ubj"
+    return joblib.load(model_path, mmap_mode="r"), "pickle"
+
+
+def fichier_modele(model_path: str | Path, native_path: Optional[str | Path] = None) -> Path:
+    """Fichier effectivement chargé par `charger_modele` (natif s'il existe, sinon pickle)."""
+    native_path = Path(native_path) if native_path is not None else chemin_natif(model_path)
+    return native_path if native_path.exists() else Path(model_path)
+
+
+def charger_preprocesseur(preprocessor_path: str | Path) -> Any:
+    """Charge le préprocesseur (tableaux NumPy memory-mappés si possible)."""
+    return joblib.load(preprocessor_path, mmap_mode="r")
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """Version cohérente des artefacts servis (modèle + préprocesseur + configuration).
+
+    `compiled` et `price_table` sont dérivés du même couple modèle/préprocesseur.
+    """
+
+    version: str
+    model: Any
+    preprocessor: Any
+    config: dict[str, Any]
+    model_format: str
+    compiled: Optional[Any] = None
+    price_table: Optional[Any] = None
+    timings: dict[str, float] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+
+
+def version_artefacts(paths: list[str | Path]) -> str:
+    """Empreinte de version du trio modèle/préprocesseur/configuration (fichiers présents)."""
+    return empreinte_artefacts([p for p in paths if os.path.exists(p)])
+
+
+def signature_fichiers(paths: list[str | Path]) -> tuple:
+    """Signature bon marché (mtime, taille) pour détecter une modification des artefacts."""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((str(path), st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append((str(path), None, None))
+    return tuple(signature)
+
+
+def lignes_prechauffage(n_rows: int = 16, seed: int = 0) -> np.ndarray:
+    """Lignes synthétiques (n, 10) pour préchauffer une nouvelle version avant la bascule."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(30, 300, n_rows),
+        rng.integers(1, 6, n_rows),
+        rng.integers(1, 4, n_rows),
+        rng.integers(1, 130, n_rows),
+        rng.integers(0, 2, (n_rows, 6)),
+    ]).astype(np.int64)
+
+
+def memoire_max_mo() -> float:
+    """Pic de mémoire résidente du processus courant (Mo)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def exporter_format_natif(model_path: str | Path, native_path: Optional[str | Path] = None) -> Path:
+    """Convertit un modèle XGBoost picklé en format natif UBJSON."""
+    native_path = Path(native_path) if native_path is not None else chemin_natif(model_path)
+    model = joblib.load(model_path)
+    model.save_model(native_path)
+    return native_path
+
+
+def main() -> None:
+    """Convertit le modèle en format natif et compare les temps de chargement."""
+    model_path = MODELS_DIR / "xgboost_model.pkl"
+    native_path = exporter_format_natif(model_path)
+    print(f"✅ Modèle natif exporté : {native_path}")
+    print(
+        f"📦 Taille - pickle : {os.path.getsize(model_path) / 1e6:.2f} Mo | "
+        f"natif : {os.path.getsize(native_path) / 1e6:.2f} Mo"
+    )
+
+    n_iter = 20
+    start = time.perf_counter()
+    for _ in range(n_iter):
+        joblib.load(model_path)
+    t_pickle = (time.perf_counter() - start) / n_iter
+    start = time.perf_counter()
+    for _ in range(n_iter):
+        charger_modele(model_path, native_path)
+    t_native = (time.perf_counter() - start) / n_iter
+    print(f"⏱️ Chargement - pickle : {t_pickle * 1e3:.1f} ms | natif : {t_native * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : model_store.py
+# Rôle : chargement (natif / memory-map) des artefacts du modèle
+# Date : 2026-10-17
@@ -0,0 +1,239 @@
+"""Moteur de recherche d'hyperparamètres utilisé par evaluate_model / eval_model_apart.
+
+- parallélisme : les couples (candidat, fold) sont répartis sur les cœurs
+  (`n_jobs`, -1 = tous les cœurs) ; sans grille, les folds de la validation
+  croisée et l'ajustement final sur tout le train forment un seul lot parallèle ;
+- cache des matrices prétraitées : quand le modèle est un Pipeline
+  (préprocesseur + estimateur), les étapes de prétraitement sont mises en cache
+  (`Pipeline(memory=...)`) : le ColumnTransformer n'est ajusté qu'une fois par
+  fold, puis réutilisé par tous les candidats qui ne changent que l'estimateur ;
+- successive halving (`search_type="halving"` ou `"halving_random"`) : tous les
+  candidats sont d'abord évalués sur une petite partie du train, seul le
+  meilleur tiers passe au tour suivant avec trois fois plus de lignes.
+
+Le banc compare la recherche actuelle (séquentielle, sans cache) au moteur, sur
+le préprocesseur de train_export_model et des annonces synthétiques (ou les
+fichiers de data_model avec `--data`).
+
+Usage :
+    uv run python model_tuning.py --rows 20000
+    uv run python model_tuning.py --data data_model --search halving
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone, is_classifier
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, check_cv
+from sklearn.pipeline import Pipeline
+from sklearn.utils import _safe_indexing
+
+SEARCH_TYPES = ("grid", "random", "halving", "halving_random")
+
+
+def make_search(
+    algo: Any,
+    param_grid: dict,
+    search_type: str = "grid",
+    scoring: Any = "r2",
+    cv: Any = 5,
+    n_jobs: Optional[int] = -1,
+    n_iter: int = 10,
+    factor: int = 3,
+    random_state: Optional[int] = None,
+) -> Any:
+    """Objet de recherche scikit-learn correspondant à `search_type`."""
+    if search_type == "grid":
+        return GridSearchCV(algo, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs)
+    if search_type == "random":
+        return RandomizedSearchCV(algo, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                                  n_iter=n_iter, random_state=random_state)
+    if search_type in ("halving", "halving_random"):
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
+
+        if search_type == "halving":
+            return HalvingGridSearchCV(algo, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                                       factor=factor, random_state=random_state)
+        return HalvingRandomSearchCV(algo, param_grid, cv=cv, scoring=scoring, n_jobs=n_jobs,
+                                     factor=factor, random_state=random_state)
+    raise ValueError(f"search_type doit être parmi {', '.join(SEARCH_TYPES)}")
+
+
+def _ajuster(estimator: Any, X: Any, y: Any, train: Any = None, test: Any = None, scorer: Any = None) -> Any:
+    """Ajuste `estimator` sur tout X (train=None, retourne le modèle) ou sur un fold (retourne le score)."""
+    if train is None:
+        return estimator.fit(X, y)
+    estimator.fit(_safe_indexing(X, train), _safe_indexing(y, train))
+    return scorer(estimator, _safe_indexing(X, test), _safe_indexing(y, test))
+
+
+def ajuster_et_valider(
+    algo: Any, X: Any, y: Any, scoring: Any = "r2", cv: Any = 5, n_jobs: Optional[int] = -1
+) -> tuple[Any, np.ndarray]:
+    """Modèle ajusté sur tout X et scores de validation croisée, en un seul lot joblib.
+
+    L'ajustement final est une tâche de plus dans le lot des folds : avec n_jobs
+    cœurs, il tourne en même temps que les folds au lieu de s'ajouter après eux.
+    Mêmes folds et mêmes scores que `cross_val_score`.
+    """
+    splitter = check_cv(cv, y, classifier=is_classifier(algo))
+    scorer = check_scoring(algo, scoring=scoring)
+    tasks = [delayed(_ajuster)(clone(algo), X, y)]
+    tasks += [delayed(_ajuster)(clone(algo), X, y, train, test, scorer) for train, test in splitter.split(X, y)]
+    model, *scores = Parallel(n_jobs=n_jobs)(tasks)
+    return model, np.asarray(scores, dtype=float)
+
+
+def tune_model(
+    algo: Any,
+    param_grid: Optional[dict],
+    X_train: Any,
+    y_train: Any,
+    search_type: str = "grid",
+    scoring: Any = "r2",
+    cv: Any = 5,
+    n_jobs: Optional[int] = -1,
+    cache: bool = True,
+    n_iter: int = 10,
+    factor: int = 3,
+    random_state: Optional[int] = None,
+    verbose: bool = True,
+) -> dict[str, Any]:
+    """
+    Ajuste `algo` sur le train, avec ou sans recherche d'hyperparamètres.
+
+    Sans grille (`param_grid=None`), le modèle final (ajusté sur tout le train)
+    et les scores de validation croisée sont calculés dans le même lot
+    parallèle (ajuster_et_valider) ; `algo` lui-même n'est pas modifié. Avec une grille, la
+    recherche tourne sur `n_jobs` cœurs et, si `cache` et que `algo` est un
+    Pipeline, le prétraitement est mis en cache le temps de la recherche.
+
+    Retourne un dict : best_model, best_params, cv_results (scores des folds sans
+    grille, cv_results_ sinon), search_time (s), n_fits.
+    """
+    start = time.perf_counter()
+    if param_grid is None:
+        best_model, cv_results = ajuster_et_valider(algo, X_train, y_train, scoring=scoring, cv=cv, n_jobs=n_jobs)
+        result = {
+            "best_model": best_model,
+            "best_params": best_model.get_params(),
+            "cv_results": cv_results,
+            "n_fits": len(cv_results) + 1,
+        }
+    else:
+        with tempfile.TemporaryDirectory(prefix="tuning_cache_") as cache_dir:
+            use_cache = cache and isinstance(algo, Pipeline) and algo.memory is None
+            estimator = clone(algo).set_params(memory=cache_dir) if use_cache else algo
+            search = make_search(estimator, param_grid, search_type, scoring, cv, n_jobs,
+                                 n_iter=n_iter, factor=factor, random_state=random_state)
+            search.fit(X_train, y_train)
+        best_model = search.best_estimator_
+        if use_cache:
+            # Le dossier de cache est supprimé : le modèle retourné n'y fait plus référence
+            best_model.set_params(memory=None)
+        result = {
+            "best_model": best_model,
+            "best_params": search.best_params_,
+            "cv_results": search.cv_results_,
+            "n_fits": len(search.cv_results_["params"]) * search.n_splits_ + int(search.refit is not False),
+        }
+    result["search_time"] = time.perf_counter() - start
+    if verbose:
+        print(f"⏱️ Recherche : {result['search_time']:.2f} s ({result['n_fits']} ajustements, n_jobs={n_jobs})")
+    return result
+
+
+def compare_with_serial(
+    algo: Any,
+    param_grid: dict,
+    X_train: Any,
+    y_train: Any,
+    search_type: str = "grid",
+    scoring: Any = "r2",
+    cv: Any = 5,
+    n_jobs: Optional[int] = -1,
+    random_state: Optional[int] = 0,
+) -> pd.DataFrame:
+    """
+    Temps de la recherche actuelle (GridSearchCV séquentiel, sans cache) et du
+    moteur (parallèle, cache, successive halving selon `search_type`).
+    """
+    serial_search = "random" if search_type == "halving_random" else "grid" if search_type == "halving" else search_type
+    runs = {
+        "séquentiel (actuel)": dict(search_type=serial_search, n_jobs=None, cache=False),
+        f"moteur ({search_type})": dict(search_type=search_type, n_jobs=n_jobs, cache=True),
+    }
+    rows = []
+    for name, options in runs.items():
+        result = tune_model(clone(algo), param_grid, X_train, y_train, scoring=scoring, cv=cv,
+                            random_state=random_state, verbose=False, **options)
+        best = result["cv_results"]["mean_test_score"][result["cv_results"]["rank_test_score"] == 1][0]
+        rows.append({"mode": name, "temps_s": result["search_time"], "ajustements": result["n_fits"],
+                     "meilleur_score_cv": best, "meilleurs_params": result["best_params"]})
+    report = pd.DataFrame(rows).set_index("mode")
+    report["accélération"] = report["temps_s"].iloc[0] / report["temps_s"]
+    return report
+
+
+def annonces_modele(n_rows: int, seed: int = 0) -> tuple[pd.DataFrame, pd.Series]:
+    """Annonces synthétiques avec les colonnes du modèle et un log-prix cohérent."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        "sq_mt_built": np.where(rng.random(n_rows) < 0.05, np.nan, rng.gamma(4, 25, n_rows).round()),
+        "n_rooms": rng.integers(0, 7, n_rows),
+        "n_bathrooms": np.where(rng.random(n_rows) < 0.05, np.nan, rng.integers(1, 5, n_rows)),
+        "neighborhood": rng.integers(1, 136, n_rows).astype(str),
+    })
+    for col in ["has_lift", "has_parking", "has_pool", "has_garden", "has_storage_room", "is_floor_under"]:
+        X[col] = rng.integers(0, 2, n_rows)
+    effect = rng.normal(0, 0.4, 136)[X["neighborhood"].astype(int)]
+    y = np.log1p(3000 * X["sq_mt_built"].fillna(100) + 20000 * X["has_lift"]) + effect + rng.normal(0, 0.2, n_rows)
+    return X, pd.Series(y, name="log_buy_price")
+
+
+def main() -> None:
+    """Point d'entrée CLI : banc séquentiel vs moteur sur un Pipeline préprocesseur + Ridge."""
+    parser = argparse.ArgumentParser(description="Banc de la recherche d'hyperparamètres.")
+    parser.add_argument("--data", default=None, help="Dossier data_model (X_train/y_train.feather) ; défaut : synthétique")
+    parser.add_argument("--rows", type=int, default=20_000, help="Lignes des données synthétiques")
+    parser.add_argument("--search", default="grid", choices=SEARCH_TYPES, help="Type de recherche du moteur")
+    parser.add_argument("--cv", type=int, default=5, help="Nombre de folds")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Processus du moteur (-1 = tous les cœurs)")
+    args = parser.parse_args()
+
+    from sklearn.linear_model import Ridge
+
+    from train_export_model import construire_preprocesseur, preparer_features
+
+    if args.data:
+        X = pd.read_feather(f"{args.data}/X_train.feather")
+        y = pd.read_feather(f"{args.data}/y_train.feather").squeeze()
+    else:
+        X, y = annonces_modele(args.rows)
+    X = preparer_features(X)
+
+    pipeline = Pipeline([("prep", construire_preprocesseur()), ("model", Ridge())])
+    param_grid = {"model__alpha": [0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0],
+                  "model__solver": ["auto", "lsqr", "sparse_cg"]}
+    print(f"📊 {len(X):,} lignes, {np.prod([len(v) for v in param_grid.values()])} candidats x {args.cv} folds")
+
+    report = compare_with_serial(pipeline, param_grid, X, y, search_type=args.search, cv=args.cv, n_jobs=args.n_jobs)
+    print(report.to_string(float_format=lambda v: f"{v:.4f}"))
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : model_tuning.py
+# Rôle : recherche d'hyperparamètres parallèle, avec cache du prétraitement et successive halving
+# Date : 2026-10-17
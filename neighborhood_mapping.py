@@ -0,0 +1,170 @@
+"""Extraction du mapping id -> nom de quartier depuis le CSV brut.
+
+Seule la colonne `neighborhood_id` de `houses_madrid.csv` est convertie, en
+flux (lecteur CSV de pyarrow, `include_columns`) : la mémoire reste bornée par
+les blocs lus d'avance (quelques dizaines de Mo avec des blocs de 1 Mo), quelle
+que soit la taille du fichier.
+Les libellés sont dédoublonnés au fil de la lecture ; l'expression régulière ne
+s'applique qu'aux ~135 libellés distincts, pas à chaque ligne.
+
+Le résultat est écrit dans `models/neighborhood_mapping.json`, versionné :
+
+    {"format_version": 1, "source": {...}, "n_neighborhoods": ..., "mapping": {"1": "Chopera", ...}}
+
+`source` (nom, taille, date de modification du CSV) sert d'empreinte : tant que
+le CSV ne change pas, l'artefact est réutilisé sans relire le fichier. Sans CSV
+(conteneurs de l'API et de l'UI), l'artefact existant est conservé tel quel.
+L'UI Streamlit ne lit que cet artefact, jamais le CSV brut.
+
+Usage :
+    uv run python neighborhood_mapping.py
+    uv run python neighborhood_mapping.py --csv raw_data/houses_madrid.csv --force
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+ROOT = Path(__file__).resolve().parent
+RAW_DATA_PATH = ROOT / "raw_data" / "houses_madrid.csv"
+MAPPING_PATH = ROOT / "models" / "neighborhood_mapping.json"
+MAPPING_FORMAT_VERSION = 1
+NEIGHBORHOOD_COLUMN = "neighborhood_id"
+# "Neighborhood 12: Abrantes (1423.7 €/m2) - District 11: Carabanchel" -> (12, "Abrantes")
+NEIGHBORHOOD_PATTERN = re.compile(r"Neighborhood\s+(\d+):\s*([^\(\-]+)")
+
+
+def empreinte_source(csv_path: Path) -> dict[str, Any]:
+    """Empreinte du CSV brut (nom, taille, date de modification), sans le lire."""
+    stat = csv_path.stat()
+    return {"file": csv_path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def libelles_distincts(csv_path: Path, block_size: int = 1 << 20) -> list[str]:
+    """Libellés distincts de `neighborhood_id` (ordre d'apparition), lus en flux.
+
+    Lecteur CSV en flux de pyarrow : seule la colonne est convertie, bloc par
+    bloc (`block_size` octets), et chaque bloc est réduit à ses valeurs
+    distinctes. Lecture en UTF-8 (BOM accepté), puis en latin-1 si le fichier
+    n'est pas en UTF-8. Liste vide si la colonne est absente.
+    """
+    for encoding in ("utf8", "latin1"):
+        try:
+            reader = pacsv.open_csv(
+                csv_path,
+                read_options=pacsv.ReadOptions(encoding=encoding, block_size=block_size),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=[NEIGHBORHOOD_COLUMN],
+                    include_missing_columns=True,
+                    column_types={NEIGHBORHOOD_COLUMN: pa.string()},
+                ),
+            )
+            seen: dict[str, None] = {}
+            for batch in reader:
+                values = pc.unique(batch.column(0).drop_null())
+                seen.update(dict.fromkeys(values.to_pylist()))
+            return list(seen)
+        except (pa.ArrowInvalid, UnicodeDecodeError):
+            continue
+    return []
+
+
+def parser_libelles(libelles: Iterable[str]) -> dict[int, str]:
+    """Applique l'expression régulière aux libellés : {id: nom}."""
+    mapping: dict[int, str] = {}
+    for raw in libelles:
+        match = NEIGHBORHOOD_PATTERN.search(str(raw))
+        if match:
+            mapping[int(match.group(1))] = match.group(2).strip()
+    return mapping
+
+
+def extraire_mapping(csv_path: Path = RAW_DATA_PATH, block_size: int = 1 << 20) -> dict[int, str]:
+    """Mapping id -> nom de quartier du CSV brut (une colonne lue, regex sur les distincts)."""
+    return parser_libelles(libelles_distincts(Path(csv_path), block_size))
+
+
+def lire_artefact(path: Path = MAPPING_PATH) -> Optional[dict[str, Any]]:
+    """Contenu de l'artefact ; l'ancien format (dict {id: nom} à plat) est converti. None si absent."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        content = json.load(f)
+    if "mapping" not in content:
+        content = {"format_version": 0, "source": None, "mapping": content}
+    content["mapping"] = {int(key): value for key, value in content["mapping"].items()}
+    return content
+
+
+def ecrire_artefact(mapping: dict[int, str], source: Optional[dict[str, Any]], path: Path = MAPPING_PATH) -> None:
+    """Écrit l'artefact versionné (ids triés)."""
+    content = {
+        "format_version": MAPPING_FORMAT_VERSION,
+        "source": source,
+        "n_neighborhoods": len(mapping),
+        "mapping": {str(key): mapping[key] for key in sorted(mapping)},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=2, ensure_ascii=False)
+
+
+def mettre_a_jour_mapping(
+    csv_path: Path = RAW_DATA_PATH,
+    path: Path = MAPPING_PATH,
+    block_size: int = 1 << 20,
+    force: bool = False,
+) -> dict[int, str]:
+    """Retourne le mapping, en ne relisant le CSV que s'il a changé depuis l'artefact.
+
+    - CSV absent : l'artefact existant est retourné (dict vide s'il n'y en a pas) ;
+    - artefact à jour (même empreinte et même version de format) : retourné sans lecture ;
+    - sinon (ou `force`) : extraction puis écriture de l'artefact.
+    """
+    csv_path, path = Path(csv_path), Path(path)
+    artefact = lire_artefact(path)
+    if not csv_path.exists():
+        return artefact["mapping"] if artefact is not None else {}
+
+    source = empreinte_source(csv_path)
+    if (not force and artefact is not None and artefact["source"] == source
+            and artefact["format_version"] == MAPPING_FORMAT_VERSION):
+        return artefact["mapping"]
+
+    mapping = extraire_mapping(csv_path, block_size)
+    ecrire_artefact(mapping, source, path)
+    return mapping
+
+
+def main() -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Extrait le mapping id -> nom de quartier du CSV brut.")
+    parser.add_argument("--csv", type=Path, default=RAW_DATA_PATH, help="CSV brut (houses_madrid.csv)")
+    parser.add_argument("--output", type=Path, default=MAPPING_PATH, help="Artefact JSON")
+    parser.add_argument("--block-mb", type=int, default=1, help="Taille des blocs lus (Mo)")
+    parser.add_argument("--force", action="store_true", help="Relit le CSV même si l'artefact est à jour")
+    args = parser.parse_args()
+
+    if not args.csv.exists():
+        print(f"⚠️ CSV introuvable ({args.csv}) : artefact existant conservé")
+    start = time.perf_counter()
+    mapping = mettre_a_jour_mapping(args.csv, args.output, args.block_mb << 20, args.force)
+    print(f"🗺️ {len(mapping)} quartiers -> {args.output} ({time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : neighborhood_mapping.py
+# Rôle : extraction en flux du mapping des quartiers et artefact versionné
+# Date : 2026-10-17
@@ -0,0 +1,307 @@
+"""Caches de prédictions : en mémoire (LRU borné, TTL optionnel) et sur disque (SQLite).
+
+La clé est le tuple canonique des 10 champs de `PropertyData`, dans l'ordre
+des `input_columns` : deux formulaires identiques envoyés par le front
+Streamlit partagent donc la même entrée.
+
+Le cache disque (`PersistentPredictionCache`) est partagé entre les workers
+uvicorn d'une même machine et survit aux redémarrages : base SQLite en mode
+WAL (lectures concurrentes pendant les écritures), clé = version des artefacts
++ tuple canonique. Les écritures sont regroupées en transactions par un thread
+de fond, pour ne pas bloquer la boucle d'événements sur un fsync.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger("apartment_hunter.api")
+
+
+def cle_canonique(data: Any, columns: list[str]) -> tuple[int, ...]:
+    """Construit la clé de cache (tuple d'entiers ordonné) d'un PropertyData."""
+    return tuple(int(getattr(data, c)) for c in columns)
+
+
+class PredictionCache:
+    """Cache LRU thread-safe avec durée de vie optionnelle et compteurs."""
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retourne la valeur associée à `key` (et la marque comme récente), sinon None."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            stored_at, value = item
+            if self.ttl_s > 0 and time.monotonic() - stored_at > self.ttl_s:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Ajoute une entrée et évince la moins récemment utilisée si le cache est plein."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Vide le cache (par exemple après rechargement du modèle)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Retourne les compteurs exposés sur la route de santé."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class PersistentPredictionCache:
+    """Cache de log-prédictions sur disque (SQLite WAL), partagé entre processus.
+
+    - invalidation : la version des artefacts fait partie de la clé ; `invalider`
+      supprime les entrées des autres versions après un rechargement ;
+    - taille bornée : au-delà de `max_entries`, les entrées les moins récemment
+      utilisées sont évincées (date d'usage rafraîchie au plus une fois par
+      `touch_interval_s`, pour que les lectures restent sans écriture).
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 1_000_000,
+        flush_interval_s: float = 0.5,
+        flush_size: int = 256,
+        touch_interval_s: float = 60.0,
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.flush_interval_s = flush_interval_s
+        self.flush_size = flush_size
+        self.touch_interval_s = touch_interval_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        # Écritures en attente : (version, clé) -> (valeur, date d'usage) ; None = rafraîchir la date seulement
+        self._pending: dict[tuple[str, str], tuple[Optional[float], float]] = {}
+        self._flush_lock = threading.Lock()
+        self._writes_since_check = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connexion()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " version TEXT NOT NULL, key TEXT NOT NULL, value REAL NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (version, key)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_last_used ON predictions (last_used)")
+        conn.commit()
+        self._size = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+        self._wake = threading.Event()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._boucle_ecriture, name="prediction-cache-writer", daemon=True)
+        self._thread.start()
+
+    def _connexion(self) -> sqlite3.Connection:
+        """Connexion propre au thread courant (sqlite3 n'en partage pas entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _cle(row: Sequence[int]) -> str:
+        return ",".join(map(str, row))
+
+    def get(self, version: str, row: Sequence[int]) -> Optional[np.float32]:
+        """Retourne la log-prédiction de `row` pour la version `version`, sinon None."""
+        key = self._cle(row)
+        with self._lock:
+            pending = self._pending.get((version, key))
+        if pending is not None and pending[0] is not None:
+            value = pending[0]
+        else:
+            try:
+                found = self._connexion().execute(
+                    "SELECT value, last_used FROM predictions WHERE version = ? AND key = ?", (version, key)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Cache disque illisible : {e}")
+                found = None
+            if found is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+            value, last_used = found
+            now = time.time()
+            if now - last_used > self.touch_interval_s:
+                with self._lock:
+                    self._pending.setdefault((version, key), (None, now))
+        with self._lock:
+            self.hits += 1
+        # Même type que la sortie du modèle : expm1 identique quelle que soit la source
+        return np.float32(value)
+
+    def put(self, version: str, row: Sequence[int], value: float) -> None:
+        """Programme l'écriture d'une entrée (écrite par le thread de fond)."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._pending[(version, self._cle(row))] = (float(value), time.time())
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self._wake.set()  # réveille le thread d'écriture sans attendre l'intervalle
+
+    def _boucle_ecriture(self) -> None:
+        while not self._closing.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self) -> None:
+        """Écrit les entrées en attente en une transaction, puis évince si la taille est dépassée."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            inserts = [(v, k, value, used) for (v, k), (value, used) in pending.items() if value is not None]
+            touches = [(used, v, k) for (v, k), (value, used) in pending.items() if value is None]
+            conn = self._connexion()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO predictions (version, key, value, last_used) VALUES (?, ?, ?, ?)", inserts
+                )
+                conn.executemany("UPDATE predictions SET last_used = ? WHERE version = ? AND key = ?", touches)
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                with self._lock:
+                    self.write_errors += 1
+                logger.warning(f"⚠️ Écriture du cache disque échouée ({len(pending)} entrées perdues) : {e}")
+                return
+            self._writes_since_check += len(inserts)
+            # COUNT(*) parcourt la table : vérifié tous les 1000 ajouts seulement (ou si la taille estimée déborde)
+            if self._writes_since_check >= 1000 or self._size + self._writes_since_check > self.max_entries:
+                self._evincer(conn)
+
+    def _evincer(self, conn: sqlite3.Connection) -> None:
+        """Ramène la table à 90 % de `max_entries` (les entrées les moins récemment utilisées partent)."""
+        self._writes_since_check = 0
+        try:
+            size = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+            excess = size - int(self.max_entries * 0.9) if size > self.max_entries else 0
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM predictions WHERE (version, key) IN "
+                    "(SELECT version, key FROM predictions ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                size -= excess
+                with self._lock:
+                    self.evictions += excess
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Éviction du cache disque échouée : {e}")
+            return
+        self._size = size
+
+    def invalider(self, version: str) -> int:
+        """Supprime les entrées produites par une autre version que `version` ; retourne leur nombre."""
+        self.flush()
+        try:
+            deleted = self._connexion().execute("DELETE FROM predictions WHERE version != ?", (version,)).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Invalidation du cache disque échouée : {e}")
+            return 0
+        self._size = max(self._size - deleted, 0)
+        if deleted:
+            logger.info(f"🧹 Cache disque : {deleted} prédictions d'anciennes versions supprimées")
+        return deleted
+
+    def clear(self) -> None:
+        """Vide entièrement le cache disque (toutes versions)."""
+        with self._lock:
+            self._pending.clear()
+        self._connexion().execute("DELETE FROM predictions")
+        self._size = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Compteurs de ce processus ; `size` est estimé (recompté à chaque contrôle d'éviction)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": str(self.path),
+                "size": self._size + self._writes_since_check,
+                "max_entries": self.max_entries,
+                "pending_writes": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "write_errors": self.write_errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        """Arrête le thread d'écriture (après une dernière écriture) et ferme les connexions."""
+        self._closing.set()
+        self._wake.set()
+        self._thread.join(timeout=10)
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+# --- Cartouche ---
+# Fichier : prediction_cache.py
+# Rôle : caches des prédictions de l'API (LRU/TTL en mémoire, SQLite partagé sur disque)
+# Date : 2026-10-17
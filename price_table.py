@@ -0,0 +1,283 @@
+"""Table de prix précalculée sur l'espace discret des entrées du modèle.
+
+Toutes les entrées de `PropertyData` sont entières : sur la plage courante de
+surface, de pièces et de salles de bain, l'espace complet (quartiers x 64
+combinaisons d'équipements x pièces x salles de bain x surface) peut être
+évalué hors ligne. La table est stockée dans un `.npy` lu en memory-map, avec
+un fichier JSON décrivant les axes et l'empreinte des artefacts utilisés.
+
+L'API répond alors aux requêtes dans la grille par une simple lecture d'index
+(O(1)) et retombe sur le modèle pour le reste.
+
+Usage :
+    uv run python price_table.py --sq-min 20 --sq-max 250 --rooms-max 6 --baths-max 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parent
+MODELS_DIR = ROOT / "models"
+TABLE_FILENAME = "price_table.npy"
+
+# Ordre des 6 indicateurs binaires = ordre des bits dans l'index d'équipements
+FLAG_COLUMNS = [
+    "has_lift",
+    "has_parking",
+    "has_pool",
+    "has_garden",
+    "has_storage_room",
+    "is_floor_under",
+]
+FLAG_WEIGHTS = 1 << np.arange(len(FLAG_COLUMNS))
+
+
+def empreinte_artefacts(paths: list[Path | str]) -> str:
+    """Calcule une empreinte SHA-256 (tronquée) du contenu des artefacts."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class PriceTable:
+    """Table de log-prix indexée par (quartier, équipements, pièces, salles de bain, surface)."""
+
+    def __init__(self, values: np.ndarray, meta: dict[str, Any]):
+        self.values = values
+        self.meta = meta
+        self.neighborhoods = list(meta["neighborhoods"])
+        self.sq_min, self.sq_max = meta["sq_mt_built"]
+        self.rooms_min, self.rooms_max = meta["n_rooms"]
+        self.baths_min, self.baths_max = meta["n_bathrooms"]
+        # Lookup id de quartier -> position sur l'axe 0 (-1 = hors grille)
+        self.neigh_lookup = np.full(max(self.neighborhoods) + 1, -1, dtype=np.int64)
+        for i, neigh_id in enumerate(self.neighborhoods):
+            self.neigh_lookup[neigh_id] = i
+
+    @classmethod
+    def charger(cls, table_path: Path | str, expected_hash: Optional[str] = None) -> Optional["PriceTable"]:
+        """Ouvre la table en memory-map ; None si absente ou construite pour d'autres artefacts."""
+        table_path = Path(table_path)
+        meta_path = table_path.with_suffix(".json")
+        if not table_path.exists() or not meta_path.exists():
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if expected_hash is not None and meta.get("artifacts_hash") != expected_hash:
+            return None
+        values = np.load(table_path, mmap_mode="r")
+        return cls(values, meta)
+
+    def lookup(self, record: Any) -> Optional[float]:
+        """Retourne le log-prix d'un PropertyData, ou None s'il est hors grille."""
+        neigh = record.neighborhood
+        if not 0 <= neigh < len(self.neigh_lookup):
+            return None
+        i_neigh = self.neigh_lookup[neigh]
+        if i_neigh < 0:
+            return None
+        if not (self.sq_min <= record.sq_mt_built <= self.sq_max
+                and self.rooms_min <= record.n_rooms <= self.rooms_max
+                and self.baths_min <= record.n_bathrooms <= self.baths_max):
+            return None
+        i_flags = 0
+        for bit, col in enumerate(FLAG_COLUMNS):
+            flag = getattr(record, col)
+            if flag not in (0, 1):
+                return None
+            i_flags |= flag << bit
+        return self.values[
+            i_neigh,
+            i_flags,
+            record.n_rooms - self.rooms_min,
+            record.n_bathrooms - self.baths_min,
+            record.sq_mt_built - self.sq_min,
+        ]
+
+    def lookup_array(self, X: np.ndarray, input_columns: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Version vectorisée : retourne (log-prix, masque des lignes trouvées dans la grille)."""
+        X = np.asarray(X)
+        col = {c: X[:, i] for i, c in enumerate(input_columns)}
+        n_rows = X.shape[0]
+        out = np.full(n_rows, np.nan, dtype=self.values.dtype)
+
+        neigh = col["neighborhood"].astype(np.int64)
+        in_range = (neigh >= 0) & (neigh < len(self.neigh_lookup))
+        i_neigh = np.full(n_rows, -1, dtype=np.int64)
+        i_neigh[in_range] = self.neigh_lookup[neigh[in_range]]
+        flags = np.stack([col[c] for c in FLAG_COLUMNS], axis=1).astype(np.int64)
+        mask = (
+            (i_neigh >= 0)
+            & np.all((flags == 0) | (flags == 1), axis=1)
+            & (col["sq_mt_built"] >= self.sq_min) & (col["sq_mt_built"] <= self.sq_max)
+            & (col["n_rooms"] >= self.rooms_min) & (col["n_rooms"] <= self.rooms_max)
+            & (col["n_bathrooms"] >= self.baths_min) & (col["n_bathrooms"] <= self.baths_max)
+        )
+        if mask.any():
+            out[mask] = self.values[
+                i_neigh[mask],
+                flags[mask] @ FLAG_WEIGHTS,
+                col["n_rooms"][mask].astype(np.int64) - self.rooms_min,
+                col["n_bathrooms"][mask].astype(np.int64) - self.baths_min,
+                col["sq_mt_built"][mask].astype(np.int64) - self.sq_min,
+            ]
+        return out, mask
+
+
+def construire_table(
+    model: Any,
+    compiled: Any,
+    neighborhoods: list[int],
+    sq_range: tuple[int, int],
+    rooms_range: tuple[int, int],
+    baths_range: tuple[int, int],
+    output_path: Path,
+    artifacts_hash: str,
+) -> dict[str, Any]:
+    """Évalue le modèle sur toute la grille, quartier par quartier, et écrit la table + métadonnées."""
+    sq = np.arange(sq_range[0], sq_range[1] + 1)
+    rooms = np.arange(rooms_range[0], rooms_range[1] + 1)
+    baths = np.arange(baths_range[0], baths_range[1] + 1)
+    flags = np.arange(1 << len(FLAG_COLUMNS))
+    shape = (len(neighborhoods), len(flags), len(rooms), len(baths), len(sq))
+
+    # Grille (équipements, pièces, sdb, surface) commune à tous les quartiers, ordre C
+    g_flags, g_rooms, g_baths, g_sq = (a.ravel() for a in np.meshgrid(flags, rooms, baths, sq, indexing="ij"))
+    block = np.zeros((g_sq.size, len(compiled.input_columns)))
+    pos = {c: i for i, c in enumerate(compiled.input_columns)}
+    block[:, pos["sq_mt_built"]] = g_sq
+    block[:, pos["n_rooms"]] = g_rooms
+    block[:, pos["n_bathrooms"]] = g_baths
+    for bit, c in enumerate(FLAG_COLUMNS):
+        block[:, pos[c]] = (g_flags >> bit) & 1
+
+    values = np.lib.format.open_memmap(output_path, mode="w+", dtype=np.float32, shape=shape)
+    start = time.perf_counter()
+    for i, neigh_id in enumerate(neighborhoods):
+        block[:, pos["neighborhood"]] = neigh_id
+        preds = model.predict(compiled.transform_array(block))
+        values[i] = np.asarray(preds, dtype=np.float32).reshape(shape[1:])
+    values.flush()
+    build_time = time.perf_counter() - start
+    del values
+
+    meta = {
+        "neighborhoods": [int(n) for n in neighborhoods],
+        "flag_columns": FLAG_COLUMNS,
+        "n_rooms": [int(rooms_range[0]), int(rooms_range[1])],
+        "n_bathrooms": [int(baths_range[0]), int(baths_range[1])],
+        "sq_mt_built": [int(sq_range[0]), int(sq_range[1])],
+        "shape": list(shape),
+        "dtype": "float32",
+        "target": "log",
+        "artifacts_hash": artifacts_hash,
+        "build_time_s": round(build_time, 3),
+    }
+    with open(output_path.with_suffix(".json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    return meta
+
+
+def mesurer_latence(table: PriceTable, model: Any, compiled: Any, n_samples: int = 2000, seed: int = 0) -> dict[str, float]:
+    """Compare la latence lookup vs modèle sur des entrées tirées dans la grille (et vérifie la parité)."""
+    from types import SimpleNamespace
+
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(n_samples):
+        rec = {
+            "sq_mt_built": int(rng.integers(table.sq_min, table.sq_max + 1)),
+            "n_rooms": int(rng.integers(table.rooms_min, table.rooms_max + 1)),
+            "n_bathrooms": int(rng.integers(table.baths_min, table.baths_max + 1)),
+            "neighborhood": int(rng.choice(table.neighborhoods)),
+        }
+        rec.update({c: int(rng.integers(0, 2)) for c in FLAG_COLUMNS})
+        records.append(SimpleNamespace(**rec))
+
+    start = time.perf_counter()
+    from_table = [table.lookup(r) for r in records]
+    t_lookup = (time.perf_counter() - start) / n_samples
+
+    sample = records[:200]
+    start = time.perf_counter()
+    from_model = [model.predict(compiled.transform_records([r]))[0] for r in sample]
+    t_model = (time.perf_counter() - start) / len(sample)
+
+    max_diff = float(np.max(np.abs(np.array(from_table[:len(sample)]) - np.array(from_model))))
+    return {"lookup_us": t_lookup * 1e6, "model_us": t_model * 1e6, "max_abs_diff_log": max_diff}
+
+
+def main() -> None:
+    """Point d'entrée : construction de la table, puis rapport taille / temps / latence."""
+    import joblib
+
+    from fast_preprocessing import compiler_preprocesseur
+    from model_store import charger_modele, fichier_modele
+
+    parser = argparse.ArgumentParser(description="Précalcule la table de prix sur la grille discrète.")
+    parser.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    parser.add_argument("--model-file", default="xgboost_model.pkl")
+    parser.add_argument("--sq-min", type=int, default=20)
+    parser.add_argument("--sq-max", type=int, default=250)
+    parser.add_argument("--rooms-min", type=int, default=0)
+    parser.add_argument("--rooms-max", type=int, default=6)
+    parser.add_argument("--baths-min", type=int, default=1)
+    parser.add_argument("--baths-max", type=int, default=4)
+    args = parser.parse_args()
+
+    model_path = args.models_dir / args.model_file
+    preprocessor_path = args.models_dir / "preprocessor.pkl"
+    # Même fichier que celui servi par l'API (format natif prioritaire s'il existe)
+    model, _ = charger_modele(model_path)
+    preprocessor = joblib.load(preprocessor_path)
+    compiled = compiler_preprocesseur(preprocessor)
+
+    # Quartiers connus de l'encodeur (un quartier inconnu passe par le modèle)
+    onehot = preprocessor.named_transformers_["cat"].named_steps["onehot"]
+    neighborhoods = sorted(int(c) for c in onehot.categories_[0] if str(c).isdigit())
+
+    output_path = args.models_dir / TABLE_FILENAME
+    meta = construire_table(
+        model,
+        compiled,
+        neighborhoods,
+        sq_range=(args.sq_min, args.sq_max),
+        rooms_range=(args.rooms_min, args.rooms_max),
+        baths_range=(args.baths_min, args.baths_max),
+        output_path=output_path,
+        artifacts_hash=empreinte_artefacts([fichier_modele(model_path), preprocessor_path]),
+    )
+
+    n_entries = int(np.prod(meta["shape"]))
+    size_mb = output_path.stat().st_size / 1e6
+    print(f"✅ Table exportée : {output_path}")
+    print(f"📦 Taille : {n_entries:,} entrées ({size_mb:.1f} Mo) - forme {tuple(meta['shape'])}")
+    print(f"⏱️ Construction : {meta['build_time_s']:.1f} s")
+
+    table = PriceTable.charger(output_path)
+    latency = mesurer_latence(table, model, compiled)
+    print(
+        f"⚡ Latence - lookup : {latency['lookup_us']:.2f} µs | modèle : {latency['model_us']:.1f} µs "
+        f"| écart max (log) : {latency['max_abs_diff_log']:.2e}"
+    )
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : price_table.py
+# Rôle : précalcul et lecture de la table de prix (grille discrète)
+# Date : 2026-10-17
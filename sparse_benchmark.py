@@ -0,0 +1,116 @@
+"""Banc dense vs sparse (CSR) de la chaîne préprocesseur -> modèle.
+
+Sur des annonces synthétiques (colonnes du modèle), le préprocesseur de
+train_export_model produit une matrice CSR (~7 non-zéros par ligne sur ~145
+colonnes). Le banc compare, pour la même matrice en dense et en CSR :
+- la mémoire de la matrice ;
+- le préprocesseur compilé : ancienne construction (matrice dense puis CSR)
+  vs construction directe de la CSR (pic d'allocation mesuré par tracemalloc) ;
+- le temps d'entraînement Ridge et XGBoost, et l'écart des prédictions.
+
+XGBoost ne stocke pas les zéros d'une CSR et les traite comme des valeurs
+manquantes : la version dense est donc entraînée avec `missing=0.0` pour
+apprendre le même modèle.
+
+Usage :
+    uv run python sparse_benchmark.py --rows 500000
+    uv run python sparse_benchmark.py --rows 200000 --models ridge
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from typing import Any
+
+import numpy as np
+from scipy import sparse
+
+from fast_preprocessing import compiler_preprocesseur
+from model_tuning import annonces_modele
+from train_export_model import construire_preprocesseur, preparer_features
+
+
+def taille_matrice(X: Any) -> int:
+    """Octets occupés par une matrice dense ou CSR."""
+    if sparse.issparse(X):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def pic_allocation(fn, *args) -> tuple[float, int, Any]:
+    """Durée (s), pic d'allocation (octets, tracemalloc) et résultat d'un appel."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def dense_puis_csr(compiled: Any, X_rows: np.ndarray) -> sparse.csr_matrix:
+    """Ancienne construction : matrice dense (n, n_features) puis conversion CSR."""
+    dense = compiled.__class__(**{**compiled.__dict__, "sparse_output": False}).transform_array(X_rows)
+    return sparse.csr_matrix(dense)
+
+
+def chronometrer_fit(model: Any, X: Any, y: np.ndarray) -> tuple[float, Any]:
+    start = time.perf_counter()
+    model.fit(X, y)
+    return time.perf_counter() - start, model
+
+
+def main() -> None:
+    """Point d'entrée CLI."""
+    parser = argparse.ArgumentParser(description="Banc dense vs CSR du préprocesseur et des modèles.")
+    parser.add_argument("--rows", type=int, default=500_000, help="Annonces synthétiques")
+    parser.add_argument("--models", default="ridge,xgboost", help="Modèles à entraîner : ridge, xgboost")
+    parser.add_argument("--n-estimators", type=int, default=100, help="Arbres XGBoost")
+    args = parser.parse_args()
+
+    X_df, y = annonces_modele(args.rows)
+    X_df = preparer_features(X_df)
+    preprocessor = construire_preprocesseur().fit(X_df)
+    X_csr = preprocessor.transform(X_df)
+    X_dense = X_csr.toarray()
+    y = y.to_numpy()
+    print(f"📊 {args.rows:,} lignes x {X_csr.shape[1]} colonnes, {X_csr.nnz / args.rows:.1f} non-zéros par ligne")
+    print(f"💾 Matrice : dense {taille_matrice(X_dense) / 1e6:.1f} Mo | CSR {taille_matrice(X_csr) / 1e6:.1f} Mo "
+          f"(x{taille_matrice(X_dense) / taille_matrice(X_csr):.1f})")
+
+    # Préprocesseur compilé (chemin API / scoring en masse)
+    compiled = compiler_preprocesseur(preprocessor)
+    X_rows = X_df.assign(neighborhood=X_df["neighborhood"].astype(float)).to_numpy(dtype=float)
+    t_old, peak_old, old = pic_allocation(dense_puis_csr, compiled, X_rows)
+    t_new, peak_new, new = pic_allocation(compiled.transform_array, X_rows)
+    identical = (old != new).nnz == 0 and np.array_equal(old.indices, new.indices)
+    print(f"⏱️ Compilé dense -> CSR : {t_old:.3f} s, pic {peak_old / 1e6:.0f} Mo")
+    print(f"⏱️ Compilé CSR direct   : {t_new:.3f} s, pic {peak_new / 1e6:.0f} Mo | identiques : {'✅' if identical else '❌'}")
+
+    models = args.models.split(",")
+    if "ridge" in models:
+        from sklearn.linear_model import Ridge
+
+        t_dense, ridge_dense = chronometrer_fit(Ridge(tol=1e-10), X_dense, y)
+        t_csr, ridge_csr = chronometrer_fit(Ridge(tol=1e-10), X_csr, y)
+        diff = np.abs(ridge_dense.coef_ - ridge_csr.coef_).max()
+        print(f"⏱️ Ridge   : dense {t_dense:.2f} s | CSR {t_csr:.2f} s | écart coef {diff:.1e}")
+    if "xgboost" in models:
+        from xgboost import XGBRegressor
+
+        params = dict(n_estimators=args.n_estimators, max_depth=5, learning_rate=0.1, tree_method="hist")
+        t_dense, xgb_dense = chronometrer_fit(XGBRegressor(missing=0.0, **params), X_dense, y)
+        t_csr, xgb_csr = chronometrer_fit(XGBRegressor(**params), X_csr, y)
+        diff = np.abs(xgb_dense.predict(X_dense[:10_000]) - xgb_csr.predict(X_csr[:10_000])).max()
+        print(f"⏱️ XGBoost : dense {t_dense:.2f} s | CSR {t_csr:.2f} s | écart prédictions {diff:.1e}")
+
+
+if __name__ == "__main__":
+    main()
+
+# --- Cartouche ---
+# Fichier : sparse_benchmark.py
+# Rôle : banc mémoire et temps d'entraînement, matrice dense vs CSR
+# Date : 2026-10-17
@@ -0,0 +1,119 @@
+"""Parité du préprocesseur compilé (fast_preprocessing) avec `preprocessor.transform`.
+
+Deux préprocesseurs sont testés : celui de train_export_model ajusté sur des
+annonces synthétiques (toujours disponible) et `models/preprocessor.pkl`
+(s'il est présent). Les entrées sont des matrices (n, 10) ordonnées comme
+INPUT_COLUMNS, NaN = valeur manquante, comme dans l'API.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from fast_preprocessing import compiler_preprocesseur, echantillon_synthetique
+from model_tuning import annonces_modele
+from train_export_model import USEFUL_FEATURES, construire_preprocesseur, preparer_features
+
+MODELS_DIR = Path(__file__).resolve().parent.parent / "models"
+
+
+def _preprocesseur_synthetique():
+    X, _ = annonces_modele(5_000, seed=0)
+    return construire_preprocesseur().fit(preparer_features(X))
+
+
+def _preprocesseur_exporte():
+    path = MODELS_DIR / "preprocessor.pkl"
+    if not path.exists():
+        pytest.skip("models/preprocessor.pkl absent")
+    return joblib.load(path)
+
+
+@pytest.fixture(scope="module", params=["synthetique", "exporte"])
+def preprocessor(request):
+    return _preprocesseur_synthetique() if request.param == "synthetique" else _preprocesseur_exporte()
+
+
+@pytest.fixture(scope="module")
+def compiled(preprocessor):
+    return compiler_preprocesseur(preprocessor, USEFUL_FEATURES)
+
+
+def reference(preprocessor, X: np.ndarray) -> np.ndarray:
+    """Sortie sklearn, avec la même préparation que l'API (quartier entier -> string)."""
+    df = pd.DataFrame(X, columns=USEFUL_FEATURES)
+    neighborhood = df["neighborhood"].astype("Int64").astype("string")
+    df["neighborhood"] = neighborhood.astype(object).where(neighborhood.notna(), np.nan)
+    return _dense(preprocessor.transform(df))
+
+
+def _dense(X) -> np.ndarray:
+    return X.toarray() if sparse.issparse(X) else np.asarray(X)
+
+
+def _lignes(n_rows: int, seed: int = 0, **overrides) -> np.ndarray:
+    """Matrice (n, 10) d'annonces plausibles ; `overrides` fixe une colonne."""
+    rng = np.random.default_rng(seed)
+    columns = {
+        "sq_mt_built": rng.integers(20, 400, n_rows),
+        "n_rooms": rng.integers(0, 7, n_rows),
+        "n_bathrooms": rng.integers(1, 5, n_rows),
+        "neighborhood": rng.integers(1, 136, n_rows),
+    }
+    for col in USEFUL_FEATURES[4:]:
+        columns[col] = rng.integers(0, 2, n_rows)
+    columns.update(overrides)
+    return np.column_stack([np.asarray(columns[c], dtype=float) for c in USEFUL_FEATURES])
+
+
+def test_lignes_aleatoires(preprocessor, compiled):
+    X = _lignes(2_000, seed=1)
+    np.testing.assert_allclose(_dense(compiled.transform_array(X)), reference(preprocessor, X), atol=1e-9)
+
+
+def test_echantillon_avec_manquants(preprocessor, compiled):
+    # Quartiers hors vocabulaire et ~2 % de NaN dans chaque colonne
+    columns = echantillon_synthetique(compiled, n_rows=2_000, seed=2)
+    X = np.column_stack([columns[c] for c in USEFUL_FEATURES])
+    np.testing.assert_allclose(_dense(compiled.transform_columns(columns)), reference(preprocessor, X), atol=1e-9)
+
+
+def test_quartier_inconnu(preprocessor, compiled):
+    X = _lignes(50, seed=3, neighborhood=np.full(50, 9_999))
+    out = _dense(compiled.transform_array(X))
+    np.testing.assert_allclose(out, reference(preprocessor, X), atol=1e-9)
+    # handle_unknown="ignore" : aucune colonne one-hot allumée
+    cat = preprocessor.output_indices_["cat"]
+    assert not out[:, cat].any()
+
+
+def test_binaires_none(preprocessor, compiled):
+    records = [
+        {"sq_mt_built": 90, "n_rooms": 3, "n_bathrooms": 1, "neighborhood": 12,
+         "has_lift": None, "has_parking": None, "has_pool": 1, "has_garden": None,
+         "has_storage_room": 0, "is_floor_under": None},
+        {"sq_mt_built": 60, "n_rooms": 2, "n_bathrooms": 1, "neighborhood": 77,
+         **{col: None for col in USEFUL_FEATURES[4:]}},
+    ]
+    X = np.array([[np.nan if r[c] is None else r[c] for c in USEFUL_FEATURES] for r in records], dtype=float)
+    np.testing.assert_allclose(_dense(compiled.transform_records(records)), reference(preprocessor, X), atol=1e-9)
+
+
+def test_lot_vide(preprocessor, compiled):
+    # sklearn refuse un lot vide : forme et format comparés à la sortie d'une ligne
+    X = _lignes(1)
+    df = pd.DataFrame(X, columns=USEFUL_FEATURES).astype({"neighborhood": int}).astype({"neighborhood": str})
+    expected = preprocessor.transform(df)
+    for out in (
+        compiled.transform_array(np.empty((0, len(USEFUL_FEATURES)))),
+        compiled.transform_records([]),
+        compiled.transform_columns({}),
+    ):
+        assert out.shape == (0, expected.shape[1])
+        assert sparse.issparse(out) == sparse.issparse(expected)
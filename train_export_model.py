@@ -3,16 +3,29 @@
 Ce script recharge les jeux d'entraînement/test, reconstruit le préprocesseur,
 entraîne un modèle Ridge sur la cible en log, puis sauvegarde tous les artefacts
 (utiles pour l'API et l'UI Streamlit).
+
+Mode incrémental (--delta-x/--delta-y) : seules les nouvelles annonces sont
+traitées (statistiques suffisantes pour Ridge, boosting continué pour XGBoost)
+et les artefacts ne sont exportés que si le holdout ne se dégrade pas.
 """
 
 from __future__ import annotations
 
+import argparse
 import json
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Iterator, Optional
 
 import joblib
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from scipy.linalg import solve
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import Ridge
@@ -20,10 +33,19 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+from neighborhood_mapping import mettre_a_jour_mapping
+
 
 ROOT = Path(__file__).resolve().parent
 DATA_MODEL_DIR = ROOT / "data_model"
 MODELS_DIR = ROOT / "models"
+# Nouvelles annonces ajoutées par l'entraînement incrémental (un fichier par incrément)
+INCREMENTS_DIR = DATA_MODEL_DIR / "increments"
+TRAINING_STATE_PATH = MODELS_DIR / "training_state.joblib"
+# Préprocesseur du Ridge : son scaler suit les incréments, alors que preprocessor.pkl
+# (servi par l'API avec le modèle XGBoost) reste celui du dernier entraînement complet
+RIDGE_PREPROCESSOR_PATH = MODELS_DIR / "ridge_preprocessor.pkl"
+RIDGE_TOL = 1e-10
 RAW_DATA_PATH = ROOT / "raw_data" / "houses_madrid.csv"
 
 USEFUL_FEATURES = [
@@ -52,31 +74,34 @@ BINARY_FEATURES = [
 
 
 def construire_mapping_quartiers() -> dict[int, str]:
-    """Construit le mapping id -> nom de quartier à partir du CSV brut."""
-    try:
-        df = pd.read_csv(RAW_DATA_PATH, encoding="utf-8-sig")
-    except Exception:
-        df = pd.read_csv(RAW_DATA_PATH, encoding="latin-1")
-
-    if "neighborhood_id" not in df.columns:
-        return {}
-
-    import re
+    """Mapping id -> nom de quartier, via l'artefact versionné de neighborhood_mapping.
 
-    mapping: dict[int, str] = {}
-    pattern = re.compile(r"Neighborhood\s+(\d+):\s*([^\(\-]+)")
-    for raw in df["neighborhood_id"].dropna().unique().tolist():
-        match = pattern.search(str(raw))
-        if match:
-            mapping[int(match.group(1))] = match.group(2).strip()
-    return mapping
+    Le CSV brut n'est relu (colonne neighborhood_id seule, par blocs) que s'il a
+    changé depuis le dernier artefact.
+    """
+    return mettre_a_jour_mapping(RAW_DATA_PATH, MODELS_DIR / "neighborhood_mapping.json")
 
 
 def charger_donnees() -> tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]:
-    """Charge les jeux d'entraînement et de test depuis data_model."""
-    x_train = pd.read_feather(DATA_MODEL_DIR / "X_train.feather")
+    """Charge les jeux d'entraînement et de test depuis data_model.
+
+    Les fichiers sont lus avec leurs types compacts (uint8, category... écrits par
+    export_train_test_feather), en ne lisant que les colonnes utiles au modèle.
+    """
+    x_train = pd.read_feather(DATA_MODEL_DIR / "X_train.feather", columns=USEFUL_FEATURES)
     y_train = pd.read_feather(DATA_MODEL_DIR / "y_train.feather").squeeze()
-    x_test = pd.read_feather(DATA_MODEL_DIR / "X_test.feather")
+    # Annonces ajoutées depuis par entraînement incrémental : le réentraînement complet les inclut
+    increments = sorted(INCREMENTS_DIR.glob("X_*.feather")) if INCREMENTS_DIR.exists() else []
+    if increments:
+        x_train = pd.concat(
+            [x_train] + [pd.read_feather(path, columns=USEFUL_FEATURES) for path in increments],
+            ignore_index=True,
+        )
+        y_train = pd.concat(
+            [y_train] + [pd.read_feather(path.with_name("y" + path.name[1:])).squeeze() for path in increments],
+            ignore_index=True,
+        )
+    x_test = pd.read_feather(DATA_MODEL_DIR / "X_test.feather", columns=USEFUL_FEATURES)
     y_test = pd.read_feather(DATA_MODEL_DIR / "y_test.feather").squeeze()
     return x_train, y_train, x_test, y_test
 
@@ -84,13 +109,22 @@ def charger_donnees() -> tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]
 def preparer_features(x: pd.DataFrame) -> pd.DataFrame:
     """Sélectionne les colonnes utiles et homogénéise les types."""
     x = x[USEFUL_FEATURES].copy()
+    # Les colonnes compactes (float32, int8...) repassent en float64 : même scaler qu'avant
+    x[NUMERIC_FEATURES] = x[NUMERIC_FEATURES].astype("float64")
     # On force le quartier en texte pour un OneHotEncoder stable
     x["neighborhood"] = x["neighborhood"].astype("string")
     return x
 
 
 def construire_preprocesseur() -> ColumnTransformer:
-    """Construit le préprocesseur (numérique, catégoriel, binaire)."""
+    """Construit le préprocesseur (numérique, catégoriel, binaire).
+
+    La sortie est toujours une matrice CSR (sparse_threshold=1.0) : le format ne
+    dépend pas de la densité des données, la mémoire reste proportionnelle aux
+    non-zéros (~7 par ligne sur ~145 colonnes) et Ridge comme XGBoost la
+    consomment directement. XGBoost traite les zéros non stockés comme des
+    valeurs manquantes : entraînement et service doivent donc rester en CSR.
+    """
     preprocessor = ColumnTransformer(
         transformers=[
             (
@@ -108,13 +142,14 @@ def construire_preprocesseur() -> ColumnTransformer:
                 Pipeline(
                     [
                         ("imputer", SimpleImputer(strategy="constant", fill_value="unknown")),
-                        ("onehot", OneHotEncoder(handle_unknown="ignore")),
+                        ("onehot", OneHotEncoder(handle_unknown="ignore", sparse_output=True)),
                     ]
                 ),
                 CATEGORICAL_FEATURES,
             ),
             ("bin", SimpleImputer(strategy="most_frequent"), BINARY_FEATURES),
-        ]
+        ],
+        sparse_threshold=1.0,
     )
     return preprocessor
 
@@ -123,7 +158,9 @@ def entrainer_modele(x_train: pd.DataFrame, y_train: pd.Series) -> tuple[Ridge,
     """Entraîne un modèle Ridge avec prétraitement."""
     preprocessor = construire_preprocesseur()
     x_train_processed = preprocessor.fit_transform(x_train)
-    model = Ridge()
+    # Solveur itératif (sortie sparse) poussé jusqu'à convergence : mêmes coefficients
+    # que la résolution exacte de entrainer_hors_memoire
+    model = Ridge(tol=RIDGE_TOL)
     model.fit(x_train_processed, y_train)
     return model, preprocessor
 
@@ -145,17 +182,41 @@ def evaluer_modele(
     }
 
 
+def resumer_features(x_train: pd.DataFrame) -> dict[str, Any]:
+    """Plages des variables numériques et modalités des catégorielles (config Streamlit)."""
+    return {
+        "ranges": {
+            col: {
+                "min": float(x_train[col].min()),
+                "max": float(x_train[col].max()),
+                "mean": float(x_train[col].mean()),
+            }
+            for col in NUMERIC_FEATURES
+        },
+        "categorical_values": {
+            col: x_train[col].dropna().unique().tolist() for col in CATEGORICAL_FEATURES
+        },
+    }
+
+
 def sauvegarder_artefacts(
     model: Ridge,
     preprocessor: ColumnTransformer,
-    x_train: pd.DataFrame,
+    x_train: Optional[pd.DataFrame],
     y_train: pd.Series,
+    resume: Optional[dict[str, Any]] = None,
 ) -> None:
-    """Sauvegarde modèle, préprocesseur et fichiers de configuration."""
+    """Sauvegarde modèle, préprocesseur et fichiers de configuration.
+
+    `resume` (plages et modalités) remplace x_train quand le train n'est pas en
+    mémoire (entraînement hors mémoire).
+    """
     MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
     joblib.dump(model, MODELS_DIR / "ridge_model.pkl")
     joblib.dump(preprocessor, MODELS_DIR / "preprocessor.pkl")
+    # Entraînement complet : le Ridge repart du même préprocesseur que l'API
+    joblib.dump(preprocessor, RIDGE_PREPROCESSOR_PATH)
 
     config = {
         "input_columns": USEFUL_FEATURES,
@@ -171,28 +232,416 @@ def sauvegarder_artefacts(
         "numeric_features": NUMERIC_FEATURES,
         "categorical_features": CATEGORICAL_FEATURES,
         "binary_features": BINARY_FEATURES,
+        **(resume if resume is not None else resumer_features(x_train)),
+    }
+    with open(MODELS_DIR / "streamlit_config.json", "w", encoding="utf-8") as f:
+        json.dump(streamlit_config, f, indent=2, ensure_ascii=False)
+
+    # Écrit (ou réutilise) models/neighborhood_mapping.json
+    construire_mapping_quartiers()
+
+
+# --- ENTRAÎNEMENT INCRÉMENTAL ---
+def matrice_brute(preprocessor: ColumnTransformer, x: pd.DataFrame) -> sp.csr_matrix:
+    """Sortie du préprocesseur, colonnes numériques imputées mais non standardisées.
+
+    Les statistiques suffisantes sont cumulées sur cette matrice : elles restent
+    valables quand le scaler est mis à jour, la standardisation étant appliquée
+    au moment de la résolution (resoudre_ridge).
+    """
+    num = preprocessor.output_indices_["num"]
+    if num.start != 0:
+        raise ValueError("Les colonnes numériques doivent sortir en premier du préprocesseur")
+    X = sp.csr_matrix(preprocessor.transform(x))
+    imputer = preprocessor.named_transformers_["num"].named_steps["imputer"]
+    raw = imputer.transform(x[NUMERIC_FEATURES]).astype(np.float64)
+    return sp.hstack([sp.csr_matrix(raw), X[:, num.stop:]], format="csr")
+
+
+def accumuler_statistiques(
+    preprocessor: ColumnTransformer,
+    x: pd.DataFrame,
+    y: pd.Series,
+    stats: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
+    """Ajoute un lot aux statistiques suffisantes de la régression : [1 Z]ᵀ[1 Z], [1 Z]ᵀy, yᵀy."""
+    Z = matrice_brute(preprocessor, x)
+    A = sp.hstack([np.ones((Z.shape[0], 1)), Z], format="csr")
+    y = np.asarray(y, dtype=np.float64)
+    batch = {
+        "gram": (A.T @ A).toarray(),
+        "xty": np.asarray(A.T @ y).ravel(),
+        "yty": float(y @ y),
+    }
+    if stats is None:
+        return batch
+    return {key: stats[key] + batch[key] for key in batch}
+
+
+def resoudre_ridge(stats: dict[str, Any], preprocessor: ColumnTransformer, alpha: float = 1.0) -> Ridge:
+    """Ridge (fit_intercept=True) résolu une fois à partir des statistiques suffisantes.
+
+    Même problème que Ridge.fit sur la sortie du préprocesseur : X est centré
+    (l'intercept n'est pas pénalisé), les colonnes numériques sont mises à
+    l'échelle avec le scaler courant, puis (XcᵀXc + αI) w = Xcᵀyc est résolu.
+    """
+    gram, xty = stats["gram"], stats["xty"]
+    n = gram[0, 0]
+    z_mean = gram[0, 1:] / n
+    y_mean = xty[0] / n
+    czz = gram[1:, 1:] - n * np.outer(z_mean, z_mean)
+    czy = xty[1:] - n * z_mean * y_mean
+
+    scaler = preprocessor.named_transformers_["num"].named_steps["scaler"]
+    num = preprocessor.output_indices_["num"]
+    scale = np.ones(len(z_mean))
+    shift = np.zeros(len(z_mean))
+    scale[num] = scaler.scale_ if scaler.scale_ is not None else 1.0
+    shift[num] = scaler.mean_ if scaler.mean_ is not None else 0.0
+
+    # X = (Z - shift) / scale : le centrage absorbe shift, la mise à l'échelle agit des deux côtés
+    cxx = czz / np.outer(scale, scale)
+    cxy = czy / scale
+    coef = solve(cxx + alpha * np.eye(len(cxy)), cxy, assume_a="pos")
+
+    model = Ridge(alpha=alpha)
+    model.coef_ = coef
+    model.intercept_ = float(y_mean - ((z_mean - shift) / scale) @ coef)
+    model.n_features_in_ = len(coef)
+    return model
+
+
+def charger_test() -> tuple[pd.DataFrame, pd.Series]:
+    """Jeu de test (holdout) servant à valider chaque incrément."""
+    x_test = pd.read_feather(DATA_MODEL_DIR / "X_test.feather", columns=USEFUL_FEATURES)
+    y_test = pd.read_feather(DATA_MODEL_DIR / "y_test.feather").squeeze()
+    return preparer_features(x_test), y_test
+
+
+def sauvegarder_etat(stats: dict[str, Any], alpha: float, n_rows: int, increments: list[str]) -> None:
+    """État de l'entraînement incrémental (statistiques suffisantes, lignes vues)."""
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    joblib.dump(
+        {"stats": stats, "alpha": alpha, "n_rows": n_rows, "increments": increments},
+        TRAINING_STATE_PATH,
+    )
+
+
+def charger_preprocesseur_ridge() -> ColumnTransformer:
+    """Préprocesseur du Ridge (ridge_preprocessor.pkl, à défaut preprocessor.pkl)."""
+    if RIDGE_PREPROCESSOR_PATH.exists():
+        return joblib.load(RIDGE_PREPROCESSOR_PATH)
+    return joblib.load(MODELS_DIR / "preprocessor.pkl")
+
+
+def archiver_increment(x_delta: pd.DataFrame, y_delta: pd.Series) -> str:
+    """Ajoute les nouvelles lignes à l'historique (un fichier par incrément, sans réécrire X_train)."""
+    INCREMENTS_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    x_delta.reset_index(drop=True).to_feather(INCREMENTS_DIR / f"X_{stamp}.feather")
+    y_delta.reset_index(drop=True).to_frame().to_feather(INCREMENTS_DIR / f"y_{stamp}.feather")
+    return stamp
+
+
+def regression_metriques(new: dict[str, float], old: dict[str, float], tolerance: float) -> bool:
+    """Vrai si le nouveau modèle est moins bon que l'actuel sur le holdout (RMSE ou MAE)."""
+    return any(new[key] > old[key] * (1 + tolerance) for key in ("rmse", "mae"))
+
+
+def entrainer_incremental(
+    x_delta: pd.DataFrame,
+    y_delta: pd.Series,
+    model_type: str = "ridge",
+    tolerance: float = 0.0,
+    rounds: int = 50,
+) -> dict[str, Any]:
+    """Met à jour le modèle avec les nouvelles annonces seulement.
+
+    - ridge : le scaler est mis à jour en flux (partial_fit), les statistiques
+      suffisantes du delta sont ajoutées à celles de l'historique, puis le
+      système est résolu une fois (resoudre_ridge). Le préprocesseur mis à jour
+      est écrit dans ridge_preprocessor.pkl, jamais dans preprocessor.pkl ;
+    - xgboost : `rounds` arbres supplémentaires sont appris sur le delta à la
+      suite du modèle actuel. Le préprocesseur reste figé : les arbres existants
+      découpent les valeurs standardisées d'origine.
+
+    Imputeurs et encodeur restent ceux de l'historique (réentraînement complet
+    pour les mettre à jour). Les artefacts ne sont exportés que si RMSE et MAE
+    sur le holdout ne se dégradent pas (au-delà de `tolerance`, relative).
+    Le coût dépend de la taille du delta et du holdout, pas de l'historique.
+    """
+    start = time.perf_counter()
+    x_delta = preparer_features(x_delta)
+    x_test, y_test = charger_test()
+
+    if model_type == "ridge":
+        model_path = MODELS_DIR / "ridge_model.pkl"
+        if not TRAINING_STATE_PATH.exists():
+            raise FileNotFoundError(f"{TRAINING_STATE_PATH} absent : lancer d'abord un entraînement complet")
+        preprocessor = charger_preprocesseur_ridge()
+        state = joblib.load(TRAINING_STATE_PATH)
+        current = joblib.load(model_path)
+        old_metrics = evaluer_modele(current, preprocessor, x_test, y_test)
+
+        num = preprocessor.named_transformers_["num"]
+        num.named_steps["scaler"].partial_fit(num.named_steps["imputer"].transform(x_delta[NUMERIC_FEATURES]))
+        stats = accumuler_statistiques(preprocessor, x_delta, y_delta, state["stats"])
+        model = resoudre_ridge(stats, preprocessor, alpha=state["alpha"])
+    elif model_type == "xgboost":
+        model_path = MODELS_DIR / "xgboost_model.pkl"
+        preprocessor = joblib.load(MODELS_DIR / "preprocessor.pkl")
+        current = joblib.load(model_path)
+        old_metrics = evaluer_modele(current, preprocessor, x_test, y_test)
+
+        model = joblib.load(model_path)
+        model.set_params(n_estimators=rounds)
+        model.fit(preprocessor.transform(x_delta), y_delta, xgb_model=current.get_booster())
+    else:
+        raise ValueError("model_type doit être 'ridge' ou 'xgboost'")
+
+    new_metrics = evaluer_modele(model, preprocessor, x_test, y_test)
+    exported = not regression_metriques(new_metrics, old_metrics, tolerance)
+    if exported:
+        stamp = archiver_increment(x_delta, y_delta)
+        joblib.dump(model, model_path)
+        if model_type == "ridge":
+            joblib.dump(preprocessor, RIDGE_PREPROCESSOR_PATH)
+            sauvegarder_etat(stats, state["alpha"], state["n_rows"] + len(x_delta), state["increments"] + [stamp])
+        else:
+            from model_store import exporter_format_natif
+
+            exporter_format_natif(model_path)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"{'✅' if exported else '❌'} Incrément {model_type} : {len(x_delta):,} lignes en {elapsed:.2f} s | "
+        f"RMSE holdout {old_metrics['rmse']:.4f} -> {new_metrics['rmse']:.4f} | "
+        f"MAE {old_metrics['mae']:.4f} -> {new_metrics['mae']:.4f}"
+    )
+    if not exported:
+        print("⚠️ Métriques dégradées : artefacts non exportés, incrément non archivé")
+    return {"exported": exported, "old": old_metrics, "new": new_metrics, "elapsed_s": elapsed}
+
+
+# --- ENTRAÎNEMENT HORS MÉMOIRE ---
+_worker_state: dict[str, Any] = {}
+
+
+def blocs_entrainement(
+    path_x: str | Path, path_y: str | Path, chunk_size: int = 100_000
+) -> Iterator[tuple[pd.DataFrame, pd.Series]]:
+    """Lit X et y (Feather ou Parquet) par blocs alignés, sans charger les fichiers entiers."""
+    from bulk_scoring import colonnes_disponibles, lire_blocs
+
+    path_x, path_y = Path(path_x), Path(path_y)
+    target = colonnes_disponibles(path_y)[0]
+    y_blocks = lire_blocs(path_y, chunk_size, [target])
+    # Les deux fichiers n'ont pas forcément les mêmes découpages internes : y est re-découpé sur X
+    pending = pd.Series(dtype=np.float64, name=target)
+    for x in lire_blocs(path_x, chunk_size, USEFUL_FEATURES):
+        while len(pending) < len(x):
+            block = next(y_blocks, None)
+            if block is None:
+                raise ValueError(f"{path_y} a moins de lignes que {path_x}")
+            pending = pd.concat([pending, block[target]], ignore_index=True) if len(pending) else block[target]
+        pending = pending.reset_index(drop=True)
+        yield x.reset_index(drop=True), pending.iloc[: len(x)]
+        pending = pending.iloc[len(x):]
+    if len(pending) or next(y_blocks, None) is not None:
+        raise ValueError(f"{path_y} a plus de lignes que {path_x}")
+
+
+def _mediane_comptes(counts: pd.Series) -> float:
+    """Médiane exacte (convention NumPy : moyenne des deux valeurs centrales) à partir des effectifs."""
+    counts = counts.sort_index()
+    cum = counts.to_numpy().cumsum()
+    total = cum[-1]
+    low = counts.index[np.searchsorted(cum, (total - 1) // 2, side="right")]
+    high = counts.index[np.searchsorted(cum, total // 2, side="right")]
+    return (low + high) / 2
+
+
+def resumer_flux(path_x: str | Path, chunk_size: int = 100_000) -> dict[str, Any]:
+    """Passe 1 : effectifs des valeurs de chaque variable, en mémoire bornée.
+
+    Les variables du modèle ont peu de valeurs distinctes (surfaces et nombres de
+    pièces entiers, ~135 quartiers, drapeaux 0/1) : leurs effectifs suffisent à
+    retrouver exactement ce qu'apprend le préprocesseur (médianes, modalités, modes).
+    """
+    from bulk_scoring import lire_blocs
+
+    counts: dict[str, pd.Series] = {}
+    has_na = {col: False for col in USEFUL_FEATURES}
+    n_rows = 0
+    for x in lire_blocs(Path(path_x), chunk_size, USEFUL_FEATURES):
+        x = preparer_features(x)
+        n_rows += len(x)
+        for col in USEFUL_FEATURES:
+            # sort=False : les quartiers gardent leur ordre d'apparition (comme unique())
+            vc = x[col].value_counts(sort=False)
+            if col in counts:
+                index = counts[col].index.append(vc.index.difference(counts[col].index, sort=False))
+                vc = counts[col].reindex(index, fill_value=0) + vc.reindex(index, fill_value=0)
+            counts[col] = vc
+            has_na[col] = has_na[col] or bool(x[col].isna().any())
+    if not n_rows:
+        raise ValueError(f"{path_x} est vide")
+    return {"counts": counts, "has_na": has_na, "n_rows": n_rows}
+
+
+def ajuster_preprocesseur_resume(resume: dict[str, Any]) -> ColumnTransformer:
+    """Préprocesseur ajusté à partir des effectifs de resumer_flux.
+
+    Il est ajusté sur un petit jeu qui a les mêmes médianes, modalités et modes
+    que le train. Le scaler est ensuite fixé par fixer_scaler, avec les moyennes
+    et variances exactes issues des statistiques suffisantes.
+    """
+    counts, has_na = resume["counts"], resume["has_na"]
+    categories = {col: sorted(counts[col].index) for col in CATEGORICAL_FEATURES}
+    n_rows = max(max(len(v) + has_na[col] for col, v in categories.items()), 1)
+    frame = {}
+    for col in NUMERIC_FEATURES:
+        frame[col] = np.full(n_rows, _mediane_comptes(counts[col]), dtype=np.float64)
+    for col, values in categories.items():
+        values = list(values) + ([pd.NA] if has_na[col] else [])
+        frame[col] = pd.array((values * n_rows)[:n_rows], dtype="string")
+    for col in BINARY_FEATURES:
+        # SimpleImputer(most_frequent) garde la plus petite valeur en cas d'égalité
+        tied = counts[col][counts[col] == counts[col].max()]
+        frame[col] = np.full(n_rows, float(min(tied.index)))
+    preprocessor = construire_preprocesseur()
+    preprocessor.fit(pd.DataFrame(frame)[USEFUL_FEATURES])
+    return preprocessor
+
+
+def fixer_scaler(preprocessor: ColumnTransformer, stats: dict[str, Any]) -> None:
+    """Moyennes et variances du StandardScaler calculées à partir des statistiques suffisantes."""
+    scaler = preprocessor.named_transformers_["num"].named_steps["scaler"]
+    num = preprocessor.output_indices_["num"]
+    gram = stats["gram"]
+    n = gram[0, 0]
+    mean = gram[0, 1:][num] / n
+    var = np.diag(gram[1:, 1:])[num] / n - mean**2
+    var = np.maximum(var, 0.0)
+    scale = np.sqrt(var)
+    scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+    scaler.mean_, scaler.var_, scaler.scale_ = mean, var, scale
+    scaler.n_samples_seen_ = int(n)
+
+
+def _initialiser_worker(preprocessor: ColumnTransformer) -> None:
+    """Initializer des processus : le préprocesseur n'est transmis qu'une fois."""
+    _worker_state["preprocessor"] = preprocessor
+
+
+def _statistiques_bloc(x: pd.DataFrame, y: pd.Series) -> dict[str, Any]:
+    return accumuler_statistiques(_worker_state["preprocessor"], preparer_features(x), y)
+
+
+def entrainer_hors_memoire(
+    path_x: str | Path,
+    path_y: str | Path,
+    alpha: float = 1.0,
+    chunk_size: int = 100_000,
+    workers: int = 0,
+) -> tuple[Ridge, ColumnTransformer, dict[str, Any], dict[str, Any]]:
+    """Entraîne le Ridge sur des fichiers qui ne tiennent pas en mémoire.
+
+    Passe 1 : effectifs des variables -> préprocesseur (resumer_flux).
+    Passe 2 : statistiques suffisantes XᵀX, Xᵀy cumulées bloc par bloc, en
+    parallèle sur `workers` processus (0 = dans le processus courant), puis
+    système résolu une fois. La mémoire ne dépend que de `chunk_size` et du
+    nombre de colonnes du préprocesseur (~145), pas du nombre de lignes.
+    Mêmes coefficients que entrainer_modele sur les mêmes données.
+
+    Retourne (modèle, préprocesseur, statistiques suffisantes, résumé pour la config Streamlit).
+    """
+    resume = resumer_flux(path_x, chunk_size)
+    preprocessor = ajuster_preprocesseur_resume(resume)
+    blocs = blocs_entrainement(path_x, path_y, chunk_size)
+
+    stats = None
+    if workers <= 0:
+        for x, y in blocs:
+            stats = accumuler_statistiques(preprocessor, preparer_features(x), y, stats)
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_initialiser_worker,
+                                 initargs=(preprocessor,)) as pool:
+            # Au plus 2 blocs en attente par processus : la mémoire reste bornée
+            pending: deque = deque()
+            for x, y in blocs:
+                pending.append(pool.submit(_statistiques_bloc, x, y))
+                if len(pending) >= 2 * workers:
+                    batch = pending.popleft().result()
+                    stats = batch if stats is None else {k: stats[k] + batch[k] for k in batch}
+            while pending:
+                batch = pending.popleft().result()
+                stats = batch if stats is None else {k: stats[k] + batch[k] for k in batch}
+    if stats is None:
+        raise ValueError(f"{path_x} est vide")
+
+    fixer_scaler(preprocessor, stats)
+    model = resoudre_ridge(stats, preprocessor, alpha=alpha)
+    counts = resume["counts"]
+    summary = {
         "ranges": {
             col: {
-                "min": float(x_train[col].min()),
-                "max": float(x_train[col].max()),
-                "mean": float(x_train[col].mean()),
+                "min": float(counts[col].index.min()),
+                "max": float(counts[col].index.max()),
+                "mean": float((counts[col].index.to_numpy(dtype=np.float64) * counts[col].to_numpy()).sum() / counts[col].sum()),
             }
             for col in NUMERIC_FEATURES
         },
-        "categorical_values": {
-            col: x_train[col].dropna().unique().tolist() for col in CATEGORICAL_FEATURES
-        },
+        "categorical_values": {col: counts[col].index.tolist() for col in CATEGORICAL_FEATURES},
     }
-    with open(MODELS_DIR / "streamlit_config.json", "w", encoding="utf-8") as f:
-        json.dump(streamlit_config, f, indent=2, ensure_ascii=False)
-
-    neighborhood_mapping = construire_mapping_quartiers()
-    with open(MODELS_DIR / "neighborhood_mapping.json", "w", encoding="utf-8") as f:
-        json.dump(neighborhood_mapping, f, indent=2, ensure_ascii=False, sort_keys=True)
+    return model, preprocessor, stats, summary
 
 
 def main() -> None:
-    """Point d'entrée principal : entraînement, évaluation, export."""
+    """Point d'entrée principal : entraînement, évaluation, export.
+
+    Sans option : réentraînement complet (historique + incréments). Avec
+    --delta-x/--delta-y : entraînement incrémental sur les nouvelles annonces.
+    Avec --out-of-core : Ridge entraîné par blocs sur --x-path/--y-path.
+    """
+    parser = argparse.ArgumentParser(description="Entraîne et exporte le modèle.")
+    parser.add_argument("--delta-x", default=None, help="Feather des nouvelles annonces (entraînement incrémental)")
+    parser.add_argument("--delta-y", default=None, help="Feather de la cible des nouvelles annonces")
+    parser.add_argument("--model", default="ridge", choices=["ridge", "xgboost"], help="Modèle à mettre à jour")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="Dégradation relative tolérée sur le holdout")
+    parser.add_argument("--rounds", type=int, default=50, help="Arbres ajoutés par incrément (xgboost)")
+    parser.add_argument("--out-of-core", action="store_true", help="Entraînement Ridge par blocs (fichiers volumineux)")
+    parser.add_argument("--x-path", default=str(DATA_MODEL_DIR / "X_train.feather"), help="Features (Feather/Parquet)")
+    parser.add_argument("--y-path", default=str(DATA_MODEL_DIR / "y_train.feather"), help="Cible (Feather/Parquet)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Lignes par bloc (hors mémoire)")
+    parser.add_argument("--workers", type=int, default=0, help="Processus de cumul des blocs (0 = processus courant)")
+    args = parser.parse_args()
+
+    if args.out_of_core:
+        start = time.perf_counter()
+        model, preprocessor, stats, summary = entrainer_hors_memoire(
+            args.x_path, args.y_path, chunk_size=args.chunk_size, workers=args.workers
+        )
+        from bulk_scoring import colonnes_disponibles
+
+        target = colonnes_disponibles(Path(args.y_path))[0]
+        x_test, y_test = charger_test()
+        metrics = evaluer_modele(model, preprocessor, x_test, y_test)
+        sauvegarder_artefacts(model, preprocessor, None, pd.Series(name=target, dtype=np.float64), resume=summary)
+        sauvegarder_etat(stats, model.alpha, int(stats["gram"][0, 0]), [])
+        print(f"✅ Entraînement hors mémoire : {int(stats['gram'][0, 0]):,} lignes en {time.perf_counter() - start:.2f} s")
+        print(f"📊 Métriques test - R²: {metrics['r2']:.4f} | MAE: {metrics['mae']:.4f} | RMSE: {metrics['rmse']:.4f}")
+        return
+
+    if args.delta_x:
+        if not args.delta_y:
+            parser.error("--delta-y est obligatoire avec --delta-x")
+        x_delta = pd.read_feather(args.delta_x, columns=USEFUL_FEATURES)
+        y_delta = pd.read_feather(args.delta_y).squeeze()
+        entrainer_incremental(x_delta, y_delta, args.model, args.tolerance, args.rounds)
+        return
+
     x_train, y_train, x_test, y_test = charger_donnees()
 
     x_train = preparer_features(x_train)
@@ -201,6 +650,8 @@ def main() -> None:
     model, preprocessor = entrainer_modele(x_train, y_train)
     metrics = evaluer_modele(model, preprocessor, x_test, y_test)
     sauvegarder_artefacts(model, preprocessor, x_train, y_train)
+    # Point de départ des entraînements incrémentaux suivants
+    sauvegarder_etat(accumuler_statistiques(preprocessor, x_train, y_train), model.alpha, len(x_train), [])
 
     print("✅ Modèle et préprocesseur exportés dans models/")
     print(